@@ -84,6 +84,7 @@ def get_current_dir() -> str:
 print(PROJECT_ROOT)
 from ctos.drivers.okx.util import BeijingTime, get_host_ip, rate_price2order, pad_dataframe_to_length_fast
 from ctos.drivers.okx.driver import init_CexClient as get_okexExchage
+from ctos.core.runtime.IndicatorPanel import IndicatorPanel
 # === 配置 ===
 
 try:
@@ -876,29 +877,21 @@ def calculate_bollinger_market_sentiment(data_frames: dict, time_gap: str, windo
     coin_positions = {}
     position_scores = []  # 用于计算整体情绪，-1(下轨) 到 1(上轨)
     
-    # 为每个币种计算布林带并判断当前价格位置
-    for coin, df in data_frames.items():
-        if df is None or len(df) < window:
-            continue
-            
+    # 所有币种的布林带一次性算完（各币种最后 window 根右对齐，面板向量化计算）
+    frames = {coin: df for coin, df in data_frames.items() if df is not None and len(df) >= window}
+    if not frames:
+        return {}
+    latest = IndicatorPanel.from_frames(frames, align='tail', length=window, fields=('close',)) \
+        .add_bollinger_bands(window, std_multiplier).latest()
+    
+    # 判断每个币种当前价格位置
+    for coin in frames:
         try:
-            # 确保数据按时间排序
-            df_sorted = df.sort_values('trade_date').copy()
-            
-            # 计算布林带
-            close_prices = df_sorted['close'].astype(float)
-            sma = close_prices.rolling(window=window).mean()
-            std = close_prices.rolling(window=window).std()
-            
-            upper_band = sma + (std * std_multiplier)
-            middle_band = sma
-            lower_band = sma - (std * std_multiplier)
-            
             # 获取最新价格和布林带值
-            latest_price = close_prices.iloc[-1]
-            latest_upper = upper_band.iloc[-1]
-            latest_middle = middle_band.iloc[-1]
-            latest_lower = lower_band.iloc[-1]
+            latest_price = latest.at[coin, 'close']
+            latest_upper = latest.at[coin, 'bollinger_upper']
+            latest_middle = latest.at[coin, 'bollinger_middle']
+            latest_lower = latest.at[coin, 'bollinger_lower']
             
             # 跳过无效数据
             if pd.isna(latest_upper) or pd.isna(latest_lower) or pd.isna(latest_middle):
@@ -0,0 +1,204 @@
+"""
+Shared instrument metadata cache for driver ``exchange_limits``.
+
+Limits (tick size, lot size, min size, ...) are loaded in bulk from an
+exchange's instruments endpoint, one request per group (e.g. OKX instType
+SWAP), and kept in a ``{symbol: limits}`` table that drivers read directly.
+A background thread refreshes every known group once its data is older than
+``ttl``; concurrent refreshes of the same group share one request.
+
+The table is persisted to the driver's ``exchange_trade_info.json``. Writes
+are coalesced (many updates within ``save_delay`` seconds produce one write)
+and atomic (temp file + ``os.replace``), so a crash never leaves a truncated
+file behind.
+
+Caches are shared per exchange through :func:`get_exchange_info_cache`.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+
+DEFAULT_TTL = 6 * 3600
+RETRY_DELAY = 60
+
+
+class ExchangeInfoCache:
+    """
+    :param path: json file the table is loaded from / saved to
+    :param fetch_all: callable(group) -> {symbol: limits}; one bulk request
+    :param ttl: seconds before a group is refreshed again
+    :param save_delay: seconds to wait for more updates before writing
+    """
+
+    def __init__(self, path, fetch_all=None, ttl=DEFAULT_TTL, save_delay=2.0, name=""):
+        self.path = path
+        self.fetch_all = fetch_all
+        self.ttl = float(ttl)
+        self.save_delay = float(save_delay)
+        self.name = name
+        self.table = {}             # symbol -> limits; drivers keep a reference, never rebind
+        self._group_ts = {}         # group -> last bulk refresh ts
+        self._group_locks = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._save_timer = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.bulk_refreshes = 0
+        self.saves = 0
+        self.errors = 0
+        self.load()
+        atexit.register(self.flush)
+
+    # ---------------- persistence ----------------
+    def load(self):
+        if not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.errors += 1
+            print(f"[ExchangeInfo {self.name}] load {self.path} failed: {e}")
+            return 0
+        self.table.update(data)
+        return len(data)
+
+    def mark_dirty(self):
+        """Schedule one write for all updates of the next ``save_delay`` seconds."""
+        with self._lock:
+            self._dirty = True
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def flush(self):
+        """Write the table now if it has unsaved changes."""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return False
+            self._dirty = False
+            snapshot = dict(self.table)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp, self.path)
+            self.saves += 1
+            return True
+        except OSError as e:
+            self.errors += 1
+            print(f"[ExchangeInfo {self.name}] save {self.path} failed: {e}")
+            return False
+
+    # ---------------- lookups / updates ----------------
+    def get(self, symbol):
+        return self.table.get(symbol)
+
+    def put(self, symbol, limits):
+        self.table[symbol] = limits
+        self.mark_dirty()
+
+    def put_many(self, items):
+        self.table.update(items)
+        self.mark_dirty()
+
+    def _group_lock(self, group):
+        with self._lock:
+            lk = self._group_locks.get(group)
+            if lk is None:
+                lk = self._group_locks[group] = threading.Lock()
+            return lk
+
+    def age(self, group=None):
+        ts = self._group_ts.get(group)
+        return None if ts is None else time.time() - ts
+
+    def refresh(self, group=None, max_age=0):
+        """
+        Bulk reload one group unless it was refreshed within ``max_age``
+        seconds (including by another thread while this one waited).
+
+        :return: number of symbols updated
+        """
+        with self._group_lock(group):
+            age = self.age(group)
+            if age is not None and age <= max_age:
+                return 0
+            items = self.fetch_all(group) or {}
+            self._group_ts[group] = time.time()
+            self.bulk_refreshes += 1
+        if items:
+            self.put_many(items)
+        return len(items)
+
+    def ensure_fresh(self, group=None):
+        """Refresh ``group`` if it was never loaded or is older than ``ttl``."""
+        if self.fetch_all is None:
+            return 0
+        try:
+            return self.refresh(group, max_age=self.ttl)
+        except Exception as e:
+            self.errors += 1
+            print(f"[ExchangeInfo {self.name}] bulk refresh {group} failed: {e}")
+            return 0
+
+    # ---------------- background refresh ----------------
+    def start(self, *groups):
+        """Load ``groups`` in the background now and keep them within ``ttl``."""
+        for g in groups or (None,):
+            self._group_ts.setdefault(g, None)
+        if self.fetch_all is None or (self._thread is not None and self._thread.is_alive()):
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"exchange-info-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            wait = self.ttl
+            for group in list(self._group_ts):
+                before = self.errors
+                self.ensure_fresh(group)
+                age = self.age(group)
+                if self.errors > before or age is None:
+                    wait = min(wait, RETRY_DELAY)
+                else:
+                    wait = min(wait, max(1.0, self.ttl - age))
+            self._stop.wait(wait)
+
+    def get_stats(self):
+        return {
+            "name": self.name,
+            "symbols": len(self.table),
+            "ttl": self.ttl,
+            "groups": {g: self.age(g) for g in list(self._group_ts)},
+            "bulk_refreshes": self.bulk_refreshes,
+            "saves": self.saves,
+            "errors": self.errors,
+        }
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_exchange_info_cache(name, path, fetch_all=None, ttl=DEFAULT_TTL):
+    """Process-wide cache per exchange name; the first caller's fetcher is used."""
+    with _CACHES_LOCK:
+        cache = _CACHES.get(name)
+        if cache is None:
+            cache = ExchangeInfoCache(path, fetch_all=fetch_all, ttl=ttl, name=name)
+            _CACHES[name] = cache
+        return cache
@@ -0,0 +1,366 @@
+"""
+In-memory order state fed by private websocket order/fill channels.
+
+Every exchange update is normalized into the CTOS order shape used by
+``get_order_status`` (orderId/symbol/side/price/quantity/filledQuantity/
+status ...) plus a unified ``state``:
+
+    open / partial / filled / canceled / rejected / expired
+
+and kept in a table keyed by order id (always a string). Updates that
+increase ``filledQuantity`` fire ``fill`` (fully filled) or ``partial``
+callbacks with the filled delta, so consumers react to fills as soon as the
+exchange pushes them instead of polling ``get_open_orders`` /
+``get_order_status``.
+
+Supported payloads:
+
+- OKX ``orders`` channel (``{"arg": {"channel": "orders"}, "data": [...]}``)
+- Binance user data: USD-M ``ORDER_TRADE_UPDATE`` and spot ``executionReport``
+- Aster ``AsterWebSocketManager`` callback dicts (order_id/status/size/...)
+- already-normalized CTOS dicts (e.g. a REST ``get_order_status`` result),
+  used to seed orders placed before the stream was up
+"""
+import threading
+import time
+from collections import deque
+
+OPEN = "open"
+PARTIAL = "partial"
+FILLED = "filled"
+CANCELED = "canceled"
+REJECTED = "rejected"
+EXPIRED = "expired"
+
+TERMINAL_STATES = (FILLED, CANCELED, REJECTED, EXPIRED)
+
+_STATE_MAP = {
+    "LIVE": OPEN,
+    "NEW": OPEN,
+    "OPEN": OPEN,
+    "PENDING_CANCEL": OPEN,
+    "PARTIALLY_FILLED": PARTIAL,
+    "PARTIAL": PARTIAL,
+    "FILLED": FILLED,
+    "CLOSED": FILLED,           # ccxt unified status of a fully filled order (Binance driver)
+    "CANCELED": CANCELED,
+    "CANCELLED": CANCELED,
+    "MMP_CANCELED": CANCELED,
+    "REJECTED": REJECTED,
+    "EXPIRED": EXPIRED,
+    "EXPIRED_IN_MATCH": EXPIRED,
+}
+
+
+def normalize_state(status, filled=None, quantity=None):
+    state = _STATE_MAP.get(str(status or "").upper())
+    if state is None:
+        return OPEN
+    if state == OPEN and filled and quantity and 0 < filled < quantity:
+        return PARTIAL
+    return state
+
+
+def _float(v, default=None):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return default
+
+
+def _int(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def from_okx_order(d):
+    """One element of the OKX ``orders`` channel ``data`` list."""
+    return {
+        "orderId": str(d.get("ordId")),
+        "symbol": d.get("instId"),
+        "side": str(d.get("side") or "").lower() or None,
+        "orderType": str(d.get("ordType") or "").lower() or None,
+        "price": _float(d.get("px")),
+        "quantity": _float(d.get("sz")),
+        "filledQuantity": _float(d.get("accFillSz"), 0.0),
+        "avgPrice": _float(d.get("avgPx")),
+        "lastFillPrice": _float(d.get("fillPx")),
+        "status": d.get("state"),
+        "reduceOnly": d.get("reduceOnly"),
+        "clientId": d.get("clOrdId") or None,
+        "createdAt": _int(d.get("cTime")),
+        "updatedAt": _int(d.get("uTime")),
+        "raw": d,
+    }
+
+
+def from_binance_order(msg):
+    """USD-M ``ORDER_TRADE_UPDATE`` (fields under ``o``) or spot ``executionReport``."""
+    o = msg.get("o", msg) if msg.get("e") == "ORDER_TRADE_UPDATE" else msg
+    return {
+        "orderId": str(o.get("i")),
+        "symbol": o.get("s"),
+        "side": str(o.get("S") or "").lower() or None,
+        "orderType": str(o.get("o") or "").lower() or None,
+        "price": _float(o.get("p")),
+        "quantity": _float(o.get("q")),
+        "filledQuantity": _float(o.get("z"), 0.0),
+        "avgPrice": _float(o.get("ap")),
+        "lastFillPrice": _float(o.get("L")),
+        "status": o.get("X"),
+        "execType": o.get("x"),
+        "timeInForce": o.get("f"),
+        "reduceOnly": o.get("R"),
+        "clientId": o.get("c") or None,
+        "createdAt": _int(o.get("O")),
+        "updatedAt": _int(o.get("T") or msg.get("E")),
+        "raw": msg,
+    }
+
+
+def from_aster_update(d):
+    """Dict passed to ``AsterWebSocketManager.order_update_callback``."""
+    return {
+        "orderId": str(d.get("order_id")),
+        "symbol": d.get("contract_id"),
+        "side": str(d.get("side") or "").lower() or None,
+        "orderType": d.get("order_type"),
+        "price": _float(d.get("price")),
+        "quantity": _float(d.get("size")),
+        "filledQuantity": _float(d.get("filled_size"), 0.0),
+        "status": d.get("status"),
+        "raw": d,
+    }
+
+
+class OrderStateEngine:
+    """
+    :param exchange: name used in logs and bus topics
+    :param keep_closed: terminal orders kept for lookups before being evicted
+    :param bus: optional EventBus; events are published as
+        ``orders.<exchange>.<event>`` (update/partial/fill/closed)
+    :param reconcile_fn: ``get_order_status``-compatible callable
+        ``(order_id=, symbol=, keep_origin=False) -> (order, err)`` used to
+        re-query open orders whenever the feed (re)connects
+    """
+
+    EVENTS = ("update", "partial", "fill", "closed")
+
+    def __init__(self, exchange="", keep_closed=2000, bus=None, reconcile_fn=None):
+        self.exchange = exchange
+        self.keep_closed = keep_closed
+        self.bus = bus
+        self.reconcile_fn = reconcile_fn
+        self.orders = {}
+        self.versions = {}
+        self._closed = deque()
+        self._cond = threading.Condition()
+        self.listeners = {e: [] for e in self.EVENTS}
+        self.live = False
+        self.live_since = None
+        self.epoch = 0          # bumped on every transition to live
+        self.stats = {"updates": 0, "fills": 0, "partials": 0, "stale": 0, "errors": 0,
+                      "reconciled": 0, "last_update_at": None}
+
+    # ---------------- subscriptions ----------------
+    def on(self, event, callback):
+        """
+        callback(event, order, filled_delta)
+
+        :param event: 'update' (every change), 'partial', 'fill' or 'closed'
+        """
+        if event not in self.listeners:
+            raise ValueError("unknown event %r, expected one of %s" % (event, self.EVENTS))
+        self.listeners[event].append(callback)
+        return callback
+
+    def set_live(self, live):
+        """
+        Called by the feed on (dis)connect; consumers fall back to REST while not live.
+
+        Pushes sent while the socket was down are lost, so going live first
+        reconciles every open order in the table (blocking REST calls; feeds
+        call this off their event loop).
+        """
+        if not live:
+            self.live = False
+            self.live_since = None
+            return
+        self.reconcile()
+        self.epoch += 1
+        self.live = True
+        self.live_since = time.time()
+
+    def reconcile(self):
+        """
+        Flag every open order ``unverified`` and re-query it through
+        ``reconcile_fn``. Orders that could not be refreshed keep the flag
+        until their next update; consumers must not trust them.
+
+        :return: number of orders refreshed
+        """
+        with self._cond:
+            pending = [(oid, o.get("symbol")) for oid, o in self.orders.items()
+                       if o["state"] not in TERMINAL_STATES]
+            for oid, _ in pending:
+                self.orders[oid]["unverified"] = True
+        if self.reconcile_fn is None:
+            return 0
+        n = 0
+        for oid, symbol in pending:
+            try:
+                data, err = self.reconcile_fn(order_id=oid, symbol=symbol, keep_origin=False)
+            except Exception as e:
+                data, err = None, e
+            if err:
+                self.stats["errors"] += 1
+            if err or not data:
+                continue
+            if self.update(dict(data, orderId=oid)) is not None:
+                n += 1
+        self.stats["reconciled"] += n
+        return n
+
+    # ---------------- updates ----------------
+    def update(self, order):
+        """
+        Merge one normalized order into the table.
+
+        :return: the stored order dict, or None if the update was stale
+        """
+        oid = order.get("orderId")
+        if oid is None or oid == "None":
+            return None
+        oid = str(oid)
+        events = []
+        with self._cond:
+            prev = self.orders.get(oid)
+            if prev is not None and prev.get("updatedAt") and order.get("updatedAt") \
+                    and order["updatedAt"] < prev["updatedAt"]:
+                self.stats["stale"] += 1
+                return None
+            cur = dict(prev) if prev else {}
+            for k, v in order.items():
+                if v is not None or k not in cur:
+                    cur[k] = v
+            cur["orderId"] = oid
+            cur.pop("unverified", None)
+            filled = cur.get("filledQuantity") or 0.0
+            cur["state"] = normalize_state(cur.get("status"), filled, cur.get("quantity"))
+            cur["receivedAt"] = time.time()
+            delta = filled - ((prev or {}).get("filledQuantity") or 0.0)
+            self.orders[oid] = cur
+            self.versions[oid] = self.versions.get(oid, 0) + 1
+            self.stats["updates"] += 1
+            self.stats["last_update_at"] = cur["receivedAt"]
+            events.append("update")
+            if delta > 0:
+                if cur["state"] == FILLED:
+                    events.append("fill")
+                    self.stats["fills"] += 1
+                else:
+                    events.append("partial")
+                    self.stats["partials"] += 1
+            if cur["state"] in TERMINAL_STATES and (prev is None or prev.get("state") not in TERMINAL_STATES):
+                events.append("closed")
+                self._closed.append(oid)
+                self._evict()
+            self._cond.notify_all()
+        for event in events:
+            self._emit(event, cur, delta if delta > 0 else 0.0)
+        return cur
+
+    def _evict(self):
+        while len(self._closed) > self.keep_closed:
+            oid = self._closed.popleft()
+            o = self.orders.get(oid)
+            if o is not None and o.get("state") in TERMINAL_STATES:
+                self.orders.pop(oid, None)
+                self.versions.pop(oid, None)
+
+    def _emit(self, event, order, delta):
+        for cb in self.listeners[event]:
+            try:
+                cb(event, order, delta)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print("[OrderState %s] %s callback failed: %s" % (self.exchange, event, e))
+        if self.bus is not None:
+            try:
+                self.bus.publish_threadsafe("orders.%s.%s" % (self.exchange.lower(), event), order)
+            except Exception:
+                pass
+
+    def track(self, order_id, symbol=None, **fields):
+        """Register an order right after placement, before the first push arrives."""
+        if str(order_id) in self.orders:
+            return self.orders[str(order_id)]
+        fields.setdefault("status", "NEW")
+        return self.update(dict(fields, orderId=order_id, symbol=symbol))
+
+    def on_okx_message(self, msg):
+        if (msg.get("arg") or {}).get("channel") != "orders":
+            return
+        for d in msg.get("data") or []:
+            self.update(from_okx_order(d))
+
+    def on_binance_message(self, msg):
+        if msg.get("e") in ("ORDER_TRADE_UPDATE", "executionReport"):
+            self.update(from_binance_order(msg))
+
+    def on_aster_update(self, d):
+        """Handler for ``AsterClient.setup_order_update_handler``."""
+        self.update(from_aster_update(d))
+
+    async def aster_callback(self, d):
+        """``order_update_callback`` for ``AsterWebSocketManager`` (it awaits the callback)."""
+        self.update(from_aster_update(d))
+
+    # ---------------- queries ----------------
+    def get(self, order_id):
+        return self.orders.get(str(order_id))
+
+    def is_open(self, order_id):
+        o = self.orders.get(str(order_id))
+        return o is not None and o["state"] not in TERMINAL_STATES
+
+    def open_orders(self, symbol=None, ids=None):
+        """Open orders, optionally limited to a symbol and/or a set of ids."""
+        wanted = set(str(i) for i in ids) if ids is not None else None
+        with self._cond:
+            out = []
+            for oid, o in self.orders.items():
+                if o["state"] in TERMINAL_STATES:
+                    continue
+                if symbol is not None and o.get("symbol") != symbol:
+                    continue
+                if wanted is not None and oid not in wanted:
+                    continue
+                out.append(o)
+            return out
+
+    def wait(self, order_ids, timeout=None):
+        """
+        Block until any of ``order_ids`` gets an update.
+
+        :return: list of order ids that changed (empty on timeout)
+        """
+        ids = [str(i) for i in order_ids]
+        with self._cond:
+            start = dict((i, self.versions.get(i, 0)) for i in ids)
+
+            def changed():
+                return [i for i in ids if self.versions.get(i, 0) != start[i]]
+
+            self._cond.wait_for(changed, timeout)
+            return changed()
+
+    def get_stats(self):
+        with self._cond:
+            n_open = sum(1 for o in self.orders.values() if o["state"] not in TERMINAL_STATES)
+            out = dict(self.stats)
+            out.update(exchange=self.exchange, live=self.live, live_since=self.live_since,
+                       orders=len(self.orders), open=n_open)
+            return out
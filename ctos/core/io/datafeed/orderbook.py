@@ -0,0 +1,525 @@
+"""
+Local L2 order books maintained from a snapshot plus incremental diffs.
+
+Each side keeps its prices in a chunked sorted list (:class:`_SortedKeys`,
+the sortedcontainers layout: bisect over chunk maxima, then inside one chunk
+of at most ``2 * LOAD`` keys) and a price -> size dict; a size of 0 in a diff
+deletes the level. Inserting or deleting a level costs O(log n + LOAD)
+instead of shifting the whole array. Bids are stored negated so both sides
+are ascending and the first key is always the best level.
+
+Sequence handling follows the generic "snapshot id + diff (first, final,
+prev_final)" scheme used by Binance (U/u/pu) and similar feeds:
+
+- diffs arriving before the snapshot are buffered
+- after a snapshot with id L, diffs with final < L are dropped and the first
+  applied diff must straddle L
+- afterwards every diff must continue the previous one (prev_final == last,
+  or first == last + 1 when the feed has no prev id)
+
+Any break marks the book out of sync and asks :class:`BookManager` to
+resync from a REST snapshot in the background. OKX style CRC32 checksums
+are supported through :func:`okx_checksum`.
+
+Queries return CTOS shapes: ``{"symbol", "bids", "asks"}`` with
+``[[price, size], ...]`` levels, best first.
+"""
+import threading
+import time
+import zlib
+from bisect import bisect_left
+
+
+def _signed32(v):
+    return v - (1 << 32) if v >= (1 << 31) else v
+
+
+def okx_checksum(bids, asks, depth=25):
+    """
+    OKX books checksum: crc32 over 'bidPx:bidSz:askPx:askSz:...' of the top 25
+    levels, using the exchange's original strings. Returns a signed int32.
+    """
+    parts = []
+    for i in range(depth):
+        if i < len(bids):
+            parts.append("%s:%s" % (bids[i][0], bids[i][1]))
+        if i < len(asks):
+            parts.append("%s:%s" % (asks[i][0], asks[i][1]))
+    return _signed32(zlib.crc32(":".join(parts).encode()))
+
+
+class _SortedKeys:
+    """
+    Ascending unique float keys split into chunks of at most ``2 * LOAD``.
+
+    ``_maxes[i]`` is the last key of ``_lists[i]``; a key is located by
+    bisecting ``_maxes`` and then its chunk, so add/discard only shift one
+    small chunk.
+    """
+
+    LOAD = 64
+
+    __slots__ = ("_lists", "_maxes", "_len")
+
+    def __init__(self, keys=()):
+        self._lists = []
+        self._maxes = []
+        self._len = 0
+        for k in keys:
+            self.add(k)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for sub in self._lists:
+            for k in sub:
+                yield k
+
+    def first(self):
+        return self._lists[0][0] if self._len else None
+
+    def head(self, n=None):
+        """The first n keys (all when n is None) as a list."""
+        if n is None or n >= self._len:
+            return [k for sub in self._lists for k in sub]
+        out = []
+        for sub in self._lists:
+            if len(out) + len(sub) >= n:
+                out.extend(sub[:n - len(out)])
+                break
+            out.extend(sub)
+        return out
+
+    def add(self, key):
+        """Insert key; returns False if it was already present."""
+        lists, maxes = self._lists, self._maxes
+        if not maxes:
+            lists.append([key])
+            maxes.append(key)
+            self._len = 1
+            return True
+        pos = bisect_left(maxes, key)
+        if pos == len(maxes):
+            pos -= 1
+            sub = lists[pos]
+            sub.append(key)
+            maxes[pos] = key
+        else:
+            sub = lists[pos]
+            i = bisect_left(sub, key)
+            if sub[i] == key:
+                return False
+            sub.insert(i, key)
+        self._len += 1
+        if len(sub) > 2 * self.LOAD:
+            half = sub[self.LOAD:]
+            del sub[self.LOAD:]
+            maxes[pos] = sub[-1]
+            lists.insert(pos + 1, half)
+            maxes.insert(pos + 1, half[-1])
+        return True
+
+    def discard(self, key):
+        """Remove key; returns False if it was not present."""
+        lists, maxes = self._lists, self._maxes
+        pos = bisect_left(maxes, key)
+        if pos == len(maxes):
+            return False
+        sub = lists[pos]
+        i = bisect_left(sub, key)
+        if sub[i] != key:
+            return False
+        del sub[i]
+        self._len -= 1
+        if not sub:
+            del lists[pos]
+            del maxes[pos]
+        elif i == len(sub):
+            maxes[pos] = sub[-1]
+        return True
+
+    def truncate(self, n):
+        """Keep the first n keys; returns the removed ones."""
+        if n >= self._len:
+            return []
+        kept = 0
+        for pos, sub in enumerate(self._lists):
+            if kept + len(sub) > n:
+                break
+            kept += len(sub)
+        cut = n - kept
+        removed = self._lists[pos][cut:]
+        for sub in self._lists[pos + 1:]:
+            removed.extend(sub)
+        if cut:
+            del self._lists[pos][cut:]
+            self._maxes[pos] = self._lists[pos][-1]
+            pos += 1
+        del self._lists[pos:]
+        del self._maxes[pos:]
+        self._len = n
+        return removed
+
+
+class _Side:
+    """One side of the book; keys are stored so that ascending == best first."""
+
+    __slots__ = ("sign", "keys", "sizes", "raw")
+
+    def __init__(self, is_bid):
+        self.sign = -1.0 if is_bid else 1.0
+        self.keys = _SortedKeys()
+        self.sizes = {}
+        self.raw = {}
+
+    def clear(self):
+        self.keys = _SortedKeys()
+        self.sizes = {}
+        self.raw = {}
+
+    def set(self, price, size, raw=None):
+        px = float(price)
+        sz = float(size)
+        key = self.sign * px
+        if sz <= 0:
+            if key in self.sizes:
+                self.keys.discard(key)
+                del self.sizes[key]
+                self.raw.pop(key, None)
+            return
+        if key not in self.sizes:
+            self.keys.add(key)
+        self.sizes[key] = sz
+        if raw is not None:
+            self.raw[key] = raw
+
+    def best(self):
+        k = self.keys.first()
+        if k is None:
+            return None
+        return self.sign * k, self.sizes[k]
+
+    def levels(self, n=None):
+        sign, sizes = self.sign, self.sizes
+        return [[sign * k, sizes[k]] for k in self.keys.head(n)]
+
+    def raw_levels(self, n):
+        out = []
+        for k in self.keys.head(n):
+            r = self.raw.get(k)
+            out.append(r if r is not None else (repr(self.sign * k), repr(self.sizes[k])))
+        return out
+
+    def trim(self, max_depth):
+        if max_depth and len(self.keys) > max_depth:
+            for k in self.keys.truncate(max_depth):
+                self.sizes.pop(k, None)
+                self.raw.pop(k, None)
+
+
+def _is_str_level(level):
+    return isinstance(level[0], str) and isinstance(level[1], str)
+
+
+class OrderBook:
+    """
+    Single-symbol L2 book.
+
+    :param symbol: exchange symbol (kept as-is in outputs)
+    :param max_depth: keep at most this many levels per side (None = all)
+    :param keep_raw: keep original price/size strings (needed for checksums)
+    """
+
+    MAX_BUFFER = 1000
+
+    def __init__(self, symbol, max_depth=None, keep_raw=False):
+        self.symbol = symbol
+        self.max_depth = max_depth
+        self.keep_raw = keep_raw
+        self.bids = _Side(True)
+        self.asks = _Side(False)
+        self.lock = threading.RLock()
+        self.synced = False
+        self.last_id = None
+        self.snapshot_id = None
+        self.updated_at = None
+        self.buffer = []
+        self.stats = {"snapshots": 0, "diffs": 0, "dropped": 0, "gaps": 0, "checksum_errors": 0}
+
+    # ---------------- updates ----------------
+    def _apply_levels(self, side, levels):
+        keep_raw = self.keep_raw
+        for lv in levels:
+            raw = (lv[0], lv[1]) if keep_raw and _is_str_level(lv) else None
+            side.set(lv[0], lv[1], raw)
+
+    def apply_snapshot(self, bids, asks, snapshot_id=None):
+        """Replace the book; buffered diffs newer than the snapshot are replayed."""
+        with self.lock:
+            self.bids.clear()
+            self.asks.clear()
+            self._apply_levels(self.bids, bids)
+            self._apply_levels(self.asks, asks)
+            self.bids.trim(self.max_depth)
+            self.asks.trim(self.max_depth)
+            self.snapshot_id = snapshot_id
+            self.last_id = snapshot_id
+            self.synced = True
+            self.updated_at = time.time()
+            self.stats["snapshots"] += 1
+            pending, self.buffer = self.buffer, []
+            for diff in pending:
+                if not self.apply_diff(**diff):
+                    break
+            return self.synced
+
+    def apply_diff(self, bids=(), asks=(), first_id=None, final_id=None, prev_final_id=None, checksum=None):
+        """
+        Apply one incremental update.
+
+        :return: False if the sequence broke (book is now out of sync), else True
+        """
+        with self.lock:
+            if not self.synced:
+                if len(self.buffer) >= self.MAX_BUFFER:
+                    self.buffer.pop(0)
+                self.buffer.append(dict(bids=bids, asks=asks, first_id=first_id, final_id=final_id,
+                                        prev_final_id=prev_final_id, checksum=checksum))
+                return True
+            if final_id is not None and self.last_id is not None:
+                if final_id < self.last_id or (final_id == self.last_id and self.last_id != self.snapshot_id):
+                    self.stats["dropped"] += 1
+                    return True
+                if self.last_id == self.snapshot_id:
+                    # first diff after the snapshot must straddle it
+                    ok = first_id is None or first_id <= self.last_id + 1
+                    if final_id == self.last_id:
+                        self.stats["dropped"] += 1
+                        return True
+                elif prev_final_id is not None:
+                    ok = prev_final_id == self.last_id
+                else:
+                    ok = first_id is None or first_id == self.last_id + 1
+                if not ok:
+                    self.stats["gaps"] += 1
+                    self.invalidate()
+                    return False
+            self._apply_levels(self.bids, bids)
+            self._apply_levels(self.asks, asks)
+            self.bids.trim(self.max_depth)
+            self.asks.trim(self.max_depth)
+            if final_id is not None:
+                self.last_id = final_id
+            self.updated_at = time.time()
+            self.stats["diffs"] += 1
+            if checksum is not None and self.checksum() != int(checksum):
+                self.stats["checksum_errors"] += 1
+                self.invalidate()
+                return False
+            return True
+
+    def invalidate(self):
+        with self.lock:
+            self.synced = False
+            self.buffer = []
+
+    def checksum(self, depth=25):
+        with self.lock:
+            return okx_checksum(self.bids.raw_levels(depth), self.asks.raw_levels(depth), depth)
+
+    # ---------------- queries ----------------
+    def best_bid(self):
+        """(price, size) or None"""
+        with self.lock:
+            return self.bids.best()
+
+    def best_ask(self):
+        with self.lock:
+            return self.asks.best()
+
+    def top(self):
+        """(bid, ask) prices or None if either side is empty / book not synced"""
+        with self.lock:
+            if not self.synced:
+                return None
+            b, a = self.bids.best(), self.asks.best()
+        if b is None or a is None:
+            return None
+        return b[0], a[0]
+
+    def mid(self):
+        t = self.top()
+        return (t[0] + t[1]) / 2.0 if t else None
+
+    def spread(self):
+        t = self.top()
+        return (t[1] - t[0]) if t else None
+
+    def depth_at(self, n=5):
+        """Top n levels per side."""
+        with self.lock:
+            return {"symbol": self.symbol, "bids": self.bids.levels(n), "asks": self.asks.levels(n)}
+
+    def vwap(self, side, size):
+        """
+        Average fill price for a market order of ``size`` walking the book.
+
+        :param side: 'buy' consumes asks, 'sell' consumes bids
+        :return: (vwap, filled_size); filled_size < size when the book is too thin
+        """
+        book_side = self.asks if str(side).lower() == "buy" else self.bids
+        remaining = float(size)
+        cost = 0.0
+        with self.lock:
+            sign, sizes = book_side.sign, book_side.sizes
+            for k in book_side.keys:
+                if remaining <= 0:
+                    break
+                take = min(remaining, sizes[k])
+                cost += take * sign * k
+                remaining -= take
+        filled = float(size) - remaining
+        return (cost / filled if filled > 0 else None), filled
+
+    def price_for_size(self, side, size):
+        """Worst price touched when filling ``size``; None if not enough depth."""
+        book_side = self.asks if str(side).lower() == "buy" else self.bids
+        remaining = float(size)
+        with self.lock:
+            for k in book_side.keys:
+                remaining -= book_side.sizes[k]
+                if remaining <= 0:
+                    return book_side.sign * k
+        return None
+
+    def to_ctos(self, level=None):
+        return self.depth_at(level)
+
+
+class BookManager:
+    """
+    Books for many symbols with background REST resync.
+
+    :param snapshot_fn: callable(symbol) -> (bids, asks, snapshot_id); run in
+        a worker thread whenever a book needs (re)initialisation
+    :param max_age: books not updated for this many seconds count as stale
+    :param resync_backoff: first retry delay when a snapshot does not sync the
+        book; doubles on every failed attempt up to ``max_resync_backoff``.
+        Retries go on until the book syncs, :meth:`remove` drops the symbol or
+        :meth:`stop` is called.
+    """
+
+    def __init__(self, snapshot_fn=None, max_depth=None, keep_raw=False, max_age=10.0,
+                 resync_backoff=1.0, max_resync_backoff=60.0):
+        self.snapshot_fn = snapshot_fn
+        self.max_depth = max_depth
+        self.keep_raw = keep_raw
+        self.max_age = max_age
+        self.resync_backoff = float(resync_backoff)
+        self.max_resync_backoff = float(max_resync_backoff)
+        self.books = {}
+        self._lock = threading.Lock()
+        self._resyncing = {}        # symbol -> (cancel Event, worker thread)
+        self._stopped = False
+        self.resyncs = 0
+        self.resync_errors = 0
+
+    def book(self, symbol):
+        b = self.books.get(symbol)
+        if b is None:
+            with self._lock:
+                b = self.books.get(symbol)
+                if b is None:
+                    b = OrderBook(symbol, max_depth=self.max_depth, keep_raw=self.keep_raw)
+                    self.books[symbol] = b
+        return b
+
+    def get(self, symbol):
+        """Synced, fresh book or None."""
+        b = self.books.get(symbol)
+        if b is None or not b.synced:
+            return None
+        if self.max_age and b.updated_at and time.time() - b.updated_at > self.max_age:
+            return None
+        return b
+
+    def on_diff(self, symbol, bids, asks, first_id=None, final_id=None, prev_final_id=None, checksum=None):
+        b = self.book(symbol)
+        ok = b.apply_diff(bids, asks, first_id, final_id, prev_final_id, checksum)
+        if not b.synced:
+            self.resync(symbol)
+        return ok
+
+    def on_snapshot(self, symbol, bids, asks, snapshot_id=None):
+        return self.book(symbol).apply_snapshot(bids, asks, snapshot_id)
+
+    def invalidate(self, symbol=None):
+        targets = [symbol] if symbol else list(self.books)
+        for s in targets:
+            b = self.books.get(s)
+            if b is not None:
+                b.invalidate()
+
+    def resync(self, symbol):
+        """Fetch a REST snapshot in a daemon thread (one at a time per symbol)."""
+        if self.snapshot_fn is None:
+            return
+        with self._lock:
+            if self._stopped or symbol in self._resyncing:
+                return
+            cancel = threading.Event()
+            worker = threading.Thread(target=self._resync_worker, args=(symbol, cancel), daemon=True,
+                                      name="book-resync-%s" % symbol)
+            self._resyncing[symbol] = (cancel, worker)
+        worker.start()
+
+    def remove(self, symbol):
+        """Drop a symbol's book (e.g. on unsubscribe) and cancel its pending resync."""
+        with self._lock:
+            self.books.pop(symbol, None)
+            pending = self._resyncing.get(symbol)
+        if pending is not None:
+            pending[0].set()
+
+    def stop(self, timeout=5):
+        """Cancel every pending resync and wait for the workers to exit; later resyncs are ignored."""
+        with self._lock:
+            self._stopped = True
+            pending = list(self._resyncing.values())
+        for cancel, _ in pending:
+            cancel.set()
+        for _, worker in pending:
+            worker.join(timeout)
+
+    def _resync_worker(self, symbol, cancel):
+        # the symbol stays in _resyncing while backing off, so diffs arriving
+        # on the unsynced book cannot start another snapshot request early
+        delay = self.resync_backoff
+        try:
+            # give the feed a moment to buffer diffs that straddle the snapshot
+            while not cancel.wait(0.2):
+                try:
+                    bids, asks, snapshot_id = self.snapshot_fn(symbol)
+                    if cancel.is_set():
+                        return
+                    self.resyncs += 1
+                    self.book(symbol).apply_snapshot(bids, asks, snapshot_id)
+                except Exception as e:
+                    self.resync_errors += 1
+                    print("[BookManager] resync %s failed: %s" % (symbol, e))
+                b = self.books.get(symbol)
+                if (b is not None and b.synced) or cancel.wait(delay):
+                    return
+                delay = min(self.max_resync_backoff, delay * 2)
+        finally:
+            with self._lock:
+                self._resyncing.pop(symbol, None)
+
+    def get_stats(self):
+        out = {"resyncs": self.resyncs, "resync_errors": self.resync_errors, "books": {}}
+        for s, b in list(self.books.items()):
+            st = dict(b.stats)
+            st.update(synced=b.synced, levels=(len(b.bids.keys), len(b.asks.keys)), updated_at=b.updated_at)
+            out["books"][s] = st
+        return out
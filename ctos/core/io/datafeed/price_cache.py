@@ -0,0 +1,141 @@
+"""
+Shared last-price cache for driver ``get_price_now``.
+
+Prices are filled in bulk from an exchange's all-tickers endpoint: one REST
+call refreshes every symbol of a group (e.g. OKX instType SWAP). A lookup
+older than ``max_age`` triggers a refresh of its group. Concurrent misses
+share one in-flight refresh instead of each hitting the exchange. Symbols
+missing from the bulk response fall back to a single-symbol fetch.
+
+Caches are shared per exchange through :func:`get_price_cache`, so every
+account/driver of the same exchange reuses the same snapshot.
+"""
+import threading
+import time
+
+
+class PriceCache:
+    """
+    :param fetch_all: callable(group) -> {symbol: price}; one bulk request
+    :param fetch_one: optional callable(symbol) -> price, used when the bulk
+        snapshot lacks the symbol
+    :param group_fn: callable(symbol) -> group key passed to ``fetch_all``
+    :param max_age: seconds a price stays valid; 0 disables caching
+    """
+
+    def __init__(self, fetch_all, fetch_one=None, group_fn=None, max_age=1.0, name=""):
+        self.fetch_all = fetch_all
+        self.fetch_one = fetch_one
+        self.group_fn = group_fn or (lambda symbol: None)
+        self.max_age = float(max_age)
+        self.name = name
+        self._prices = {}           # symbol -> (price, ts)
+        self._group_ts = {}         # group -> last bulk refresh ts
+        self._group_locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bulk_refreshes = 0
+        self.single_fetches = 0
+        self.errors = 0
+
+    def _group_lock(self, group):
+        with self._lock:
+            lk = self._group_locks.get(group)
+            if lk is None:
+                lk = self._group_locks[group] = threading.Lock()
+            return lk
+
+    def _fresh(self, symbol, max_age, now=None):
+        entry = self._prices.get(symbol)
+        if entry is None:
+            return None
+        if (now or time.time()) - entry[1] > max_age:
+            return None
+        return entry[0]
+
+    def put(self, symbol, price, ts=None):
+        self._prices[symbol] = (float(price), ts or time.time())
+
+    def put_many(self, prices, ts=None):
+        ts = ts or time.time()
+        for symbol, price in prices.items():
+            self._prices[symbol] = (float(price), ts)
+
+    def refresh(self, group=None):
+        """Bulk refresh one group now; returns number of prices updated."""
+        prices = self.fetch_all(group)
+        ts = time.time()
+        self.put_many(prices or {}, ts)
+        with self._lock:
+            self._group_ts[group] = ts
+            self.bulk_refreshes += 1
+        return len(prices or {})
+
+    def get(self, symbol, max_age=None):
+        """
+        :return: price (float) or None if it could not be fetched
+        """
+        max_age = self.max_age if max_age is None else float(max_age)
+        if max_age > 0:
+            price = self._fresh(symbol, max_age)
+            if price is not None:
+                self.hits += 1
+                return price
+        self.misses += 1
+
+        if max_age > 0:
+            group = self.group_fn(symbol)
+            lk = self._group_lock(group)
+            with lk:
+                # another thread may have refreshed while we waited
+                price = self._fresh(symbol, max_age)
+                if price is not None:
+                    return price
+                group_ts = self._group_ts.get(group, 0)
+                if time.time() - group_ts > max_age:
+                    try:
+                        self.refresh(group)
+                    except Exception as e:
+                        self.errors += 1
+                        print(f"[PriceCache {self.name}] bulk refresh failed: {e}")
+                price = self._fresh(symbol, max_age)
+                if price is not None:
+                    return price
+
+        if self.fetch_one is None:
+            return None
+        price = self.fetch_one(symbol)
+        self.single_fetches += 1
+        if price is not None:
+            self.put(symbol, price)
+        return price
+
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "symbols": len(self._prices),
+            "max_age": self.max_age,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+            "bulk_refreshes": self.bulk_refreshes,
+            "single_fetches": self.single_fetches,
+            "errors": self.errors,
+        }
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_price_cache(name, fetch_all, fetch_one=None, group_fn=None, max_age=1.0):
+    """Process-wide cache per exchange name; the first caller's fetchers are used."""
+    with _CACHES_LOCK:
+        cache = _CACHES.get(name)
+        if cache is None:
+            cache = PriceCache(fetch_all, fetch_one=fetch_one, group_fn=group_fn,
+                               max_age=max_age, name=name)
+            _CACHES[name] = cache
+        return cache
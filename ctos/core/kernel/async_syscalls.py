@@ -0,0 +1,184 @@
+"""
+Asyncio adapters for TradingSyscalls drivers.
+
+:class:`AsyncSyscalls` exposes every syscall of a synchronous driver as a
+coroutine. Calls run on one process-wide I/O thread pool (sized for blocking
+HTTP, not CPU count), and each (exchange, account) is bounded by its own
+``asyncio.Semaphore``, so one slow or throttled account cannot take every
+worker. The semaphore counts HTTP requests in flight, not adapter calls:
+batch syscalls and other fan-outs (see :meth:`AsyncSyscalls.run_sync_batch`)
+hold ``min(max_workers, max_concurrency)`` slots and run with that many
+workers, so an account never has more than ``max_concurrency`` requests
+outstanding. The driver's rate limiter, price cache and order bookkeeping keep
+working unchanged because the same driver methods are called.
+
+Drivers with a native asyncio client can subclass the adapter and override
+individual syscalls with real coroutines (see the Backpack adapter).
+"""
+import asyncio
+import contextlib
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+SYSCALLS = (
+    "symbols", "exchange_limits", "fees",
+    "get_price_now", "get_orderbook", "get_klines",
+    "place_order", "buy", "sell", "amend_order", "revoke_order",
+    "get_order_status", "get_open_orders", "cancel_all",
+    "fetch_balance", "get_position", "close_all_positions",
+    "place_orders_batch", "cancel_orders_batch", "amend_orders_batch",
+)
+
+# syscalls that fan out internally over ``max_workers`` threads
+BATCH_SYSCALLS = ("place_orders_batch", "cancel_orders_batch", "amend_orders_batch")
+
+DEFAULT_IO_WORKERS = 64
+DEFAULT_ACCOUNT_CONCURRENCY = 16
+DEFAULT_BATCH_WORKERS = 8
+
+_IO_EXECUTOR = None
+_IO_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_io_executor(max_workers=DEFAULT_IO_WORKERS):
+    """Process-wide thread pool for blocking driver calls; the first caller's size wins."""
+    global _IO_EXECUTOR
+    with _IO_EXECUTOR_LOCK:
+        if _IO_EXECUTOR is None:
+            _IO_EXECUTOR = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ctos-io")
+        return _IO_EXECUTOR
+
+
+_SEMAPHORES = {}
+_BATCH_LOCKS = {}
+_SEMAPHORES_LOCK = threading.Lock()
+
+
+def get_account_semaphore(exchange, account, limit=DEFAULT_ACCOUNT_CONCURRENCY):
+    """
+    Semaphore bounding in-flight calls of one account. Semaphores belong to
+    an event loop, so they are keyed by the running loop as well.
+    """
+    key = (id(asyncio.get_running_loop()), str(exchange).lower(), account)
+    with _SEMAPHORES_LOCK:
+        sem = _SEMAPHORES.get(key)
+        if sem is None:
+            sem = _SEMAPHORES[key] = asyncio.Semaphore(limit)
+            _BATCH_LOCKS[key] = asyncio.Lock()
+        return sem
+
+
+def _account_batch_lock(exchange, account):
+    """Serializes multi-slot acquisitions of one account's semaphore (see AsyncSyscalls._slots)."""
+    key = (id(asyncio.get_running_loop()), str(exchange).lower(), account)
+    with _SEMAPHORES_LOCK:
+        return _BATCH_LOCKS[key]
+
+
+class AsyncSyscalls:
+    """
+    :param driver: a TradingSyscalls driver instance
+    :param max_concurrency: in-flight calls allowed for this driver's account
+    :param executor: thread pool for the blocking calls, default the shared one
+
+    Syscalls are awaited (``await adapter.place_order(...)``); any other
+    attribute (``cex``, ``_norm_symbol``, ``order_id_to_symbol``, ...) is read
+    from the driver as is.
+    """
+
+    def __init__(self, driver, max_concurrency=DEFAULT_ACCOUNT_CONCURRENCY, executor=None):
+        self.driver = driver
+        self.exchange = getattr(driver, "cex", "")
+        self.account = getattr(driver, "account_id", 0)
+        self.max_concurrency = max_concurrency
+        self.executor = executor or get_io_executor()
+
+    @property
+    def semaphore(self):
+        return get_account_semaphore(self.exchange, self.account, self.max_concurrency)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        """Run a blocking callable on the I/O pool under the account semaphore."""
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    @contextlib.asynccontextmanager
+    async def _slots(self, n):
+        """
+        Hold ``n`` slots of the account semaphore. Multi-slot grabs are
+        serialized per account so two fan-outs each holding part of the slots
+        cannot wait on each other forever.
+        """
+        sem = self.semaphore
+        taken = 0
+        try:
+            if n == 1:
+                await sem.acquire()
+                taken = 1
+            else:
+                async with _account_batch_lock(self.exchange, self.account):
+                    for _ in range(n):
+                        await sem.acquire()
+                        taken += 1
+            yield
+        finally:
+            for _ in range(taken):
+                sem.release()
+
+    async def run_sync_batch(self, fn, *args, max_workers=DEFAULT_BATCH_WORKERS, **kwargs):
+        """
+        Run a blocking callable that fans out over ``max_workers`` threads
+        (batch syscalls, ExecutionEngine.plan_target_positions ...). The
+        worker count is capped at ``max_concurrency`` and that many semaphore
+        slots are held for the whole call.
+        """
+        n = max(1, min(int(max_workers or 1), self.max_concurrency))
+        async with self._slots(n):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, max_workers=n, **kwargs))
+
+    async def call(self, name, *args, **kwargs):
+        if name in BATCH_SYSCALLS:
+            return await self.run_sync_batch(getattr(self.driver, name), *args, **kwargs)
+        return await self.run_sync(getattr(self.driver, name), *args, **kwargs)
+
+    def __getattr__(self, name):
+        if name in SYSCALLS:
+            return functools.partial(self.call, name)
+        return getattr(self.driver, name)
+
+    async def gather(self, name, items):
+        """
+        Call syscall ``name`` once per item (a tuple of args or a dict of kwargs),
+        results in input order; an exception becomes (None, exception), like run_concurrent.
+        """
+        fn = getattr(self, name)
+
+        async def _one(item):
+            try:
+                return await (fn(**item) if isinstance(item, dict) else fn(*item))
+            except Exception as e:
+                return None, e
+
+        return await asyncio.gather(*[_one(it) for it in items])
+
+    async def close(self):
+        pass
+
+
+def to_async(driver, **kwargs):
+    """
+    Pick the driver's native adapter when it has one (``driver.async_adapter``),
+    else the generic one. A native adapter whose optional dependency is missing
+    (e.g. aiohttp) falls back to the generic adapter.
+    """
+    factory = getattr(driver, "async_adapter", None)
+    if callable(factory):
+        try:
+            return factory(**kwargs)
+        except (ImportError, RuntimeError) as e:
+            print("[AsyncSyscalls] native adapter unavailable for %s, using thread pool: %s"
+                  % (getattr(driver, "cex", driver), e))
+    return AsyncSyscalls(driver, **kwargs)
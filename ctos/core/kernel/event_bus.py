@@ -1,10 +1,333 @@
 """
-Trivial event bus placeholder (pub/sub).
-Replace with a real bus or use asyncio signals.
+In-process asyncio pub/sub event bus.
+
+Topics are dot-separated strings such as ``md.okx.BTC-USDT-SWAP.ticker``.
+Subscriptions use shell-style wildcards (``md.okx.*``, ``md.*.*.ticker``,
+``*``); matching is done with :func:`fnmatch.fnmatchcase`, and the list of
+subscriptions for a concrete topic is cached until the subscription set
+changes, so fan-out of a hot topic is a dict lookup.
+
+Each subscriber owns a bounded queue and a worker task, so one slow consumer
+never stalls the publisher or the other consumers. What happens when a queue
+is full is decided per subscription:
+
+- ``drop_oldest``: evict the oldest queued message (default, good for quotes)
+- ``drop_newest``: discard the incoming message
+- ``block``: ``publish_async`` waits for room (backpressure); the sync
+  ``publish`` cannot wait and counts the message as dropped
+
+Workers drain up to ``batch_size`` messages per wake-up. A subscription made
+with ``batch=True`` receives the list of ``(topic, message)`` pairs in one
+call, otherwise the handler is called once per message. Handlers may be
+plain functions or coroutine functions.
+
+``publish_threadsafe`` lets synchronous driver threads feed the bus running
+in another thread's loop.
 """
+import asyncio
+import inspect
+import time
+from collections import deque
+from fnmatch import fnmatchcase
+
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+def _percentile(samples, q):
+    if not samples:
+        return 0.0
+    data = sorted(samples)
+    idx = min(len(data) - 1, max(0, int(round(q / 100.0 * (len(data) - 1)))))
+    return data[idx]
+
+
+class Subscription:
+    """One subscriber: pattern, handler, bounded queue and its worker stats."""
+
+    LATENCY_SAMPLES = 4096
+
+    def __init__(self, bus, pattern, handler, maxsize=1024, policy=DROP_OLDEST,
+                 batch_size=64, batch=False, name=None):
+        if policy not in POLICIES:
+            raise ValueError("unknown policy %r, expected one of %s" % (policy, POLICIES))
+        self.bus = bus
+        self.pattern = pattern
+        self.handler = handler
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self.batch_size = max(1, int(batch_size))
+        self.batch = batch
+        self.name = name or getattr(handler, "__name__", repr(handler))
+        self.is_async = inspect.iscoroutinefunction(handler)
+        self.queue = asyncio.Queue(self.maxsize)
+        self.task = None
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.high_watermark = 0
+        self.latencies = deque(maxlen=self.LATENCY_SAMPLES)
+
+    def matches(self, topic):
+        return fnmatchcase(topic, self.pattern)
+
+    def offer(self, envelope):
+        """Non-blocking enqueue following the drop policy; returns True if queued."""
+        q = self.queue
+        if q.full():
+            if self.policy == DROP_OLDEST:
+                try:
+                    q.get_nowait()
+                    q.task_done()
+                except asyncio.QueueEmpty:
+                    pass
+                self.dropped += 1
+            else:
+                self.dropped += 1
+                return False
+        q.put_nowait(envelope)
+        size = q.qsize()
+        if size > self.high_watermark:
+            self.high_watermark = size
+        return True
+
+    async def put(self, envelope):
+        """Enqueue, waiting for room when the policy is ``block``."""
+        if self.policy != BLOCK:
+            return self.offer(envelope)
+        await self.queue.put(envelope)
+        size = self.queue.qsize()
+        if size > self.high_watermark:
+            self.high_watermark = size
+        return True
+
+    async def run(self):
+        q = self.queue
+        while True:
+            items = [await q.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(q.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            try:
+                await self._dispatch(items)
+            finally:
+                for _ in items:
+                    q.task_done()
+
+    async def _dispatch(self, items):
+        now = time.perf_counter()
+        for _, _, ts in items:
+            self.latencies.append(now - ts)
+        if self.batch:
+            try:
+                res = self.handler([(topic, msg) for topic, msg, _ in items])
+                if self.is_async:
+                    await res
+                self.delivered += len(items)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                self.bus._on_handler_error(self, e)
+            return
+        # one failing message must not drop the rest of the drained batch
+        for topic, msg, _ in items:
+            try:
+                res = self.handler(topic, msg)
+                if self.is_async:
+                    await res
+                self.delivered += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                self.bus._on_handler_error(self, e)
+
+    def stats(self):
+        lat = list(self.latencies)
+        return {
+            "pattern": self.pattern,
+            "name": self.name,
+            "policy": self.policy,
+            "queued": self.queue.qsize(),
+            "maxsize": self.maxsize,
+            "high_watermark": self.high_watermark,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "p50_ms": _percentile(lat, 50) * 1000.0,
+            "p99_ms": _percentile(lat, 99) * 1000.0,
+        }
+
+
 class EventBus:
+    """
+    Asyncio pub/sub bus with wildcard topics and per-subscriber queues.
+
+    Create it inside a running loop (or call :meth:`start` from one). Sync code
+    in other threads should use :meth:`publish_threadsafe`.
+    """
+
+    def __init__(self, default_maxsize=1024, default_policy=DROP_OLDEST,
+                 default_batch_size=64, on_error=None):
+        self.default_maxsize = default_maxsize
+        self.default_policy = default_policy
+        self.default_batch_size = default_batch_size
+        self.on_error = on_error
+        self.loop = None
+        self._subs = []
+        self._routes = {}
+        self.published = 0
+        self.unrouted = 0
+        self._running = False
+
+    # ---- lifecycle ----
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self._running = True
+        for sub in self._subs:
+            self._spawn(sub)
+        return self
+
+    async def stop(self, drain=True, timeout=5.0):
+        """Stop workers; with ``drain`` wait (bounded) for queued messages first."""
+        if drain:
+            pending = [s.queue.join() for s in self._subs if s.task is not None]
+            if pending:
+                try:
+                    await asyncio.wait_for(asyncio.gather(*pending), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        tasks = [s.task for s in self._subs if s.task is not None]
+        for t in tasks:
+            t.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for s in self._subs:
+            s.task = None
+        self._running = False
+
+    async def __aenter__(self):
+        return self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop(drain=exc_type is None)
+
+    def _spawn(self, sub):
+        if sub.task is None and self._running:
+            sub.task = self.loop.create_task(sub.run())
+
+    # ---- subscriptions ----
+    def subscribe(self, topic, handler, maxsize=None, policy=None,
+                  batch_size=None, batch=False, name=None):
+        """
+        Subscribe ``handler`` to ``topic`` (wildcards allowed).
+
+        :param handler: ``handler(topic, message)`` or, with ``batch=True``,
+            ``handler([(topic, message), ...])``; may be a coroutine function
+        :param maxsize: queue bound for this subscriber
+        :param policy: ``drop_oldest`` / ``drop_newest`` / ``block``
+        :param batch_size: max messages drained per worker wake-up
+        :return: Subscription (pass it to :meth:`unsubscribe`)
+        """
+        sub = Subscription(
+            self, topic, handler,
+            maxsize=self.default_maxsize if maxsize is None else maxsize,
+            policy=policy or self.default_policy,
+            batch_size=self.default_batch_size if batch_size is None else batch_size,
+            batch=batch, name=name,
+        )
+        self._subs.append(sub)
+        self._routes.clear()
+        self._spawn(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        if sub in self._subs:
+            self._subs.remove(sub)
+            self._routes.clear()
+            if sub.task is not None:
+                sub.task.cancel()
+                sub.task = None
+
+    def _route(self, topic):
+        subs = self._routes.get(topic)
+        if subs is None:
+            subs = [s for s in self._subs if s.matches(topic)]
+            self._routes[topic] = subs
+        return subs
+
+    # ---- publishing ----
     def publish(self, topic, message):
-        pass
+        """
+        Non-blocking fan-out from the loop thread.
+
+        :return: number of subscribers that accepted the message
+        """
+        self.published += 1
+        subs = self._route(topic)
+        if not subs:
+            self.unrouted += 1
+            return 0
+        envelope = (topic, message, time.perf_counter())
+        accepted = 0
+        for sub in subs:
+            if sub.offer(envelope):
+                accepted += 1
+        return accepted
+
+    def publish_many(self, items):
+        """Publish an iterable of ``(topic, message)`` pairs with one timestamp."""
+        ts = time.perf_counter()
+        accepted = 0
+        for topic, message in items:
+            self.published += 1
+            subs = self._route(topic)
+            if not subs:
+                self.unrouted += 1
+                continue
+            envelope = (topic, message, ts)
+            for sub in subs:
+                if sub.offer(envelope):
+                    accepted += 1
+        return accepted
+
+    async def publish_async(self, topic, message):
+        """Fan-out that honours ``block`` subscribers by waiting for queue room."""
+        self.published += 1
+        subs = self._route(topic)
+        if not subs:
+            self.unrouted += 1
+            return 0
+        envelope = (topic, message, time.perf_counter())
+        accepted = 0
+        for sub in subs:
+            if await sub.put(envelope):
+                accepted += 1
+        return accepted
+
+    def publish_threadsafe(self, topic, message):
+        """Publish from a non-loop thread (e.g. a sync driver poller)."""
+        if self.loop is None:
+            raise RuntimeError("EventBus not started")
+        self.loop.call_soon_threadsafe(self.publish, topic, message)
+
+    # ---- introspection ----
+    def _on_handler_error(self, sub, err):
+        if self.on_error is not None:
+            try:
+                self.on_error(sub, err)
+            except Exception:
+                pass
 
-    def subscribe(self, topic, handler):
-        pass
+    def stats(self):
+        return {
+            "published": self.published,
+            "unrouted": self.unrouted,
+            "subscribers": [s.stats() for s in self._subs],
+        }
@@ -0,0 +1,273 @@
+"""
+Process-wide request rate limiting per exchange / account / endpoint class.
+
+Each (exchange, account) pair owns a :class:`RateLimiter` with a few token
+buckets sized after the exchange's published limits. Driver methods are
+mapped to endpoint classes (``order``, ``cancel``, ``amend``, ``query``,
+``market``, ``account``); every class draws from one bucket, several classes
+may share a bucket (Binance request weight).
+
+Callers waiting for the same bucket are served by priority, then FIFO:
+cancels go first, then orders/amends, then queries, account and market data.
+Every acquire records its queueing delay, so :meth:`RateLimiter.get_stats`
+shows whether a strategy is throttled by the limiter rather than by the
+exchange.
+
+:func:`install_rate_limiter` wraps a driver instance's methods in place, so
+all engines sharing the same account go through the same buckets. Calls made
+from inside an already-limited call (e.g. the thread-pool fan-out of a batch
+whose weight was charged up front) are not charged twice.
+"""
+import asyncio
+import contextvars
+import functools
+import heapq
+import itertools
+import threading
+import time
+
+CANCEL = "cancel"
+ORDER = "order"
+AMEND = "amend"
+QUERY = "query"
+ACCOUNT = "account"
+MARKET = "market"
+
+PRIORITIES = {CANCEL: 0, ORDER: 1, AMEND: 1, QUERY: 2, ACCOUNT: 2, MARKET: 3}
+
+# exchange -> {"buckets": {name: (capacity, period_seconds)}, "classes": {class: (bucket, weight)}}
+# Figures follow the exchanges' documented per-account limits, kept slightly
+# under the real ceiling.
+EXCHANGE_LIMITS = {
+    "okx": {
+        "buckets": {
+            "trade": (55, 2.0),        # place / amend: 60 req / 2s
+            "cancel": (55, 2.0),       # cancel: 60 req / 2s
+            "query": (18, 2.0),        # order info / pending orders: 20 req / 2s
+            "account": (9, 2.0),       # balance / positions: 10 req / 2s
+            "market": (18, 2.0),       # tickers / books / candles: 20 req / 2s
+        },
+        "classes": {
+            ORDER: ("trade", 1), AMEND: ("trade", 1), CANCEL: ("cancel", 1),
+            QUERY: ("query", 1), ACCOUNT: ("account", 1), MARKET: ("market", 1),
+        },
+    },
+    "binance": {
+        "buckets": {
+            "orders": (280, 10.0),     # USD-M: 300 orders / 10s
+            "weight": (2200, 60.0),    # USD-M: 2400 request weight / min
+        },
+        "classes": {
+            ORDER: ("orders", 1), AMEND: ("orders", 1), CANCEL: ("weight", 1),
+            QUERY: ("weight", 1), ACCOUNT: ("weight", 5), MARKET: ("weight", 2),
+        },
+    },
+    "backpack": {
+        "buckets": {
+            "trade": (20, 1.0),
+            "query": (10, 1.0),
+            "market": (20, 1.0),
+        },
+        "classes": {
+            # amend is query + cancel + place on Backpack
+            ORDER: ("trade", 1), AMEND: ("trade", 3), CANCEL: ("trade", 1),
+            QUERY: ("query", 1), ACCOUNT: ("query", 1), MARKET: ("market", 1),
+        },
+    },
+}
+# Aster futures mirrors the Binance USD-M API and its limits
+EXCHANGE_LIMITS["aster"] = EXCHANGE_LIMITS["binance"]
+DEFAULT_LIMITS = {
+    "buckets": {"all": (10, 1.0)},
+    "classes": {c: ("all", 1) for c in PRIORITIES},
+}
+
+# driver method -> endpoint class; batch methods are charged one unit per item
+METHOD_CLASSES = {
+    "place_order": ORDER, "buy": ORDER, "sell": ORDER,
+    "amend_order": AMEND,
+    "revoke_order": CANCEL, "cancel_all": CANCEL,
+    "get_order_status": QUERY, "get_open_orders": QUERY,
+    "fetch_balance": ACCOUNT, "get_position": ACCOUNT,
+    "get_orderbook": MARKET, "get_klines": MARKET, "symbols": MARKET,
+    "_fetch_all_prices": MARKET, "_fetch_one_price": MARKET, "_fetch_all_limits": MARKET,
+}
+BATCH_METHOD_CLASSES = {
+    "place_orders_batch": ORDER,
+    "amend_orders_batch": AMEND,
+    "cancel_orders_batch": CANCEL,
+}
+
+_limited = contextvars.ContextVar("ctos_rate_limited", default=False)
+
+
+class TokenBucket:
+    """``capacity`` tokens refilled continuously over ``period`` seconds."""
+
+    __slots__ = ("capacity", "rate", "tokens", "ts", "waiters")
+
+    def __init__(self, capacity, period):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / float(period)
+        self.tokens = self.capacity
+        self.ts = time.monotonic()
+        self.waiters = []   # heap of (priority, seq)
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.ts) * self.rate)
+        self.ts = now
+
+    def wait_time(self, weight):
+        return max(0.0, (weight - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    """
+    :param exchange: key into ``EXCHANGE_LIMITS`` (case-insensitive)
+    :param account: account id, only used for naming
+    :param limits: override for the exchange's limits table
+    """
+
+    def __init__(self, exchange, account=0, limits=None):
+        self.exchange = str(exchange).lower()
+        self.account = account
+        table = limits or EXCHANGE_LIMITS.get(self.exchange, DEFAULT_LIMITS)
+        self.classes = dict(table["classes"])
+        self.buckets = {name: TokenBucket(cap, period) for name, (cap, period) in table["buckets"].items()}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self.stats = {}
+
+    def acquire(self, endpoint_class, weight=None, priority=None, timeout=None):
+        """
+        Block until the endpoint class's bucket has ``weight`` tokens.
+
+        :return: seconds spent queueing, or None if ``timeout`` expired
+        """
+        bucket_name, default_weight = self.classes.get(endpoint_class, next(iter(self.classes.values())))
+        bucket = self.buckets[bucket_name]
+        weight = min(float(default_weight if weight is None else weight), bucket.capacity)
+        prio = PRIORITIES.get(endpoint_class, 2) if priority is None else priority
+        me = (prio, next(self._seq))
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        with self._cond:
+            heapq.heappush(bucket.waiters, me)
+            try:
+                while True:
+                    now = time.monotonic()
+                    bucket.refill(now)
+                    if bucket.waiters[0] == me and bucket.tokens >= weight:
+                        bucket.tokens -= weight
+                        break
+                    if deadline is not None and now >= deadline:
+                        self._record(endpoint_class, now - start, timed_out=True)
+                        return None
+                    wait = bucket.wait_time(weight) if bucket.waiters[0] == me else None
+                    if deadline is not None:
+                        wait = min(wait, deadline - now) if wait is not None else deadline - now
+                    self._cond.wait(wait)
+            finally:
+                bucket.waiters.remove(me)
+                heapq.heapify(bucket.waiters)
+                self._cond.notify_all()
+            waited = time.monotonic() - start
+            self._record(endpoint_class, waited)
+        return waited
+
+    async def acquire_async(self, endpoint_class, weight=None, priority=None, timeout=None):
+        """:meth:`acquire` for coroutines; the blocking wait runs on the loop's default executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(
+            self.acquire, endpoint_class, weight=weight, priority=priority, timeout=timeout))
+
+    def penalize(self, endpoint_class, seconds):
+        """Drain a bucket after the exchange answered 429 / rate-limit errors."""
+        bucket_name, _ = self.classes.get(endpoint_class, next(iter(self.classes.values())))
+        bucket = self.buckets[bucket_name]
+        with self._cond:
+            bucket.refill(time.monotonic())
+            bucket.tokens = min(bucket.tokens, -seconds * bucket.rate)
+
+    def _record(self, endpoint_class, waited, timed_out=False):
+        s = self.stats.get(endpoint_class)
+        if s is None:
+            s = self.stats[endpoint_class] = {"calls": 0, "queued": 0, "timeouts": 0,
+                                              "wait_total": 0.0, "wait_max": 0.0}
+        if timed_out:
+            s["timeouts"] += 1
+            return
+        s["calls"] += 1
+        if waited > 0.001:
+            s["queued"] += 1
+        s["wait_total"] += waited
+        s["wait_max"] = max(s["wait_max"], waited)
+
+    def get_stats(self):
+        with self._cond:
+            now = time.monotonic()
+            out = {"exchange": self.exchange, "account": self.account, "classes": {}, "buckets": {}}
+            for cls, s in self.stats.items():
+                s = dict(s)
+                s["wait_avg"] = s["wait_total"] / s["calls"] if s["calls"] else 0.0
+                out["classes"][cls] = s
+            for name, b in self.buckets.items():
+                b.refill(now)
+                out["buckets"][name] = {"tokens": b.tokens, "capacity": b.capacity, "waiting": len(b.waiters)}
+            return out
+
+    def wrap(self, fn, endpoint_class, batch=False):
+        """Decorate one callable; batch callables are charged len(first argument)."""
+        @functools.wraps(fn)
+        def limited(*args, **kwargs):
+            if _limited.get():
+                return fn(*args, **kwargs)
+            weight = None
+            if batch:
+                items = args[0] if args else next(iter(kwargs.values()), ())
+                weight = self.classes.get(endpoint_class, (None, 1))[1] * max(1, len(items or ()))
+            self.acquire(endpoint_class, weight=weight)
+            token = _limited.set(True)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _limited.reset(token)
+        limited.__rate_limited__ = True
+        return limited
+
+
+_LIMITERS = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_rate_limiter(exchange, account=0, limits=None):
+    """Shared limiter per (exchange, account); the first caller's limits win."""
+    key = (str(exchange).lower(), account)
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(key)
+        if limiter is None:
+            limiter = _LIMITERS[key] = RateLimiter(exchange, account, limits=limits)
+        return limiter
+
+
+def install_rate_limiter(driver, exchange=None, account=None, limits=None, methods=None):
+    """
+    Route a driver instance's REST methods through the shared limiter of its
+    exchange/account. Safe to call more than once.
+
+    :param methods: extra {method_name: endpoint_class} for this driver, e.g.
+                    ``get_price_now`` on drivers without a price cache
+    :return: the RateLimiter
+    """
+    exchange = exchange or getattr(driver, "cex", "")
+    account = getattr(driver, "account_id", 0) if account is None else account
+    limiter = get_rate_limiter(exchange, account, limits=limits)
+    table = dict(METHOD_CLASSES, **(methods or {}))
+    for name, cls in list(table.items()) + list(BATCH_METHOD_CLASSES.items()):
+        fn = getattr(driver, name, None)
+        if fn is None or getattr(fn, "__rate_limited__", False):
+            continue
+        setattr(driver, name, limiter.wrap(fn, cls, batch=name in BATCH_METHOD_CLASSES))
+    driver.rate_limiter = limiter
+    return limiter
+
@@ -1,9 +1,375 @@
 """
-Simple placeholder scheduler (supervisor/orchestrator).
+Strategy supervisor: runs strategy "processes" on a shared tick loop.
+
+A process is a named tick callable plus an interval. The scheduler keeps a
+heap of next-due times, launches due ticks in priority order (lower class
+first) up to ``max_concurrent`` at a time and reschedules each process when
+its tick returns, so a process never overlaps itself.
+
+Tick callables can be:
+
+- coroutine functions: awaited on the loop (``mode="task"``)
+- plain functions: run on a thread pool so blocking driver calls do not
+  stall other processes (``mode="thread"``, the default for sync callables)
+- picklable plain functions: run on a process pool (``mode="process"``)
+
+Return value of a tick: ``None`` -> next tick after ``interval``; a number ->
+next tick after that many seconds; ``False`` -> the process is finished.
+
+Every tick is measured against the process budget (defaults to its
+interval). Overruns are counted and, with ``hard_budget=True``, async ticks
+are cancelled at the budget. Missed ticks are skipped rather than queued up.
+``stats()`` reports per-process tick counts, wall latency percentiles,
+start lateness, overruns and CPU time.
 """
+import asyncio
+import heapq
+import inspect
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+PRIORITY_REALTIME = 0
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 20
+PRIORITY_LOW = 30
+PRIORITY_BATCH = 40
+
+PRIORITY_CLASSES = {
+    "realtime": PRIORITY_REALTIME,
+    "high": PRIORITY_HIGH,
+    "normal": PRIORITY_NORMAL,
+    "low": PRIORITY_LOW,
+    "batch": PRIORITY_BATCH,
+}
+
+
+def _timed_call(fn, args, kwargs):
+    """Run ``fn`` and return (result, cpu_seconds); executed inside the worker."""
+    c0 = time.thread_time()
+    result = fn(*args, **kwargs)
+    return result, time.thread_time() - c0
+
+
+def _timed_call_process(fn, args, kwargs):
+    c0 = time.process_time()
+    result = fn(*args, **kwargs)
+    return result, time.process_time() - c0
+
+
+def _percentile(samples, q):
+    if not samples:
+        return 0.0
+    data = sorted(samples)
+    idx = min(len(data) - 1, max(0, int(round(q / 100.0 * (len(data) - 1)))))
+    return data[idx]
+
+
+class StrategyProcess:
+    """A scheduled strategy with its own budget and accounting."""
+
+    SAMPLES = 1024
+
+    def __init__(self, name, tick, interval=1.0, budget=None, priority="normal",
+                 mode=None, hard_budget=False, args=(), kwargs=None):
+        if isinstance(priority, str):
+            if priority not in PRIORITY_CLASSES:
+                raise ValueError("unknown priority class %r" % priority)
+            priority = PRIORITY_CLASSES[priority]
+        is_async = inspect.iscoroutinefunction(tick)
+        if mode is None:
+            mode = "task" if is_async else "thread"
+        if mode not in ("task", "thread", "process"):
+            raise ValueError("unknown mode %r" % mode)
+        if mode == "task" and not is_async:
+            raise ValueError("mode='task' requires a coroutine function")
+        if mode != "task" and is_async:
+            raise ValueError("coroutine ticks must run with mode='task'")
+        self.name = name
+        self.tick = tick
+        self.interval = float(interval)
+        self.budget = float(budget) if budget is not None else self.interval
+        self.priority = int(priority)
+        self.mode = mode
+        self.hard_budget = hard_budget
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs or {})
+
+        self.next_due = 0.0
+        self.running = False
+        self.finished = False
+        self.started_at = None
+        self.ticks = 0
+        self.errors = 0
+        self.last_error = None
+        self.overruns = 0
+        self.overrun_time = 0.0
+        self.cancelled = 0
+        self.skipped = 0
+        self.cpu_time = 0.0
+        self.wall_time = 0.0
+        self.last_latency = 0.0
+        self.latencies = deque(maxlen=self.SAMPLES)
+        self.lateness = deque(maxlen=self.SAMPLES)
+
+    def record(self, wall, cpu, late):
+        self.ticks += 1
+        self.wall_time += wall
+        self.cpu_time += cpu
+        self.last_latency = wall
+        self.latencies.append(wall)
+        self.lateness.append(late)
+        if wall > self.budget:
+            self.overruns += 1
+            self.overrun_time += wall - self.budget
+
+    def stats(self):
+        lat = list(self.latencies)
+        late = list(self.lateness)
+        alive = (time.monotonic() - self.started_at) if self.started_at else 0.0
+        return {
+            "name": self.name,
+            "mode": self.mode,
+            "priority": self.priority,
+            "interval": self.interval,
+            "budget": self.budget,
+            "ticks": self.ticks,
+            "errors": self.errors,
+            "last_error": repr(self.last_error) if self.last_error else None,
+            "overruns": self.overruns,
+            "overrun_time": self.overrun_time,
+            "cancelled": self.cancelled,
+            "skipped": self.skipped,
+            "last_ms": self.last_latency * 1000.0,
+            "avg_ms": (self.wall_time / self.ticks * 1000.0) if self.ticks else 0.0,
+            "p99_ms": _percentile(lat, 99) * 1000.0,
+            "lateness_p99_ms": _percentile(late, 99) * 1000.0,
+            "cpu_time": self.cpu_time,
+            "cpu_pct": (self.cpu_time / alive * 100.0) if alive > 0 else 0.0,
+            "busy_pct": (self.wall_time / alive * 100.0) if alive > 0 else 0.0,
+            "finished": self.finished,
+        }
+
+
 class Scheduler:
+    """
+    Supervisor for strategy processes.
+
+    Usage::
+
+        sch = Scheduler(max_concurrent=8)
+        sch.add("grid-okx", grid_tick, interval=1.0, priority="high")
+        sch.add("rank", rank_tick, interval=15, priority="batch")
+        sch.start()            # blocks; sch.stop() from another thread / signal
+    """
+
+    def __init__(self, max_concurrent=16, thread_workers=None, process_workers=None,
+                 on_error=None):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.thread_workers = thread_workers or self.max_concurrent
+        self.process_workers = process_workers
+        self.on_error = on_error
+        self.processes = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._running_ticks = set()
+        self._wakeup = None
+        self._loop = None
+        self._loop_thread = None
+        self._stopping = False
+        self._thread_pool = None
+        self._process_pool = None
+        self._lock = threading.Lock()
+
+    # ---- registry ----
+    def add(self, name, tick, interval=1.0, budget=None, priority="normal", mode=None,
+            hard_budget=False, args=(), kwargs=None, start_delay=0.0):
+        """Register a strategy process; can be called before or after start."""
+        if name in self.processes:
+            raise ValueError("process %r already registered" % name)
+        proc = StrategyProcess(name, tick, interval=interval, budget=budget, priority=priority,
+                               mode=mode, hard_budget=hard_budget, args=args, kwargs=kwargs)
+        with self._lock:
+            self.processes[name] = proc
+        self._schedule(proc, time.monotonic() + start_delay)
+        return proc
+
+    def remove(self, name):
+        with self._lock:
+            proc = self.processes.pop(name, None)
+        if proc is not None:
+            proc.finished = True
+        return proc
+
+    def _schedule(self, proc, due):
+        proc.next_due = due
+        if self._loop is not None and self._loop.is_running() and \
+                threading.current_thread() is not self._loop_thread:
+            self._loop.call_soon_threadsafe(self._push, proc)
+        else:
+            self._push(proc)
+
+    def _push(self, proc):
+        heapq.heappush(self._heap, (proc.next_due, proc.priority, next(self._seq), proc))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # ---- lifecycle ----
     def start(self):
+        """Run the supervisor in the current thread until :meth:`stop`."""
         print("Scheduler starting...")
+        try:
+            asyncio.run(self.run())
+        finally:
+            print("Scheduler stopping...")
 
     def stop(self):
-        print("Scheduler stopping...")
+        """Request shutdown; safe to call from any thread."""
+        self._stopping = True
+        if self._loop is not None and self._wakeup is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.current_thread()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._thread_pool = ThreadPoolExecutor(max_workers=self.thread_workers,
+                                               thread_name_prefix="ctos-sched")
+        if any(p.mode == "process" for p in self.processes.values()) or self.process_workers:
+            self._get_process_pool()
+        now = time.monotonic()
+        for proc in self.processes.values():
+            proc.started_at = proc.started_at or now
+        try:
+            await self._dispatch_loop()
+        finally:
+            if self._running_ticks:
+                await asyncio.gather(*self._running_ticks, return_exceptions=True)
+            self._thread_pool.shutdown(wait=False)
+            with self._lock:
+                pool, self._process_pool = self._process_pool, None
+            if pool is not None:
+                pool.shutdown(wait=False)
+            self._loop = None
+
+    def _get_process_pool(self):
+        """Created on demand, so "process" procs added after start() still run in a process."""
+        with self._lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+            return self._process_pool
+
+    async def _dispatch_loop(self):
+        ready = []
+        while not self._stopping:
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                due, prio, seq, proc = heapq.heappop(self._heap)
+                if proc.finished or proc.name not in self.processes:
+                    continue
+                heapq.heappush(ready, (prio, due, seq, proc))
+            while ready and len(self._running_ticks) < self.max_concurrent:
+                _, due, _, proc = heapq.heappop(ready)
+                task = self._loop.create_task(self._run_tick(proc, due))
+                self._running_ticks.add(task)
+                task.add_done_callback(self._tick_done)
+            # finished processes stay registered for stats(); only live ones keep the loop alive
+            if not self._running_ticks and not any(not p.finished for p in self.processes.values()):
+                break
+            self._wakeup.clear()
+            if ready:
+                timeout = None  # wait for a running tick to free a slot
+            elif self._heap:
+                timeout = max(0.0, self._heap[0][0] - time.monotonic())
+            else:
+                timeout = None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _tick_done(self, task):
+        self._running_ticks.discard(task)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run_tick(self, proc, due):
+        proc.running = True
+        if proc.started_at is None:
+            proc.started_at = time.monotonic()
+        start = time.monotonic()
+        late = max(0.0, start - due)
+        result = None
+        cpu = 0.0
+        try:
+            if proc.mode == "task":
+                c0 = time.thread_time()
+                coro = proc.tick(*proc.args, **proc.kwargs)
+                if proc.hard_budget:
+                    try:
+                        result = await asyncio.wait_for(coro, proc.budget)
+                    except asyncio.TimeoutError:
+                        proc.cancelled += 1
+                else:
+                    result = await coro
+                # loop-thread CPU includes other coroutines interleaved with this tick
+                cpu = time.thread_time() - c0
+            elif proc.mode == "thread":
+                result, cpu = await self._loop.run_in_executor(
+                    self._thread_pool, _timed_call, proc.tick, proc.args, proc.kwargs)
+            else:
+                result, cpu = await self._loop.run_in_executor(
+                    self._get_process_pool(), _timed_call_process, proc.tick, proc.args, proc.kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            proc.errors += 1
+            proc.last_error = e
+            if self.on_error is not None:
+                try:
+                    self.on_error(proc, e)
+                except Exception:
+                    pass
+        finally:
+            end = time.monotonic()
+            proc.record(end - start, cpu, late)
+            proc.running = False
+
+        if result is False or self._stopping or proc.name not in self.processes:
+            proc.finished = proc.finished or result is False
+            return
+        if isinstance(result, (int, float)) and not isinstance(result, bool):
+            next_due = end + max(0.0, float(result))
+        else:
+            # fixed-rate: anchor to the previous due time, skip missed slots
+            next_due = due + proc.interval
+            if next_due <= end:
+                missed = int((end - next_due) // proc.interval) + 1 if proc.interval > 0 else 0
+                proc.skipped += missed
+                next_due = end if proc.interval <= 0 else due + (missed + 1) * proc.interval
+        self._schedule(proc, next_due)
+
+    # ---- introspection ----
+    def stats(self):
+        with self._lock:
+            procs = list(self.processes.values())
+        return {
+            "running": len(self._running_ticks),
+            "queued": len(self._heap),
+            "processes": {p.name: p.stats() for p in procs},
+        }
+
+    def print_stats(self):
+        print("%-24s %6s %6s %8s %8s %9s %7s %6s" % (
+            "process", "ticks", "errs", "avg_ms", "p99_ms", "late_p99", "overrun", "cpu%"))
+        for s in self.stats()["processes"].values():
+            print("%-24s %6d %6d %8.1f %8.1f %9.1f %7d %6.1f" % (
+                s["name"][:24], s["ticks"], s["errors"], s["avg_ms"], s["p99_ms"],
+                s["lateness_p99_ms"], s["overruns"], s["cpu_pct"]))
@@ -3,6 +3,51 @@
 # A minimal, old-Python-compatible syscall interface.
 # No Protocol/dataclasses; plain base class with NotImplementedError.
 
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+
+def run_concurrent(fn, items, max_workers=8):
+    """Call fn(item) for every item on a thread pool, results in input order.
+       An exception raised by fn becomes (None, exception) for that item.
+       Workers run in a copy of the caller's context (e.g. rate-limit state).
+    """
+    items = list(items)
+    if not items:
+        return []
+    ctx = contextvars.copy_context()
+
+    def _safe(item):
+        try:
+            return fn(item)
+        except Exception as e:
+            return None, e
+
+    if len(items) == 1 or max_workers <= 1:
+        return [_safe(it) for it in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        return list(pool.map(lambda it: ctx.copy().run(_safe, it), items))
+
+
+def chunked(items, size):
+    """Split a list into lists of at most size elements."""
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def normalize_cancel_items(orders, symbol=None):
+    """Accept order ids, (order_id, symbol) tuples or dicts; return list of dicts."""
+    out = []
+    for o in orders:
+        if isinstance(o, dict):
+            out.append({"order_id": o.get("order_id") or o.get("orderId"), "symbol": o.get("symbol", symbol)})
+        elif isinstance(o, (list, tuple)):
+            out.append({"order_id": o[0], "symbol": o[1] if len(o) > 1 else symbol})
+        else:
+            out.append({"order_id": o, "symbol": symbol})
+    return out
+
+
 class TradingSyscalls(object):
     # ---- Ref-data / meta ----
     def symbols(self):
@@ -75,6 +120,45 @@ class TradingSyscalls(object):
         """
         raise NotImplementedError
 
+    # ---- Batch trading ----
+    # Default implementations fan out the single-order syscalls on a thread
+    # pool; drivers with native batch endpoints override them.
+    def place_orders_batch(self, orders, max_workers=8):
+        """Place many orders, return (results, error)
+           :param orders: list of dicts with place_order arguments:
+                          {'symbol', 'side', 'order_type', 'size', 'price', 'client_id', ...extras}
+           :param max_workers: Concurrency of the fallback path
+           :return: ([(order_id, error), ...] in input order, None)
+        """
+        def _one(o):
+            o = dict(o)
+            return self.place_order(o.pop("symbol"), o.pop("side"), o.pop("order_type", "limit"),
+                                    o.pop("size"), o.pop("price", None), o.pop("client_id", None), **o)
+        return run_concurrent(_one, orders, max_workers), None
+
+    def cancel_orders_batch(self, orders, symbol=None, max_workers=8):
+        """Cancel many orders, return (results, error)
+           :param orders: list of order ids, (order_id, symbol) tuples or {'order_id', 'symbol'} dicts
+           :param symbol: Default symbol for items that do not carry one
+           :param max_workers: Concurrency of the fallback path
+           :return: ([(success, error), ...] in input order, None)
+        """
+        items = normalize_cancel_items(orders, symbol)
+        return run_concurrent(lambda o: self.revoke_order(o["order_id"], symbol=o["symbol"]),
+                              items, max_workers), None
+
+    def amend_orders_batch(self, amends, max_workers=8):
+        """Amend many orders, return (results, error)
+           :param amends: list of dicts with amend_order arguments:
+                          {'order_id', 'symbol', 'price', 'size', ...extras}
+           :param max_workers: Concurrency of the fallback path
+           :return: ([(order_id, error), ...] in input order, None)
+        """
+        def _one(a):
+            a = dict(a)
+            return self.amend_order(a.pop("order_id"), **a)
+        return run_concurrent(_one, amends, max_workers), None
+
     def cancel_all(self, symbol=None, order_ids=None):
         """Cancel all orders (optionally filtered by symbol or order_ids)
            :param symbol: Trading pair symbol to filter by
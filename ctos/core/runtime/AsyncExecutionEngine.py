@@ -0,0 +1,127 @@
+"""
+ExecutionEngine 的协程版本
+
+同一套方法（set_coin_position_to_target / plan_target_positions / dispatch_plan / place_incremental_orders /
+focus_on_orders / revoke_all_orders ...）都是 async，驱动调用经 AsyncSyscalls 适配:
+    - 每个 (交易所, 账户) 一个 asyncio.Semaphore 限制在途请求数，互不挤占；
+      批量下单/撤单、计划阶段的并发查询按 min(max_workers, max_concurrency) 个线程执行并占同样多的名额，
+      所以一个账户同时在途的请求不超过 max_concurrency
+    - 阻塞的驱动调用放到共享 I/O 线程池（按网络并发而不是 CPU 核数设置大小）
+    - 有原生协程客户端的驱动（Backpack 撤单走 bpx.async_）直接 await
+订单记账、审计记录、追价服务仍复用内部的同步 ExecutionEngine，两种用法的状态完全一致。
+
+用法:
+    engines = [await AsyncExecutionEngine.create(account=i, exchange_type='bp') for i in range(3)]
+    await gather_engines(engines, 'set_coin_position_to_target', [100, -100], ['eth', 'btc'], soft=True)
+"""
+import asyncio
+import functools
+import time
+
+from ctos.core.kernel.async_syscalls import DEFAULT_ACCOUNT_CONCURRENCY, get_io_executor, to_async
+from ctos.core.runtime.ExecutionEngine import ExecutionEngine
+
+
+class AsyncExecutionEngine:
+    """
+    :param engine: 已有的 ExecutionEngine；为 None 时用其余参数新建（构造会阻塞，协程里请用 create）
+    :param max_concurrency: 该账户的在途请求上限
+    """
+
+    def __init__(self, account=0, strategy='Classical', strategy_detail="COMMON", exchange_type='okx',
+                 account_manager=None, engine=None, max_concurrency=DEFAULT_ACCOUNT_CONCURRENCY):
+        self.engine = engine or ExecutionEngine(account=account, strategy=strategy, strategy_detail=strategy_detail,
+                                                exchange_type=exchange_type, account_manager=account_manager)
+        self.account = self.engine.account
+        self.exchange_type = self.engine.exchange_type
+        self.strategy_detail = self.engine.strategy_detail
+        self.monitor = self.engine.monitor
+        self.logger = self.engine.logger
+        self.chaser = self.engine.chaser
+        self.cex_driver = self.engine.cex_driver
+        self.driver = to_async(self.cex_driver, max_concurrency=max_concurrency)
+
+    @classmethod
+    async def create(cls, *args, **kwargs):
+        """在线程池里构造（ExecutionEngine 初始化会请求余额），不阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_io_executor(), functools.partial(cls, *args, **kwargs))
+
+    @property
+    def soft_orders_to_focus(self):
+        return self.engine.soft_orders_to_focus
+
+    async def _run(self, fn, *args, **kwargs):
+        """整段同步逻辑（内部自己并发请求）放到线程池，不占账户信号量"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_io_executor(), functools.partial(fn, *args, **kwargs))
+
+    # ---------------- 调仓 ----------------
+    async def plan_target_positions(self, usdt_amounts, coins, soft=False, stack_mode=False, min_usdt=1.0,
+                                    max_workers=DEFAULT_ACCOUNT_CONCURRENCY):
+        """计划阶段内部并发查价/查仓，线程数和占用的账户名额都是 min(max_workers, max_concurrency)"""
+        return await self.driver.run_sync_batch(self.engine.plan_target_positions, usdt_amounts, coins, soft=soft,
+                                                stack_mode=stack_mode, min_usdt=min_usdt, max_workers=max_workers)
+
+    async def dispatch_plan(self, plan, max_workers=DEFAULT_ACCOUNT_CONCURRENCY):
+        """同 ExecutionEngine.dispatch_plan：整张计划交给驱动 place_orders_batch，结果同样入账"""
+        batch = self.engine._plan_batch(plan)
+        if not batch:
+            return []
+        try:
+            results, err = await self.driver.place_orders_batch(batch, max_workers=max_workers)
+        except Exception as e:
+            results, err = None, e
+        return self.engine._record_dispatch(plan['orders'], results, err)
+
+    async def set_coin_position_to_target(self, usdt_amounts=[10], coins=['eth'], soft=False,
+                                          max_workers=DEFAULT_ACCOUNT_CONCURRENCY, stack_mode=False,
+                                          min_usdt=1.0, dry_run=False):
+        """同 ExecutionEngine.set_coin_position_to_target"""
+        start_time = time.time()
+        plan, err = await self.plan_target_positions(usdt_amounts, coins, soft=soft, stack_mode=stack_mode,
+                                                     min_usdt=min_usdt, max_workers=max_workers)
+        if err:
+            self.logger.warning(f"Failed to plan target positions: {err}")
+            return None, err
+        if dry_run:
+            return plan
+        await self.dispatch_plan(plan, max_workers=max_workers)
+        print(f'本次初始化耗时: {round(time.time() - start_time, 2)}s, 计划 {len(plan["orders"])} 单, 跳过 {len(plan["skipped"])} 个')
+        return self.soft_orders_to_focus
+
+    async def place_incremental_orders(self, usdt_amount, coin, direction, soft=False, price=None):
+        """同 ExecutionEngine.place_incremental_orders，占用一个账户并发名额"""
+        return await self.driver.run_sync(self.engine.place_incremental_orders, usdt_amount, coin, direction,
+                                          soft=soft, price=price, async_mode=True)
+
+    # ---------------- 订单 ----------------
+    async def focus_on_orders(self, coins, soft_orders_to_focus):
+        return await self.driver.run_sync(self.engine.focus_on_orders, coins, soft_orders_to_focus)
+
+    async def wait_chase_idle(self, timeout=None):
+        """等追价服务没有待追踪订单；返回是否已空闲"""
+        return await self._run(self.chaser.wait_idle, timeout)
+
+    def get_chase_metrics(self):
+        return self.engine.get_chase_metrics()
+
+    async def revoke_all_orders(self):
+        """撤掉本引擎下过的全部未完成订单，撤单并发进行"""
+        open_orders, err = await self.driver.get_open_orders(onlyOrderId=True)
+        if err:
+            print(f'❌ 获取未完成订单失败: {err}')
+            return
+        known = self.cex_driver.order_id_to_symbol
+        items = [(oid, known[oid]) for oid in open_orders or [] if oid in known]
+        if items:
+            await self.driver.cancel_orders_batch(items)
+        self.cex_driver.order_id_to_symbol = {}
+
+    async def close(self):
+        await self.driver.close()
+
+
+async def gather_engines(engines, method, *args, **kwargs):
+    """多个账户的引擎同时执行同一个协程方法，返回结果列表（异常原样返回，不影响其它账户）"""
+    return await asyncio.gather(*[getattr(e, method)(*args, **kwargs) for e in engines], return_exceptions=True)
@@ -3,12 +3,17 @@ import mysql.connector
 from mysql.connector import Error
 from datetime import datetime, timedelta, date
 import pandas as pd
+import numpy as np
 import os
+import tempfile
 from tqdm import tqdm
 import requests
+from requests.adapters import HTTPAdapter
 import zipfile
+import io
+import threading
 import time
-import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from util import base_url, rate_price2order, json
 from collections import defaultdict
 from mysql.connector.errors import DatabaseError
@@ -25,22 +30,101 @@ COLUMN_MAPPING = {
 }
 
 
+KLINE_COLUMNS = ['trade_date', 'open', 'high', 'low', 'close', 'vol1', 'vol']
+
+
+def frame_to_columns(data, vol1_scale=1e6):
+    """
+    把 K 线 DataFrame 整列转换成可直接绑定的 Python 值列表:
+    trade_date -> 'YYYY-MM-DD HH:MM:SS'，数值列 -> float（NaN -> None），vol1 除以 vol1_scale
+    同一 trade_date 只保留最后一行。不修改传入的 data。
+    """
+    if data is None or len(data) == 0:
+        return None
+    df = data.rename(columns=lambda c: COLUMN_MAPPING.get(c, str(c).lower()))
+    df = df.drop_duplicates('trade_date', keep='last')
+    ts = df['trade_date']
+    if pd.api.types.is_numeric_dtype(ts):
+        # 10 位≈秒，13 位≈毫秒，16 位≈微秒
+        v = ts.astype('int64')
+        v = v.where(v <= 1e14, v // 1000)
+        v = v.where(v >= 1e11, v * 1000)
+        ts = pd.to_datetime(v, unit='ms')
+    else:
+        ts = pd.to_datetime(ts)
+    dates = np.char.replace(ts.values.astype('datetime64[s]').astype(str), 'T', ' ').tolist()
+    columns = [dates]
+    for c in KLINE_COLUMNS[1:]:
+        col = pd.to_numeric(df[c], errors='coerce').astype(float)
+        if c == 'vol1' and vol1_scale:
+            col = col / vol1_scale
+        col = col.astype(object).where(col.notna(), None)
+        columns.append(col.tolist())
+    return columns
+
+
+def typed_frame(rows, columns):
+    """数据库行 -> DataFrame：trade_date 转 datetime64，其余列整列转 float64"""
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    for c in columns:
+        if c == 'trade_date':
+            df[c] = pd.to_datetime(df[c])
+        else:
+            df[c] = pd.to_numeric(df[c], errors='coerce').astype(np.float64)
+    return df
+
+
 class DataHandler:
-    def __init__(self, host, database, user, password):
-        self.conn = None
+    """
+    每个线程一条 MySQL 连接（threading.local），mysql.connector 的连接不是线程安全的，
+    并发回填/读取各用各的 socket，不再抢同一条连接
+    - 连接空闲超过 ping_interval 秒，使用前先 is_connected() 检测，断了自动 reconnect
+    - fetch_data 用 prepared statement，同一线程同一条 SQL 只 prepare 一次
+    """
+
+    def __init__(self, host, database, user, password, allow_local_infile=False, ping_interval=30,
+                 reconnect_attempts=3):
+        self._conn_kwargs = dict(host=host, database=database, user=user, password=password,
+                                 allow_local_infile=allow_local_infile)
+        self.ping_interval = ping_interval
+        self.reconnect_attempts = reconnect_attempts
+        self._local = threading.local()
+        self._all_conns = []
+        self._all_conns_lock = threading.Lock()
         try:
-            self.conn = mysql.connector.connect(
-                host=host,
-                database=database,
-                user=user,
-                password=password
-            )
             if self.conn.is_connected():
                 print('__init__ DataHandler success~~~')
-
         except Error as e:
             print(e, '1111111111111')
 
+    @property
+    def conn(self):
+        """当前线程的连接；首次使用时建立，断线自动重连"""
+        local = self._local
+        conn = getattr(local, 'conn', None)
+        now = time.time()
+        if conn is None:
+            conn = mysql.connector.connect(**self._conn_kwargs)
+            local.conn = conn
+            local.prepared = {}
+            with self._all_conns_lock:
+                self._all_conns.append(conn)
+        elif now - getattr(local, 'last_used', 0) > self.ping_interval and not conn.is_connected():
+            print('MySQL 连接已断开，重连中...')
+            conn.reconnect(attempts=self.reconnect_attempts, delay=1)
+            local.prepared = {}  # 旧连接上的 prepared statement 已失效
+        local.last_used = now
+        return conn
+
+    def _prepared_cursor(self, query):
+        """当前线程里按 SQL 文本缓存的 prepared cursor"""
+        conn = self.conn
+        cursors = self._local.prepared
+        cur = cursors.get(query)
+        if cur is None:
+            cur = cursors[query] = conn.cursor(prepared=True)
+        return cur
+
     def create_table_if_not_exists(self, cursor, table_name):
         # 20250602 1730 这里需要考虑一个事情，那就是shib这种傻逼币种，价钱巨低，交易量巨大，狗日的直接超模了。
         # -- 修改 SHIBUSDT_1d 表
@@ -65,45 +149,65 @@ class DataHandler:
         except Error as e:
             print(f"Failed to create table {table_name}: {e}")
 
-    def insert_data(self, symbol, interval, data, remove_duplicates=False):
+    def insert_data(self, symbol, interval, data, remove_duplicates=False, chunk_size=5000, method='executemany',
+                    vol1_scale=1e6):
+        """
+        批量写入 K 线，整列转换（不再逐行 iterrows + parse_trade_date）
+        主键 trade_date 冲突时以新数据为准，写入即去重，不需要再跑 remove_duplicates
+        :param chunk_size: 每条多行 INSERT 的行数
+        :param method: 'executemany' 多行 INSERT ... ON DUPLICATE KEY UPDATE；
+                       'load_data' 写临时 CSV 后 LOAD DATA LOCAL INFILE ... REPLACE（需 allow_local_infile=True）
+        :param vol1_scale: vol1 除以该值；数据本来就取自库里（如补缺口）时传 None
+        """
         table_name = f"{symbol.replace('-', '_')}_{interval}"
         try:
-            if self.conn.is_connected():
-                cursor = self.conn.cursor()
-                # Ensure the table exists
-                # self.create_table_if_not_exists(cursor, table_name)
-
-                query = f"""INSERT INTO {table_name}
-                            (trade_date, open, high, low, close, vol1, vol)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s)
-                            ON DUPLICATE KEY UPDATE
-                            open = VALUES(open), high = VALUES(high), low = VALUES(low),
-                            close = VALUES(close), vol1 = VALUES(vol1), vol = VALUES(vol);"""
-                # print('aaaaaa', data.iloc[0,0:10])
-                data['vol1'] = data['vol1'] / 1e6
-                formatted_data = [
-                    (
-                        parse_trade_date(row['trade_date']),  # Assume there's a function to parse trade_date correctly
-                        row['open'],
-                        row['high'],
-                        row['low'],
-                        row['close'],
-                        row['vol1'],
-                        row['vol']
-                    )
-                    for index, row in data.iterrows()
-                ]
-
-                cursor.executemany(query, formatted_data)
-                self.conn.commit()
-                print(cursor.rowcount, "records inserted into", table_name)
-                if remove_duplicates:
-                    self.remove_duplicates(table_name)
+            columns = frame_to_columns(data, vol1_scale=vol1_scale)
+            if columns is None:
+                return 0
+            conn = self.conn  # 当前线程的连接，断线已自动重连
+            cursor = conn.cursor()
+            # Ensure the table exists
+            # self.create_table_if_not_exists(cursor, table_name)
+            if method == 'load_data':
+                rowcount = self._load_data_infile(cursor, table_name, columns)
             else:
-                print('没连上？咋回事？')
+                rowcount = self._insert_multi_rows(cursor, table_name, columns, chunk_size)
+            conn.commit()
+            cursor.close()
+            print(rowcount, "records inserted into", table_name)
+            if remove_duplicates:
+                self.remove_duplicates(table_name)
+            return rowcount
         except Error as e:
             print(e, '222222222')
 
+    def _insert_multi_rows(self, cursor, table_name, columns, chunk_size):
+        n = len(columns[0])
+        rowcount = 0
+        row_sql = "(%s, %s, %s, %s, %s, %s, %s)"
+        rows = list(zip(*columns))
+        for start in range(0, n, chunk_size):
+            chunk = rows[start:start + chunk_size]
+            query = (f"INSERT INTO {table_name} (trade_date, open, high, low, close, vol1, vol) VALUES "
+                     + ", ".join([row_sql] * len(chunk)) +
+                     " ON DUPLICATE KEY UPDATE open = VALUES(open), high = VALUES(high), low = VALUES(low),"
+                     " close = VALUES(close), vol1 = VALUES(vol1), vol = VALUES(vol);")
+            cursor.execute(query, [v for row in chunk for v in row])
+            rowcount += cursor.rowcount
+        return rowcount
+
+    def _load_data_infile(self, cursor, table_name, columns):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                pd.DataFrame(dict(zip(KLINE_COLUMNS, columns))).to_csv(f, index=False, header=False, na_rep='\\N')
+            cursor.execute(f"""LOAD DATA LOCAL INFILE '{path}' REPLACE INTO TABLE {table_name}
+                               FIELDS TERMINATED BY ',' LINES TERMINATED BY '\\n'
+                               (trade_date, open, high, low, close, vol1, vol)""")
+            return cursor.rowcount
+        finally:
+            os.remove(path)
+
     def remove_duplicates(self, table_name):
         try:
             with self.conn.cursor() as cur:
@@ -176,23 +280,74 @@ class DataHandler:
         #     params = (args[0], args[1])
         #
         try:
-            if self.conn.is_connected():
-                cursor = self.conn.cursor(dictionary=True)
-                cursor.execute(query, params)
-                result = cursor.fetchall()
-                df = pd.DataFrame(result)
-                if 'DESC' in query:  # If the query was in descending order, reverse the DataFrame
-                    df = df.iloc[::-1].reset_index(drop=True)
-                return df
+            cursor = self._prepared_cursor(query)
+            cursor.execute(query, params)
+            result = cursor.fetchall()
+            df = pd.DataFrame(result, columns=cursor.column_names)
+            if 'DESC' in query:  # If the query was in descending order, reverse the DataFrame
+                df = df.iloc[::-1].reset_index(drop=True)
+            return df
         except Error as e:
             print(f"Error fetching data: {e}")
             return pd.DataFrame()  # Return an empty DataFrame in case of error
 
 
+    def fetch_iter(self, symbol, interval, start_date=None, end_date=None, chunk_size=100000, columns=None):
+        """
+        分块读取 [start_date, end_date]，逐块 yield DataFrame，内存占用与区间长度无关
+        - 独立连接 + 非缓冲（服务端流式）游标，fetchmany 逐块取，不 fetchall
+        - columns 只查需要的列，例如 ['trade_date', 'close']（trade_date 总会带上）
+        - trade_date 为 datetime64，数值列为 float64（不再是 Decimal）
+        用法:
+            for df in data_handler.fetch_iter('ETHUSDT', '1m', '2020-01-01', '2025-01-01', columns=['close']):
+                ...
+        """
+        table_name = f"{symbol.replace('-', '_')}_{interval}"
+        cols = ['trade_date'] + [c for c in (columns or KLINE_COLUMNS[1:]) if c != 'trade_date']
+        bad = [c for c in cols if c not in KLINE_COLUMNS]
+        if bad:
+            raise ValueError(f"未知列: {bad}")
+        query = f"SELECT {', '.join(cols)} FROM {table_name}"
+        params = ()
+        if start_date is not None and end_date is not None:
+            query += " WHERE trade_date BETWEEN %s AND %s"
+            params = (start_date, end_date)
+        elif start_date is not None:
+            query += " WHERE trade_date >= %s"
+            params = (start_date,)
+        elif end_date is not None:
+            query += " WHERE trade_date <= %s"
+            params = (end_date,)
+        query += " ORDER BY trade_date"
+
+        # 非缓冲游标读完之前会占住连接，所以单独开一条，不影响本线程的其它查询
+        conn = mysql.connector.connect(**self._conn_kwargs)
+        cursor = conn.cursor(buffered=False)
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield typed_frame(rows, cols)
+        finally:
+            try:
+                cursor.close()
+            finally:
+                conn.close()
+
     def close(self):
-        if self.conn is not None and self.conn.is_connected():
-            self.conn.close()
-            print('Database connection closed.')
+        """关闭所有线程建立过的连接"""
+        with self._all_conns_lock:
+            conns, self._all_conns = self._all_conns, []
+        for conn in conns:
+            try:
+                if conn.is_connected():
+                    conn.close()
+            except Error:
+                pass
+        self._local = threading.local()
+        print('Database connection closed.')
 
     def check_missing_days(self,
                            start_date=None,
@@ -214,6 +369,7 @@ class DataHandler:
             coins = [x for x in rate_price2order.keys() if x != 'ip']
 
         missing_map = {}
+        cursor = self.conn.cursor()
 
         for cc in coins:
             if not start_date:
@@ -224,33 +380,18 @@ class DataHandler:
             coin = cc.upper() + 'USDT'
             for interval in intervals:
                 try:
-                    # ① 一次性拉取日期列
-                    df = self.fetch_data(
-                        coin, interval,
-                        start_dt.strftime("%Y-%m-%d"),  # 无需时分秒
-                        end_dt.strftime("%Y-%m-%d 23:59:59")
-                    )
-                    if df.empty:
-                        # 数据全缺，直接记录整段
-                        exp_days = pd.date_range(start_dt, end_dt, freq='D').date
-                        missing_map.setdefault(coin, {})[interval] = list(exp_days)
-                        print(f"[空表] {coin}-{interval} 缺失 {len(exp_days)} 天")
-                        continue
-
-                    # ② 现有日期集合
-                    df['trade_date'] = pd.to_datetime(df['trade_date'], unit='ms')
-                    present_days = set(df['trade_date'].dt.date.unique())
-
-                    # ③ 期望日期集合
-                    expected_days = pd.date_range(start_dt, end_dt, freq='D').date
-                    missing_days = sorted(set(expected_days) - present_days)
-
-                    if missing_days:  # 仅记录缺失
-                        missing_map.setdefault(coin, {})[interval] = missing_days
-                        print(f"[缺失] {coin}-{interval}: {len(missing_days)} 天")
+                    # ① 只拉 trade_date 一列
+                    ts = fetch_trade_dates(cursor, f"{coin}_{interval}",
+                                           start_dt.strftime("%Y-%m-%d"), end_dt.strftime("%Y-%m-%d 23:59:59"))
+                    # ② 期望日期 - 现有日期（整列运算）
+                    days = missing_days_from_timestamps(ts, start_dt, end_dt)
+                    if days:  # 仅记录缺失
+                        missing_map.setdefault(coin, {})[interval] = days
+                        print(f"[{'空表' if len(ts) == 0 else '缺失'}] {coin}-{interval}: {len(days)} 天")
                 except Exception as e:
                     print(f"检查失败 {coin}-{interval}: {e}")
             start_date = None
+        cursor.close()
         return missing_map
 
 
@@ -268,11 +409,29 @@ def fetch_kline_data(exchange, interval, limit, symbol):
     return df
 
 
+# 归档下载共用一个 Session，按 host 复用连接
+DOWNLOAD_WORKERS = 8
+_archive_session = None
+_archive_session_lock = threading.Lock()
+
+
+def get_archive_session(pool_size=DOWNLOAD_WORKERS):
+    global _archive_session
+    with _archive_session_lock:
+        if _archive_session is None:
+            _archive_session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(pool_size, 4))
+            _archive_session.mount('https://', adapter)
+            _archive_session.mount('http://', adapter)
+        return _archive_session
+
+
 def check_data_exists(base_url, symbol, interval, date):
     date_str = date.strftime('%Y-%m-%d')
     filename = f"{symbol}-{interval}-{date_str}.zip"
     url = f"{base_url}/{symbol}/{interval}/{filename}"
-    response = requests.get(url)
+    # HEAD 即可判断，不用把整个 zip 拉下来
+    response = get_archive_session().head(url, timeout=10, allow_redirects=True)
     return response.status_code == 200
 
 
@@ -294,6 +453,8 @@ def _save_cache(cache):
     with open(CACHE_FILE, "w") as f:
         json.dump(cache, f, default=str, indent=2)
 
+_cache_lock = threading.Lock()
+
 def find_start_date(base_url, symbol, interval, earliest_date=datetime(2015, 1, 1), latest_date=datetime.now()):
     key = f"{symbol}_{interval}"
     cache = _load_cache()
@@ -321,17 +482,169 @@ def find_start_date(base_url, symbol, interval, earliest_date=datetime(2015, 1,
 
     print(f"📌 最早的数据起始时间是：{result if result else '未找到'}")
 
-    # ③ 写入缓存（仅在找到结果时）
+    # ③ 写入缓存（仅在找到结果时）；并发查找时重新读一次再合并，避免互相覆盖
     if result:
-        cache[key] = result.isoformat()
-        _save_cache(cache)
+        with _cache_lock:
+            cache = _load_cache()
+            cache[key] = result.isoformat()
+            _save_cache(cache)
 
     return result
 
 
-def download_and_process_binance_data(base_url, symbol, start_date, end_date, intervals, missing_days=None):
+def find_start_dates(base_url, symbols, interval='1d', max_workers=DOWNLOAD_WORKERS):
+    """多个币种并发二分查找起始日期，返回 {symbol: datetime|None}"""
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(find_start_date, base_url, sym, interval): sym for sym in symbols}
+        for fut in as_completed(futures):
+            sym = futures[fut]
+            try:
+                results[sym] = fut.result()
+            except Exception as e:
+                print(f"查找起始日期失败 {sym}: {e}")
+                results[sym] = None
+    return results
+
+
+BINANCE_KLINE_COLUMNS = ["Open time", "Open", "High", "Low", "Close", "Volume", "Close time",
+                         "Quote asset volume", "Number of trades", "Taker buy base asset volume",
+                         "Taker buy quote asset volume", "Ignore"]
+
+
+def normalize_binance_klines(csv_bytes):
+    """
+    币安归档 CSV（bytes）-> trade_date/open/high/low/close/vol1/vol，整列转换
+    兼容带表头的新文件和微秒时间戳（2025 年起）
+    """
+    df = pd.read_csv(io.BytesIO(csv_bytes), header=None, names=BINANCE_KLINE_COLUMNS,
+                     usecols=[0, 1, 2, 3, 4, 5, 7], dtype=str)
+    open_time = pd.to_numeric(df['Open time'], errors='coerce')
+    keep = open_time.notna()          # 表头行转不成数字，直接丢掉
+    open_time = open_time[keep].astype('int64')
+    df = df[keep]
+    # 如果时间戳太大，除以 1000 缩小到毫秒级
+    open_time = open_time.where(open_time <= 1e13, open_time // 1000)
+    out = pd.DataFrame({'trade_date': pd.to_datetime(open_time.values, unit='ms')})
+    for src, dst in (('Open', 'open'), ('High', 'high'), ('Low', 'low'), ('Close', 'close'),
+                     ('Quote asset volume', 'vol1'), ('Volume', 'vol')):
+        out[dst] = pd.to_numeric(df[src].values, errors='coerce')
+    return out
+
+
+class DownloadManifest:
+    """
+    已完成的 (symbol, interval, day) 记录在一个 JSON 里（带 ETag），重跑时直接跳过，
+    不再逐个 os.path.exists 探测
+    """
+
+    def __init__(self, path='data/download_manifest.json', flush_every=50):
+        self.path = path
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self.done = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.done = json.load(f)
+            except Exception:
+                self.done = {}
+
+    @staticmethod
+    def _key(symbol, interval):
+        return f"{symbol}/{interval}"
+
+    def is_done(self, symbol, interval, day):
+        return str(day) in self.done.get(self._key(symbol, interval), {})
+
+    def mark(self, symbol, interval, day, etag=None):
+        with self._lock:
+            self.done.setdefault(self._key(symbol, interval), {})[str(day)] = etag or ''
+            self._dirty += 1
+            if self._dirty >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.done, f)
+        os.replace(tmp, self.path)
+        self._dirty = 0
+
+
+def fetch_archive(url, session=None, retries=3, chunk_size=1 << 16):
+    """
+    下载到内存；传输中断时带 Range + If-Range(ETag) 续传已收到的部分
+    :return: (bytes|None, status_code, etag)
+    """
+    session = session or get_archive_session()
+    buf = bytearray()
+    etag = None
+    status = None
+    for attempt in range(retries + 1):
+        headers = {}
+        if buf and etag:
+            headers = {'Range': f'bytes={len(buf)}-', 'If-Range': etag}
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=(5, 60)) as r:
+                status = r.status_code
+                if status == 404:
+                    return None, status, None
+                if status == 200:
+                    buf = bytearray()          # 服务端不支持续传 / ETag 变了，从头来
+                elif status != 206:
+                    time.sleep(0.5 * (attempt + 1))
+                    continue
+                etag = r.headers.get('ETag', etag)
+                total = r.headers.get('Content-Length')
+                expected = len(buf) + int(total) if total else None
+                for chunk in r.iter_content(chunk_size):
+                    buf.extend(chunk)
+                if expected is None or len(buf) >= expected:
+                    return bytes(buf), 200, etag
+        except requests.RequestException:
+            time.sleep(0.5 * (attempt + 1))
+    return None, status, etag
+
+
+def _process_archive_day(base_url, symbol, interval, day, data_dir, session, manifest, sink):
+    date_str = day.strftime('%Y-%m-%d')
+    filename = f"{symbol}-{interval}-{date_str}.zip"
+    url = f"{base_url}/{symbol}/{interval}/{filename}"
+    content, status, etag = fetch_archive(url, session)
+    if content is None:
+        if status not in (404, None):
+            print(f"Failed to download data for {date_str}: Status code {status}")
+        return status
+    # 直接在内存里解压，不落盘 zip
+    with zipfile.ZipFile(io.BytesIO(content)) as zf:
+        csv_bytes = zf.read(zf.namelist()[0])
+    df = normalize_binance_klines(csv_bytes)
+    if sink is not None:
+        sink(symbol, interval, df)
+    else:
+        target_csv_path = os.path.join(data_dir, interval, f"{symbol}-{interval}-{date_str}.csv")
+        df.to_csv(target_csv_path, index=False)
+    manifest.mark(symbol, interval, day, etag)
+    return 200
+
+
+def download_and_process_binance_data(base_url, symbol, start_date, end_date, intervals, missing_days=None,
+                                      max_workers=DOWNLOAD_WORKERS, data_dir='data', manifest=None, sink=None):
     """
     Download and process Binance k-line data from the specified URL.
+    并发下载（线程池 + 共享连接池），内存解压后直接整列规整；
+    已完成的日期记在 manifest 里，重跑自动跳过
+    :param sink: 可选 callable(symbol, interval, df)，如 ParquetDataHandler().insert_data；
+                 默认写 data/<interval>/<symbol>-<interval>-<date>.csv 供 read_processed_data 使用
     """
     # 1⃣ 预生成待处理日期列表
     if missing_days is None:
@@ -339,69 +652,33 @@ def download_and_process_binance_data(base_url, symbol, start_date, end_date, in
     else:
         all_days = sorted(missing_days)   # 转成 list 并排序，便于 tqdm
 
-    # 2⃣ 遍历 interval 与日期
+    own_manifest = manifest is None
+    if own_manifest:
+        manifest = DownloadManifest(os.path.join(data_dir, 'download_manifest.json'))
+    session = get_archive_session(max_workers)
+
+    # 2⃣ 所有 interval × 日期 一起丢进线程池
+    jobs = []
     for interval in intervals:
-        for day in tqdm(all_days, desc=f"download_and_process_binance_data {symbol}-{interval}"):
-            # 若 missing_days=None 则走全量；若非 None 且 day 不在集合，也不会进来
-            date_str = day.strftime('%Y-%m-%d')
-            filename = f"{symbol}-{interval}-{date_str}.zip"
-            csv_filename = f"{symbol}-{interval}-{date_str}.csv"
-            target_csv_path = os.path.join('data/{}'.format(interval), csv_filename)
-            # Check if the file already exists to avoid re-downloading
-            IS_DOWNLOAD = False
-            if not os.path.exists(target_csv_path):
-                # print('\r{} - {} --> {}'.format(interval, current_date, end_date), end='')
-                time.sleep(0.1 + random.randint(0, 20) / 20)
-                # Construct the URL and download the file
-                url = f"{base_url}/{symbol}/{interval}/{filename}"
-                response = requests.get(url)
-                if response.status_code == 200:
-                    # Save the zip file temporarily
-                    zip_path = os.path.join('data/{}'.format(interval), filename)
-                    with open(zip_path, 'wb') as f:
-                        f.write(response.content)
-
-                    # Extract the zip file
-                    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                        zip_ref.extractall('data/{}'.format(interval))
-
-                    # Rename and move the extracted CSV file
-                    extracted_file = os.path.join('data/{}'.format(interval), csv_filename.replace('.csv',
-                                                                               '.csv'))  # Assuming the extracted file has a predictable name
-                    os.rename(extracted_file, target_csv_path)
-
-                    # Remove the zip file after extraction
-                    os.remove(zip_path)
-                    IS_DOWNLOAD = True
-                elif response.status_code == 404:
-                    time.sleep(0.1)
-                    continue
-                else:
-                    time.sleep(0.2)
-                    print(f"Failed to download data for {date_str}: Status code {response.status_code}")
-            # Read, process, and save the CSV data
-            if os.path.exists(target_csv_path) and IS_DOWNLOAD:
-                df = pd.read_csv(target_csv_path, header=None,
-                                 names=["Open time", "Open", "High", "Low", "Close", "Volume", "Close time",
-                                        "Quote asset volume", "Number of trades", "Taker buy base asset volume",
-                                        "Taker buy quote asset volume", "Ignore"])
+        os.makedirs(os.path.join(data_dir, interval), exist_ok=True)
+        for day in all_days:
+            # 重新补缺时（missing_days 非空）不信任 manifest，强制重下
+            if missing_days is None and manifest.is_done(symbol, interval, day):
+                continue
+            jobs.append((interval, day))
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_process_archive_day, base_url, symbol, interval, day, data_dir,
+                                   session, manifest, sink) for interval, day in jobs]
+            for fut in tqdm(as_completed(futures), total=len(futures),
+                            desc=f"download_and_process_binance_data {symbol}"):
                 try:
-                    ### 2025年开始的数据采用了更细粒度的时间，一直无法转换，气人
-                    open_time = pd.to_numeric(df['Open time'], errors='coerce')
-                    # 如果时间戳太大，尝试除以 1000 或 1000000 缩小到毫秒级
-                    if open_time.max() > 1e13:
-                        open_time = open_time // 1000  # 转换为毫秒级
-                    df['trade_date'] = pd.to_datetime(open_time, unit='ms')
-                    # df['trade_date'] = pd.to_datetime(df['Open time'], unit='ms')
-                    df['vol1'] = df['Quote asset volume']
-                    df['vol'] = df['Volume']
-                    df = df[['trade_date', 'Open', 'High', 'Low', 'Close', 'vol1', 'vol']]
-                    df.columns = df.columns.str.lower()
-                    df.to_csv(target_csv_path, index=False)
+                    fut.result()
                 except Exception as e:
-                    print('\n', e, '\n', target_csv_path, '\n333333333333', '\n', df)
-                    if str(e).find('Out of b') != -1:
-                        break
+                    print('\n', e, '\n333333333333')
+    finally:
+        manifest.flush()
 
 
 def parse_trade_date(trade_date):
@@ -487,7 +764,12 @@ def read_processed_data(symbol, interval, start_date, end_date, missing_days=Non
 
 
 # 20250602 1500  将时间段性质的插入，转变为离散时间序列的插入
-def batch_insert_data(data_handler, symbol, interval, df, batch_size=1000, missing_days=None):
+def batch_insert_data(data_handler, symbol, interval, df, batch_size=5000, missing_days=None, method='executemany'):
+    """
+    :param batch_size: 每条多行 INSERT 的行数
+    :param method: 'executemany' 或 'load_data'（见 DataHandler.insert_data）
+    主键冲突在写入时处理，不再额外跑 remove_duplicates
+    """
     # 0⃣ 过滤缺失日
     if missing_days is not None and not df.empty:
         df = df[df['trade_date'].dt.date.isin(missing_days)]
@@ -495,17 +777,8 @@ def batch_insert_data(data_handler, symbol, interval, df, batch_size=1000, missi
             print(f"\r[{symbol}-{interval}] 无需插入（缺失日已全部补齐）", end='')
             return
 
-
-    # 1⃣ 分批插入
-    for start in tqdm(range(0, len(df), batch_size), desc=f"batch_insert_data {symbol}-{interval} insert"):
-        end = start + batch_size
-        batch_df = df.iloc[start:end]               # iloc 更稳妥
-        data_handler.insert_data(symbol, interval, batch_df)
-        print(f"Inserted batch rows {start} ~ {end - 1}")
-
-    # 2⃣ 去重
-    table_name = f"{symbol.replace('-', '_')}_{interval}"
-    data_handler.remove_duplicates(table_name)
+    # 1⃣ 整表一次转换，按 batch_size 分块写入
+    data_handler.insert_data(symbol, interval, df, chunk_size=batch_size, method=method)
 
 
 
@@ -536,66 +809,112 @@ def insert_binance_data_into_mysql(data_handler, symbol_now='ETHUSDT', missing_d
         )
 
 
-def export_daily_data(data_handler, base_path="~/Quantify/okx/data"):
+EXPORT_STATE_FILE = "export_state.json"
+
+
+def _load_export_state(base_path):
+    path = os.path.join(base_path, EXPORT_STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _write_day(df_day, filepath, fmt, compression):
+    tmp = filepath + '.tmp'
+    if fmt == 'parquet':
+        df_day.to_parquet(tmp, index=False, compression=compression or 'zstd')
+    else:
+        df_day.to_csv(tmp, index=False, compression=compression)
+    os.replace(tmp, filepath)
+
+
+def _export_table(data_handler, coin, interval, base_path, fmt, compression, since, chunk_size, overwrite):
+    """
+    单表流式读一遍，按天 groupby 写文件；块边界上没读完的那一天留到下一块
+    :return: (写入天数, 最后一天)
     """
-    按天导出K线数据到CSV文件
-    :param data_handler: 已初始化的DataHandler实例
+    save_dir = os.path.join(base_path, interval)
+    os.makedirs(save_dir, exist_ok=True)
+    ext = 'parquet' if fmt == 'parquet' else ('csv.gz' if compression == 'gzip' else 'csv')
+    written, last_day = 0, None
+    carry = None
+
+    def flush(frame):
+        nonlocal written, last_day
+        days = frame['trade_date'].dt.date
+        for day, df_day in frame.groupby(days, sort=True):
+            filepath = os.path.join(save_dir, f"{coin}-{interval}-{day.strftime('%Y-%m-%d')}.{ext}")
+            # 高水位那天可能只导出了一部分，总是重写
+            if overwrite or not os.path.exists(filepath) or (since and str(day) >= since):
+                _write_day(df_day, filepath, fmt, compression)
+                written += 1
+            last_day = day
+
+    for chunk in data_handler.fetch_iter(coin, interval, since, None, chunk_size=chunk_size):
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        tail_day = chunk['trade_date'].iloc[-1].date()
+        is_tail = chunk['trade_date'].dt.date == tail_day
+        carry = chunk[is_tail]
+        if (~is_tail).any():
+            flush(chunk[~is_tail])
+    if carry is not None and len(carry):
+        flush(carry)
+    return written, last_day
+
+
+def export_daily_data(data_handler, base_path="~/Quantify/okx/data", coins=None, time_gaps=None,
+                      fmt='csv', compression=None, max_workers=4, incremental=True, chunk_size=200000,
+                      overwrite=False):
+    """
+    按天导出K线数据：每张表只流式读一遍（fetch_iter），在内存里按天 groupby 拆分写文件
+    :param data_handler: 已初始化的DataHandler / ParquetDataHandler 实例（需要 fetch_iter）
     :param base_path: 基础存储路径（默认 ~/Quantify/okx/data）
+    :param fmt: 'csv' 或 'parquet'
+    :param compression: csv 可用 'gzip'（文件名 .csv.gz）；parquet 默认 zstd
+    :param max_workers: 并发导出的币种数（每个 fetch_iter 自带独立连接）
+    :param incremental: 从上次导出的最后一天（高水位，记在 export_state.json）继续
+    :param overwrite: 已存在的日文件也重写
     """
     # 配置参数
-    time_gaps = ['1m', '15m', '30m', '1h', '4h', '1d']
-    coins = [x for x in list(rate_price2order.keys()) if x != 'ip']  # 替换为你的币种列表
-
-    for cc in coins:
+    time_gaps = time_gaps or ['1m', '15m', '30m', '1h', '4h', '1d']
+    if coins is None:
+        coins = [x for x in list(rate_price2order.keys()) if x != 'ip']  # 替换为你的币种列表
+    base_path = os.path.expanduser(base_path)
+    os.makedirs(base_path, exist_ok=True)
+    state = _load_export_state(base_path) if incremental else {}
+    state_lock = threading.Lock()
+
+    def save_state():
+        tmp = os.path.join(base_path, EXPORT_STATE_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, os.path.join(base_path, EXPORT_STATE_FILE))
+
+    def export_coin(cc):
+        coin = cc.upper() + 'USDT'
         for interval in time_gaps:
-            # 获取表名对应的所有日期
+            key = f"{coin}_{interval}"
             try:
-                coin = cc.upper()+'USDT'
-                # 查询所有数据点（仅获取日期列）
-                df_all = data_handler.fetch_data(coin, interval, '2017-01-01', '2025-05-03')  # 假设足够大的数获取全部数据
-                if df_all.empty:
-                    print(f"无数据可导出: {coin}_{interval}")
+                since = state.get(key) if incremental else None
+                written, last_day = _export_table(data_handler, coin, interval, base_path, fmt, compression,
+                                                  since, chunk_size, overwrite)
+                if last_day is None:
+                    print(f"无数据可导出: {key}")
                     continue
-
-                # 转换日期列为日期对象
-                df_all['trade_date'] = pd.to_datetime(df_all['trade_date'])
-                # 提取唯一日期（按天分组）
-                unique_dates = df_all['trade_date'].dt.date.unique()
-
-                # 按天导出
-                for date in unique_dates:
-                    # 构造时间范围
-                    start_time = datetime.combine(date, datetime.min.time())
-                    end_time = start_time + timedelta(days=1) - timedelta(seconds=1)
-
-                    # 获取当天数据
-                    df_day = data_handler.fetch_data(
-                        coin, interval,
-                        start_time.strftime("%Y-%m-%d %H:%M:%S"),
-                        end_time.strftime("%Y-%m-%d %H:%M:%S")
-                    )
-                    if df_day.empty:
-                        continue
-
-                    # 创建目录
-                    save_dir = os.path.expanduser(os.path.join(base_path, interval))
-                    os.makedirs(save_dir, exist_ok=True)
-
-                    # 生成文件名
-                    filename = f"{coin}-{interval}-{date.strftime('%Y-%m-%d')}.csv"
-                    filepath = os.path.join(save_dir, filename)
-
-                    if os.path.exists(filepath):
-                        print(f"\r 已存在: {filepath}", end='')
-                    else:
-                        # 保存CSV
-                        df_day.to_csv(filepath, index=False)
-                        print(f"\r已保存: {filepath}" ,end='')
-
+                with state_lock:
+                    state[key] = str(last_day)
+                    save_state()
+                print(f"已导出 {key}: {written} 个文件，截至 {last_day}")
             except Exception as e:
-                print(f"处理失败 {coin}_{interval}: {str(e)}")
-                continue
+                print(f"处理失败 {key}: {str(e)}")
 
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(export_coin, coins))
 
 
 # 秒数步长映射
@@ -605,69 +924,138 @@ STEP_SEC = {
     '1d': 86400
 }
 
-def check_and_repair_tables(data_handler, coins, time_gaps):
+def fetch_trade_dates(cursor, table, start=None, end=None):
+    """一次查询拉取整列 trade_date（升序），返回 datetime64[s] 数组"""
+    query = f"SELECT trade_date FROM {table}"
+    params = ()
+    if start is not None and end is not None:
+        query += " WHERE trade_date BETWEEN %s AND %s"
+        params = (start, end)
+    cursor.execute(query + " ORDER BY trade_date", params)
+    rows = cursor.fetchall()
+    return np.array([r[0] if not isinstance(r, dict) else r['trade_date'] for r in rows], dtype='datetime64[s]')
+
+
+def fetch_gaps_sql(cursor, table, step):
+    """
+    用窗口函数在库里算缺口（MySQL 8+），只返回缺口两端，适合超大表
+    :return: (prev, next) 两个 datetime64[s] 数组
+    """
+    cursor.execute(f"""
+        SELECT prev_dt, next_dt FROM (
+            SELECT trade_date AS prev_dt, LEAD(trade_date) OVER (ORDER BY trade_date) AS next_dt
+            FROM {table}
+        ) t
+        WHERE TIMESTAMPDIFF(SECOND, prev_dt, next_dt) > %s
+    """, (step,))
+    rows = cursor.fetchall()
+    prev = np.array([r[0] for r in rows], dtype='datetime64[s]')
+    nxt = np.array([r[1] for r in rows], dtype='datetime64[s]')
+    return prev, nxt
+
+
+def find_gaps(ts, step):
+    """
+    :param ts: 升序 datetime64 数组
+    :param step: 步长(秒)
+    :return: (prev, next) 缺口两端的时间戳，next - prev > step
+    """
+    ts = np.asarray(ts, dtype='datetime64[s]')
+    if len(ts) < 2:
+        return ts[:0], ts[:0]
+    diff = np.diff(ts).astype(np.int64)
+    idx = np.nonzero(diff > step)[0]
+    return ts[idx], ts[idx + 1]
+
+
+def expand_gaps(prev, nxt, step):
+    """
+    把缺口展开成缺失的时间戳
+    :return: (missing, source) source 为每个缺失点要复制的上一条已有记录
     """
-    对每张表做“逐时间戳扫描”，发现缺口 => 把上一条记录复制插入
+    if len(prev) == 0:
+        empty = np.array([], dtype='datetime64[s]')
+        return empty, empty
+    counts = ((nxt - prev).astype(np.int64) // step - 1).astype(np.int64)
+    counts = np.maximum(counts, 0)
+    source = np.repeat(prev, counts)
+    # 每个缺口内的序号 1..count
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+    missing = source + (offsets * step).astype('timedelta64[s]')
+    return missing, source
+
+
+def missing_days_from_timestamps(ts, start, end):
+    """[start, end] 中一条数据都没有的自然日"""
+    expected = np.arange(np.datetime64(pd.Timestamp(start).date(), 'D'),
+                         np.datetime64(pd.Timestamp(end).date(), 'D') + 1)
+    present = np.unique(np.asarray(ts, dtype='datetime64[s]').astype('datetime64[D]'))
+    return [d.astype(object) for d in np.setdiff1d(expected, present, assume_unique=True)]
+
+
+def check_and_repair_tables(data_handler, coins, time_gaps, use_window_sql=False, repair=True, chunk_size=5000):
+    """
+    整列找缺口 => 用缺口前的最后一条记录前向填充，一次批量写入
+    :param use_window_sql: True 时用 LEAD() 窗口函数在库里找缺口，不拉整列时间戳
+    :param repair: False 时只统计不修补
+    :return: {table: {'rows', 'gaps', 'missing', 'max_gap', 'inserted'}}
     """
     conn = data_handler.conn
-    cur  = conn.cursor(dictionary=True)
+    cur = conn.cursor()
+    report = {}
 
     for coin in coins:
         symbol = f"{coin.upper()}USDT"
         for iv in time_gaps:
             step = STEP_SEC[iv]
             table = f"{symbol}_{iv}"
+            try:
+                # 0⃣ 找缺口：一次查询 + 向量化 diff
+                if use_window_sql:
+                    cur.execute(f"SELECT COUNT(*) FROM {table}")
+                    n_rows = cur.fetchone()[0]
+                    prev, nxt = fetch_gaps_sql(cur, table, step)
+                else:
+                    ts = fetch_trade_dates(cur, table)
+                    n_rows = len(ts)
+                    prev, nxt = find_gaps(ts, step)
+                if n_rows == 0:
+                    print(f"[空表] {table} 跳过")
+                    continue
+                missing, source = expand_gaps(prev, nxt, step)
+                gap_len = ((nxt - prev).astype(np.int64) // step - 1) if len(prev) else np.array([0])
+                stats = {'rows': int(n_rows), 'gaps': int(len(prev)), 'missing': int(len(missing)),
+                         'max_gap': int(gap_len.max()), 'inserted': 0}
+                report[table] = stats
+                print(f"\n🔍 {table}: {stats['rows']} 行, {stats['gaps']} 个缺口, 缺 {stats['missing']} 根, "
+                      f"最长缺口 {stats['max_gap']} 根")
+                if not repair or len(missing) == 0:
+                    continue
 
-            # 0⃣ 最早、最晚时间
-            cur.execute(f"SELECT MIN(trade_date) AS min_dt, MAX(trade_date) AS max_dt FROM {table}")
-            row = cur.fetchone()
-            if not row['min_dt']:
-                print(f"[空表] {table} 跳过")
-                continue
-            t_min, t_max = row['min_dt'], row['max_dt']
-            print(f"\n🔍 {table} 扫描 {t_min} → {t_max}")
-
-            # 1⃣ 预编译 SQL
-            exist_sql = f"SELECT 1 FROM {table} WHERE trade_date = %s LIMIT 1"
-            insert_sql = (
-                f"INSERT INTO {table} "
-                f"(trade_date, open, high, low, close, vol1, vol)"   # 按实际列改
-                f"SELECT %s, open, high, low, close, vol1, vol "
-                f"FROM {table} WHERE trade_date = %s LIMIT 1"
-            )
-
-            # query = f"""INSERT INTO {table_name}
-            #                             (trade_date, open, high, low, close, vol1, vol)
-            #                             VALUES (%s, %s, %s, %s, %s, %s, %s)
-            #                             ON DUPLICATE KEY UPDATE
-            #                             open = VALUES(open), high = VALUES(high), low = VALUES(low),
-            #                             close = VALUES(close), vol1 = VALUES(vol1), vol = VALUES(vol);"""
-
-            t_cur   = t_min
-            inserted, checked = 0, 0
-
-            while t_cur < t_max:
-                t_next = t_cur + timedelta(seconds=step)
-                cur.execute(exist_sql, (t_next.strftime("%Y-%m-%d %H:%M:%S"),))
-                exists = cur.fetchone()
-                checked += 1
-                print(f'\r {t_cur}', end='')
-                if not exists:
-                    # 复制上一行插入
-                    cur.execute(insert_sql, (t_next.strftime("%Y-%m-%d %H:%M:%S"), t_cur.strftime("%Y-%m-%d %H:%M:%S")))
-                    inserted += 1
-                    print(f'\r 检测到 {t_cur} 不存在！插补一次！', end='')
-                    if inserted % 5000 == 0:      # 批量提交
-                        conn.commit()
-                        print(f"   已修补 {inserted} 条 …")
-
-                t_cur = t_next
-
-            conn.commit()
-            print(f"✅ {table} 扫描完成，检查 {checked} 步，补 {inserted} 行")
+                # 1⃣ 一次取出所有缺口前的记录，按缺失点展开
+                src_keys = np.unique(prev).astype(str)
+                src_rows = []
+                for i in range(0, len(src_keys), 1000):
+                    keys = [k.replace('T', ' ') for k in src_keys[i:i + 1000]]
+                    cur.execute(f"SELECT trade_date, open, high, low, close, vol1, vol FROM {table} "
+                                f"WHERE trade_date IN ({', '.join(['%s'] * len(keys))})", keys)
+                    src_rows.extend(cur.fetchall())
+                src = pd.DataFrame(src_rows, columns=KLINE_COLUMNS)
+                src['trade_date'] = pd.to_datetime(src['trade_date'])
+                src = src.set_index('trade_date')
+                fill = src.reindex(pd.to_datetime(source)).reset_index(drop=True)
+                fill.insert(0, 'trade_date', pd.to_datetime(missing))
+
+                # 2⃣ 一次批量写入
+                inserted = data_handler.insert_data(symbol, iv, fill, chunk_size=chunk_size, vol1_scale=None)
+                stats['inserted'] = int(inserted or 0)
+                print(f"✅ {table} 补 {stats['inserted']} 行")
+            except Exception as e:
+                print(f"处理失败 {table}: {e}")
 
     cur.close()
     print("\n🎉 所有表修补完毕")
+    return report
 
 if __name__ == '__main__':
     from okex import OkexSpot
@@ -4,7 +4,6 @@ import re
 import decimal
 import time 
 from concurrent.futures import ThreadPoolExecutor, as_completed
-import multiprocessing
 
 # 动态添加bpx包路径到sys.path
 def _add_bpx_path():
@@ -23,7 +22,11 @@ print('PROJECT_ROOT: ', _PROJECT_ROOT, 'CURRENT_DIR: ', os.path.dirname(os.path.
 
 
 import logging
-from ctos.drivers.okx.util import BeijingTime, align_decimal_places, save_para, rate_price2order, cal_amount, round_like, fuzzy_exchange_input
+from ctos.drivers.okx.util import BeijingTime, align_decimal_places, save_para, rate_price2order, cal_amount, round_like, decimals_like, fuzzy_exchange_input
+from ctos.core.kernel.syscalls import run_concurrent
+from ctos.core.kernel.async_syscalls import DEFAULT_ACCOUNT_CONCURRENCY
+from ctos.core.runtime.OrderChaser import get_order_chaser
+import numpy as np
 import time
 # from average_method import get_good_bad_coin_group  # 暂时注释掉，文件不存在
 import json
@@ -105,222 +108,251 @@ class ExecutionEngine:
             self.init_balance = 0.0
         
         # 初始化其他属性
-        self.watch_threads = []  # 存储所有监控线程
         self.soft_orders_to_focus = []
+        # 所有软订单交给同一个追价服务（每个驱动一个线程），不再每次 focus_on_orders 起新线程
+        self.chaser = get_order_chaser(self.cex_driver, logger=self.logger)
+        self.chaser.on_done(self._on_chase_done)
         
         self.logger.info(f"ExecutionEngine initialized for {self.exchange_type} account {account}")
 
 
-    def set_coin_position_to_target(self, usdt_amounts=[10], coins=['eth'], soft=False, async_mode=False, max_workers= multiprocessing.cpu_count(), stack_mode=False):
+    def set_coin_position_to_target(self, usdt_amounts=[10], coins=['eth'], soft=False, async_mode=False, max_workers=DEFAULT_ACCOUNT_CONCURRENCY, stack_mode=False, min_usdt=1.0, dry_run=False):
+        """
+        把一组币种的仓位调整到目标金额（USDT，正数做多、负数做空）
+        先 plan_target_positions 一次性算出整张下单计划，再 dispatch_plan 批量并发下单
+        :param async_mode: 保留参数，下单总是并发的（协程版本见 AsyncExecutionEngine）
+        :param max_workers: 网络 I/O 并发数（与 CPU 核数无关）
+        :param stack_mode: True 时目标金额在现有仓位上叠加（不读持仓）
+        :param min_usdt: 差额小于该金额的币种跳过
+        :param dry_run: 只生成计划不下单，返回 plan
+        :return: soft 订单ID列表（同之前），dry_run 时返回 plan
+        """
         start_time = time.time()
-        position_infos, err = self.cex_driver.get_position(keep_origin=False)
+        plan, err = self.plan_target_positions(usdt_amounts, coins, soft=soft, stack_mode=stack_mode,
+                                               min_usdt=min_usdt, max_workers=max_workers)
         if err:
-            self.logger.warning(f"Failed to get position: {err}")
+            self.logger.warning(f"Failed to plan target positions: {err}")
             return None, err
-        all_pos_info = {}
-        for x in position_infos:
-            if float(x['quantity']) != 0:
-                all_pos_info[x['symbol']] = x
-        print('all_pos_info.keys: ', all_pos_info.keys())
-        
-        # 如果启用异步模式，使用并发处理
-        if async_mode:
-            if max_workers is None:
-                max_workers = 5  # 默认5个并发线程
-            print(f"🚀 启动异步模式，最大并发数: {max_workers}")
-            
-            # 准备任务数据
-            tasks = []
-            for coin, usdt_amount in zip(coins, usdt_amounts):
-                tasks.append((coin, usdt_amount, soft, all_pos_info, stack_mode))
-            
-            # 使用线程池并发执行
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = []
-                for coin, usdt_amount, soft, all_pos_info, stack_mode in tasks:
-                    future = executor.submit(self._process_single_coin_async, coin, usdt_amount, soft, all_pos_info, stack_mode)
-                    futures.append(future)
-                
-                # 等待所有任务完成
-                for future in as_completed(futures):
-                    try:
-                        result = future.result(timeout=60)
-                        if result:
-                            print(f"✅ {result['coin'].upper()} 处理完成")
-                    except Exception as e:
-                        print(f"❌ 任务执行异常: {e}")
-            
-            print(f'本次异步初始化耗时: {round(time.time() - start_time)}')
-            return self.soft_orders_to_focus
-        
-        # 原有同步逻辑
-        for coin, usdt_amount in zip(coins, usdt_amounts):
+        if dry_run:
+            return plan
+        self.dispatch_plan(plan, max_workers=max_workers)
+        print(f'本次初始化耗时: {round(time.time() - start_time, 2)}s, 计划 {len(plan["orders"])} 单, 跳过 {len(plan["skipped"])} 个')
+        return self.soft_orders_to_focus
+
+    def _bulk_exchange_limits(self, symbols, max_workers=8):
+        """
+        批量取下单精度信息：命中缓存的直接返回；缺得多时先全量拉一次（驱动写入 exchange_trade_info），
+        剩下的并发补齐（有 limits_cache 的驱动，未命中时自己会合并成一次批量加载）
+        :return: {symbol: limits 或 None}
+        """
+        cache = getattr(self.cex_driver, 'exchange_trade_info', None)
+        out = {s: cache[s] for s in symbols if cache is not None and s in cache}
+        missing = [s for s in symbols if s not in out]
+        if cache is not None and len(missing) > 3 and getattr(self.cex_driver, 'limits_cache', None) is None:
             try:
-                symbol_full, _, _ = self.cex_driver._norm_symbol(coin)
-                # exchange = init_CexClient(coin)
-                if stack_mode:
-                    data = None
-                else:
-                    data = all_pos_info.get(symbol_full, None)
-                if not data:
-                    if not stack_mode:
-                        print('！！！！！！！！！！还没开仓呢哥！')
-                        self.monitor.record_operation("SetCoinPosition  OpenPosition", self.strategy_detail,
-                                                    {"symbol": symbol_full, "error": "无法获取持仓信息"})
-                    try:
-                        # if 1>0:
-                        _, err = self.place_incremental_orders(abs(usdt_amount), coin, 'sell' if usdt_amount < 0 else 'buy', async_mode=async_mode,
-                                                        soft=soft if coin.lower().find(
-                                                            'xaut') == -1 or coin.lower().find(
-                                                            'trx') == -1 else False)
-                        if err:
-                            self.logger.warning(f"Failed to place incremental orders: {err}")
-                            return None, err
-                    except Exception as ex:
-                        print('！！！！！！！！！！！！！艹了！怎么出这种问题', ex)
-                        self.monitor.handle_error(str(ex),
-                                                  context=f" OpenPosition Fallback in set_coin_position_to_target for {coin}")
-                    continue
-                if data:
-                    side = data['side']
-                    open_position = float(data['quantityUSD']) if  side == 'long' else -float(data['quantityUSD'])
-                    diff = open_position - usdt_amount
-                    # if abs(diff) < 1:
-                    #     continue
-                    print(f"【{coin.upper()} 】需要补齐差额: {round(diff, 2)} = 现有:{round(open_position, 2)} - Target:{round(usdt_amount)}")
-                    # 记录操作开始
-                    
-                    oid, err = self.place_incremental_orders(abs(diff), coin, 'sell' if diff > 0 else 'buy', soft=soft if coin.lower().find('xaut') == -1 or coin.lower().find('trx') == -1 else False)
-                    if oid:
-                        self.monitor.record_operation("SetCoinPosition AlignTo", self.strategy_detail, {
-                        "symbol": symbol_full,
-                        "target_amount": usdt_amount,
-                        "open_position": open_position,
-                        "diff": diff,
-                        'order_id': oid,
-                        'status': 'success'
-                    })
-                    else:
-                        self.monitor.record_operation("SetCoinPosition AlignTo", self.strategy_detail, {
-                        "symbol": symbol_full,
-                        "target_amount": usdt_amount,
-                        "open_position": open_position,
-                        "diff": diff,
-                        'error': err,
-                        'status': 'failed'
-                    })
+                self.cex_driver.exchange_limits()
             except Exception as e:
-                print('！！！！！！！！！！！倒霉催的', e)
-                self.monitor.handle_error(str(e), context=f"set_coin_position_to_target for {coin}")
-                try:
-                    oid, err = self.place_incremental_orders(abs(usdt_amount), coin, 'sell' if usdt_amount < 0 else 'buy', soft=soft if coin.lower().find('xaut') == -1 else False)
-                    if oid:
-                        self.monitor.record_operation("Handle Error", self.strategy_detail, {"symbol": symbol_full,
-                        "target_amount": coin,
-                        'order_id': oid,
-                        'status': 'success'})
-                    else:
-                        self.monitor.record_operation("SetCoinPosition AlignTo", self.strategy_detail, {
-                        "symbol": symbol_full,
-                        "target_amount": coin,
-                        'error': err,
-                        'status': 'failed',
-                    })
-                    if err:
-                        self.logger.warning(f"Failed to place incremental orders: {err}")
-                        return None, err
-                except Exception as ex:
-                    print('！！！！！！！！！！！！！艹了！', e)
-                    self.monitor.handle_error(str(ex), context=f"ErrorHandle Fallback in set_coin_position_to_target for {coin} after handle error to {'sell' if usdt_amount < 0 else 'buy'} {usdt_amount}")
-                continue
-        print(f'本次初始化耗时: {round(time.time() - start_time)}')
-        return self.soft_orders_to_focus
+                self.logger.warning(f"Bulk exchange_limits failed: {e}")
+
+        def _one(symbol):
+            res = self.cex_driver.exchange_limits(symbol=symbol)
+            return res if isinstance(res, tuple) else (None, res)
 
-    def _order_tracking_logic(self, coins, soft_orders_to_focus):
+        for symbol, (limits, err) in zip(missing, run_concurrent(_one, missing, max_workers)):
+            if err or not isinstance(limits, dict) or 'error' in limits:
+                print(f'CEX DRIVER.exchange_limits error {symbol}: {err or limits}')
+                limits = None
+            out[symbol] = limits
+        return out
+
+    def plan_target_positions(self, usdt_amounts, coins, soft=False, stack_mode=False, min_usdt=1.0, max_workers=8):
+        """
+        生成整张调仓计划（不下单）：
+        1. 同一币种的多个目标先合并（对冲的部分直接抵消，不会一买一卖）
+        2. 持仓一次拉全；精度、价格、本地盘口批量/并发获取
+        3. 差额、下单张数、限价用向量计算，一次算完所有币种
+        :return: ({'orders': [...], 'skipped': [...], 'elapsed': 秒}, err)
+        """
         start_time = time.time()
-        done_coin = []
-        # time.sleep(10)
-        coin_process_times = {}
-        exchange = self.cex_driver
-        watch_times_for_all_coins = 0
-        while True:
-            need_to_watch = False
-            for coin in coins:
-                try:
-                # if True:
-                    if coin in done_coin:
-                        # if coin in done_coin or coin == 'btc':
-                        continue
-                    if coin_process_times.get(coin):
-                        coin_process_times[coin] += 1
-                    else:
-                        coin_process_times[coin] = 1
-                    symbol = exchange._norm_symbol(coin)[0]
-                    exist_orders_for_coin, err = exchange.get_open_orders(symbol=symbol, onlyOrderId=True)
-                    # print(f'exist_orders_for_coin: {exist_orders_for_coin}, err: {err}')
-                    if err or not exist_orders_for_coin:
-                        done_coin.append(coin)
-                        continue
-                    if len(exist_orders_for_coin) == 0 or len([x for x in exist_orders_for_coin if x in soft_orders_to_focus]) == 0:
-                        done_coin.append(coin)
-                        continue
-                    for order in exist_orders_for_coin:
-                        if order in soft_orders_to_focus:
-                            # print(f'order: {order} is still opening')
-                            data, err = exchange.get_order_status(order_id=order, symbol=exchange._norm_symbol(coin)[0], keep_origin=False)
-                            if err or not data:
-                                print(f'data: {data}, err: {err}')
-                                continue
-                            now_price = exchange.get_price_now(symbol)
-                            if now_price <= float(data['price']):
-                                tmp_price = align_decimal_places(now_price, now_price * (1 + 0.0001 * (200 - watch_times_for_all_coins) / 200))
-                                if tmp_price == float(data['price']):
-                                    continue
-                                new_price = tmp_price if tmp_price < float(data['price']) else float(data['price'])
-                            else:
-                                tmp_price = align_decimal_places(now_price, now_price * (1 - 0.0001 * (200 - watch_times_for_all_coins) / 200))
-                                if tmp_price == float(data['price']):
-                                    continue
-                                new_price = tmp_price if tmp_price > float(data['price']) else float(data['price'])
-                            # 解决 TypeError: 'str' object cannot be interpreted as an integer
-                            # pop() 需要传入索引时是整数，但这里 order 是订单号（字符串），应使用 remove
-                            need_to_watch = True
-                            new_order, err = exchange.amend_order(order_id=order,  symbol=self.cex_driver._norm_symbol(coin)[0], price=new_price, quantity=float(data['quantity']))
-                            if new_order is None and err is None:
-                                soft_orders_to_focus.remove(order)
-                                print(f"\n  {order} is deal: {self.cex_driver._norm_symbol(coin)[0]}")
-                                done_coin.append(coin)
-                                time.sleep(2.88)
-                            else:
-                                if err is None and exchange.cex.lower() == 'backpack':
-                                    soft_orders_to_focus[soft_orders_to_focus.index(order)] = new_order
-                                print(f"\n\namend_order  {order} to {new_order}: {self.cex_driver._norm_symbol(coin)[0]} {new_price}, {float(data['quantity'])}")
-                                time.sleep(6.66)
-                    print(f'\r共有{len(coins)}个币种，完成了{len(done_coin)}个, 正追踪【{coin}】中，它目前还有{len(exist_orders_for_coin)}个订单', end=' ')
-                except Exception as e:
-                    try:
-                        print('❌ 订单追踪失败000：', coin, exist_orders_for_coin, len(soft_orders_to_focus), e, data)
-                    except Exception as e1:
-                        print('❌ 订单追踪失败111：', coin, exist_orders_for_coin, len(soft_orders_to_focus), e, e1)
-            # 这里之前多打了个tab 差点没把我弄死，每次都只监控一个订单就退出了，绝
-            if not need_to_watch or time.time() - start_time > 10800:
-                print(f'✅ {"到点了" if need_to_watch else "所有订单都搞定了"}，收工！')
-                self.soft_orders_to_focus = [x for x in self.soft_orders_to_focus if x not in soft_orders_to_focus]
-                if len(self.watch_threads) >= 1:
-                    self.watch_threads = self.watch_threads[:-1]
-                return
-            watch_times_for_all_coins += 1
+        targets = {}
+        coin_of = {}
+        for coin, usdt_amount in zip(coins, usdt_amounts):
+            symbol_full, _, _ = self.cex_driver._norm_symbol(coin)
+            targets[symbol_full] = targets.get(symbol_full, 0.0) + float(usdt_amount)
+            coin_of.setdefault(symbol_full, coin)
+        symbols = list(targets)
+        skipped = []
+        if not symbols:
+            return {'orders': [], 'skipped': skipped, 'elapsed': 0.0}, None
+
+        current = np.zeros(len(symbols))
+        if not stack_mode:
+            position_infos, err = self.cex_driver.get_position(keep_origin=False)
+            if err:
+                return None, err
+            all_pos_info = {}
+            for x in position_infos or []:
+                if float(x['quantity']) != 0:
+                    all_pos_info[x['symbol']] = x
+            print('all_pos_info.keys: ', all_pos_info.keys())
+            for i, symbol in enumerate(symbols):
+                data = all_pos_info.get(symbol)
+                if data:
+                    current[i] = float(data['quantityUSD']) if data['side'] == 'long' else -float(data['quantityUSD'])
+
+        limits = self._bulk_exchange_limits(symbols, max_workers=max_workers)
+        tops = [self._live_top_of_book(symbol) for symbol in symbols]
+
+        def _price(i):
+            if tops[i]:
+                return (tops[i][0] + tops[i][1]) / 2
+            return self.cex_driver.get_price_now(coin_of[symbols[i]])
+        prices = run_concurrent(_price, range(len(symbols)), max_workers)
+
+        n = len(symbols)
+        price = np.full(n, np.nan)
+        contract_value = np.full(n, np.nan)
+        min_size = np.ones(n)
+        size_dec = np.zeros(n, dtype=int)
+        price_dec = np.zeros(n, dtype=int)
+        for i, symbol in enumerate(symbols):
+            p = prices[i]
+            if isinstance(p, tuple):  # run_concurrent 把异常包成 (None, e)
+                p = None
+            lim = limits[symbol]
+            if p is None or lim is None:
+                continue
+            price[i] = float(p)
+            contract_value[i] = float(lim['contract_value'])
+            min_size[i] = float(lim['min_order_size'])
+            size_dec[i] = decimals_like(lim['min_order_size'])
+            price_dec[i] = decimals_like(lim['price_precision'])
+
+        target = np.array([targets[s] for s in symbols])
+        diff = current - target                      # > 0 卖出, < 0 买入（同之前的约定）
+        usdt = np.abs(diff)
+        base = price * contract_value
+        with np.errstate(divide='ignore', invalid='ignore'):
+            amount = _round_dec(usdt / base, size_dec)
+            # 张数太小凑不够一张时，金额放大 1.25^k 再试（同 place_incremental_orders）
+            for k in (2, 3, 4):
+                zero = amount == 0
+                if not zero.any():
+                    break
+                amount[zero] = _round_dec(usdt[zero] * pow(1.25, k) / base[zero], size_dec[zero])
+
+        orders = []
+        for i, symbol in enumerate(symbols):
+            info = {'symbol': symbol, 'coin': coin_of[symbol], 'target_amount': float(target[i]),
+                    'open_position': float(current[i]), 'diff': float(diff[i])}
+            if usdt[i] < min_usdt:
+                skipped.append(dict(info, reason='差额太小'))
+                continue
+            if not np.isfinite(base[i]) or base[i] <= 0:
+                skipped.append(dict(info, reason='获取价格或精度失败'))
+                continue
+            if not amount[i] > 0:
+                skipped.append(dict(info, reason='订单金额过小，无法下单'))
+                continue
+            side = 'sell' if diff[i] > 0 else 'buy'
+            order = dict(info, side=side, size=float(amount[i]), ref_price=float(price[i]), soft=soft)
+            if soft:
+                top = tops[i]
+                ref = (top[0] if side == 'buy' else top[1]) if top else price[i]
+                order.update(order_type='limit', price=float(_round_dec(np.array([ref]), price_dec[i:i + 1])[0]))
+            else:
+                order.update(order_type='MARKET', price=None)
+            orders.append(order)
+        elapsed = time.time() - start_time
+        for o in orders:
+            print(f"【{o['coin'].upper()} 】需要补齐差额: {round(o['diff'], 2)} = 现有:{round(o['open_position'], 2)} - Target:{round(o['target_amount'])} -> {o['side']} {o['size']}")
+        return {'orders': orders, 'skipped': skipped, 'elapsed': elapsed}, None
+
+    def dispatch_plan(self, plan, max_workers=8):
+        """
+        把 plan_target_positions 的计划一次性交给驱动的 place_orders_batch（原生批量或并发单笔）
+        :return: [(order, order_id, err), ...]
+        """
+        batch = self._plan_batch(plan)
+        if not batch:
+            return []
+        results, err = self.cex_driver.place_orders_batch(batch, max_workers=max_workers)
+        return self._record_dispatch(plan['orders'], results, err)
+
+    def _plan_batch(self, plan):
+        """记录跳过的币种，返回 place_orders_batch 的参数列表"""
+        for x in plan['skipped']:
+            self.monitor.record_operation("SetCoinPosition Skip", self.strategy_detail, x)
+        return [{'symbol': o['symbol'], 'side': o['side'], 'order_type': o['order_type'],
+                 'size': o['size'], 'price': o['price']} for o in plan['orders']]
+
+    def _record_dispatch(self, orders, results, err=None):
+        """下单结果入账：order_id_to_symbol / 软订单 / order_state / 审计记录"""
+        if err or results is None:
+            results = [(None, err)] * len(orders)
+        order_state = getattr(self.cex_driver, 'order_state', None)
+        out = []
+        for o, (oid, err) in zip(orders, results):
+            record = {"symbol": o['symbol'], "target_amount": o['target_amount'], "open_position": o['open_position'],
+                      "diff": o['diff'], "action": o['side'], "price": o['price'] or o['ref_price'], "sizes": o['size']}
+            if oid:
+                self.cex_driver.order_id_to_symbol[oid] = o['coin']
+                if o['soft']:
+                    self.soft_orders_to_focus.append(oid)
+                if order_state is not None:
+                    order_state.track(oid, o['symbol'], side=o['side'], price=o['price'], quantity=o['size'])
+                print(f"\r{BeijingTime()} {self.cex_driver.cex.upper()}-{self.account} **{o['side'].upper()}** order for {o['size']} units of 【{o['coin'].upper()}】 at price {record['price']}")
+                self.monitor.record_operation("SetCoinPosition AlignTo", self.strategy_detail,
+                                              dict(record, order_id=oid, status='success'))
+            else:
+                print(f"❌ {o['coin'].upper()} 订单创建失败: {err}")
+                self.monitor.record_operation("SetCoinPosition AlignTo", self.strategy_detail,
+                                              dict(record, error=str(err), status='failed'))
+            out.append((o, oid, err))
+        return out
+
+    @property
+    def watch_threads(self):
+        """兼容旧用法 `while len(engine.watch_threads) > 0`：追价服务还有订单时返回其线程"""
+        thread = self.chaser.thread
+        return [thread] if thread is not None and self.chaser.pending() else []
+
+    def _on_chase_done(self, order_id, outcome, new_order_id):
+        if order_id in self.soft_orders_to_focus:
+            idx = self.soft_orders_to_focus.index(order_id)
+            if new_order_id is not None:
+                self.soft_orders_to_focus[idx] = new_order_id
+            else:
+                self.soft_orders_to_focus.pop(idx)
 
     def focus_on_orders(self, coins, soft_orders_to_focus):
-        """为每一组监控任务启动一个后台线程"""
-        t = threading.Thread(
-            target=self._order_tracking_logic,
-            args=(coins, soft_orders_to_focus),
-            daemon=True
-        )
-        t.start()
-        self.watch_threads.append(t)
-        print(f"🎯 新监控线程已启动，共 {len(self.watch_threads)} 个任务运行中")
+        """
+        把软订单交给追价服务；订单对应的交易对从 order_id_to_symbol 取，
+        取不到的按 coins 查一次挂单补齐
+        """
+        exchange = self.cex_driver
+        orders = {}
+        for order in soft_orders_to_focus:
+            if not isinstance(order, (str, int)) or isinstance(order, bool):
+                # 下单失败时上游可能把 (None, err) 之类传进来，不是订单号的直接跳过
+                continue
+            coin = exchange.order_id_to_symbol.get(order)
+            orders[order] = exchange._norm_symbol(coin)[0] if coin else None
+        unknown = set(o for o, symbol in orders.items() if symbol is None)
+        for coin in coins if unknown else []:
+            symbol = exchange._norm_symbol(coin)[0]
+            exist_orders_for_coin, err = exchange.get_open_orders(symbol=symbol, onlyOrderId=True)
+            for order in (exist_orders_for_coin or []) if not err else []:
+                if order in unknown:
+                    orders[order] = symbol
+                    unknown.discard(order)
+            if not unknown:
+                break
+        added = self.chaser.chase(orders)
+        print(f"🎯 追价服务新增 {added} 个订单，共 {self.chaser.pending()} 个订单追踪中")
+
+    def get_chase_metrics(self):
+        return self.chaser.get_metrics()
 
     def revoke_all_orders(self):
         open_orders, err = self.cex_driver.get_open_orders(onlyOrderId=True)
@@ -332,6 +364,20 @@ class ExecutionEngine:
                 self.cex_driver.revoke_order(order_id, self.cex_driver.order_id_to_symbol[order_id])
         self.cex_driver.order_id_to_symbol = {}
 
+    def _live_top_of_book(self, symbol):
+        """
+        从驱动的本地 L2 订单簿取 (买一, 卖一)，驱动不支持或订单簿未同步时返回 None
+        """
+        get_local_book = getattr(self.cex_driver, 'get_local_book', None)
+        if get_local_book is None:
+            return None
+        try:
+            book = get_local_book(symbol)
+            return book.top() if book is not None else None
+        except Exception as e:
+            self.logger.warning(f"Failed to read local book {symbol}: {e}")
+            return None
+
     def place_incremental_orders(self, usdt_amount, coin, direction, soft=False, price=None, async_mode=False):
         """
         根据usdt_amount下分步订单，并通过 SystemMonitor 记录审核信息
@@ -340,6 +386,8 @@ class ExecutionEngine:
         symbol_full, _, _ = self.cex_driver._norm_symbol(coin)
         if price:
             soft=True
+        # 未指定价格时优先用本地订单簿的买一/卖一（无网络延迟）
+        top = None if price else self._live_top_of_book(symbol_full)
         exchange = self.cex_driver
         soft_orders_to_focus = []
         exchange_limits_info, err = self.cex_driver.exchange_limits(symbol=symbol_full)
@@ -352,6 +400,8 @@ class ExecutionEngine:
         contract_value = exchange_limits_info['contract_value']
 
         # 获取当前市场价格
+        if price is None and top:
+            price = (top[0] + top[1]) / 2
         price = exchange.get_price_now(coin) if price is None else price
         if price is None:
             self.monitor.record_operation("PlaceIncrementalOrders", self.strategy_detail,
@@ -378,7 +428,9 @@ class ExecutionEngine:
                     self.cex_driver.order_id_to_symbol[order_id] = coin
                     soft_orders_to_focus.append(order_id)
             else:
-                if price:
+                if top:
+                    limit_price = round_like(price_precision, top[0])
+                elif price:
                     limit_price = round_like(price_precision, price)
                 else:
                     limit_price = round_like(price_precision, price * 0.9995)
@@ -402,7 +454,9 @@ class ExecutionEngine:
                 if order_id:
                     soft_orders_to_focus.append(order_id)
             else:
-                if price:
+                if top:
+                    limit_price = round_like(price_precision, top[1])
+                elif price:
                     limit_price =  round_like(price_precision, price)
                 else:
                     limit_price = round_like(price_precision, price * 1.0005)
@@ -430,48 +484,11 @@ class ExecutionEngine:
             self.soft_orders_to_focus += soft_orders_to_focus
         return soft_orders_to_focus, None
 
-    def _process_single_coin_async(self, coin, usdt_amount, soft, all_pos_info, stack_mode=False):
-        """
-        异步处理单个币种的持仓调整
-        """
-        try:
-            symbol_full, _, _ = self.cex_driver._norm_symbol(coin)
-            if stack_mode:
-                data = None
-            else:
-                data = all_pos_info.get(symbol_full, None)
-            
-            if not data:
-                if not stack_mode:
-                    print(f'🆕 {coin.upper()} 还没开仓呢哥！')
-                try:
-                    _, err = self.place_incremental_orders(abs(usdt_amount), coin, 'sell' if usdt_amount < 0 else 'buy',
-                                                    soft=soft if coin.lower().find('xaut') == -1 or coin.lower().find('trx') == -1 else False)
-                    if err:
-                        return {'coin': coin, 'success': False, 'error': err}
-                except Exception as ex:
-                    print(f'❌ {coin.upper()} 开仓失败: {ex}')
-                    return {'coin': coin, 'success': False, 'error': str(ex)}
-            else:
-                side = data['side']
-                open_position = float(data['quantityUSD']) if side == 'long' else -float(data['quantityUSD'])
-                diff = open_position - usdt_amount
-                
-                if abs(diff) < 1:
-                    return {'coin': coin, 'success': True, 'message': '差额太小，跳过'}
-                
-                print(f"📊 【{coin.upper()}】需要补齐差额: {round(diff, 2)} = 现有:{round(open_position, 2)} - Target:{round(usdt_amount)}")
-                
-                oid, err = self.place_incremental_orders(abs(diff), coin, 'sell' if diff > 0 else 'buy', 
-                                                        soft=soft if coin.lower().find('xaut') == -1 or coin.lower().find('trx') == -1 else False)
-                if oid:
-                    return {'coin': coin, 'success': True, 'order_id': oid}
-                else:
-                    return {'coin': coin, 'success': False, 'error': err}
-                    
-        except Exception as e:
-            print(f'❌ {coin.upper()} 处理异常: {e}')
-            return {'coin': coin, 'success': False, 'error': str(e)}
+
+def _round_dec(x, decimals):
+    """逐元素按小数位数四舍五入（decimals 可为负，同 round_like）"""
+    scale = np.power(10.0, decimals)
+    return np.round(x * scale) / scale
 
 
 def init_all_thing(exchange_type='okx', account=0):
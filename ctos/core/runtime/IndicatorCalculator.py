@@ -1,5 +1,275 @@
 from Config import ACCESS_KEY, SECRET_KEY, PASSPHRASE, HOST_IP, HOST_USER, HOST_PASSWD, HOST_IP_1
 from DataHandler import DataHandler
+from IndicatorPanel import IndicatorPanel
+from collections import deque
+import math
+
+NAN = float('nan')
+
+
+class _RollingMean:
+    """定长窗口均值，running sum，O(1)；窗口未满时为 NaN（同 pandas rolling）"""
+    __slots__ = ('window', 'values', 'total', 'pushes')
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.pushes = 0
+
+    def push(self, x):
+        self.values.append(x)
+        self.total += x
+        if len(self.values) > self.window:
+            self.total -= self.values.popleft()
+        self.pushes += 1
+        if self.pushes % (self.window * 1000) == 0:
+            self.total = math.fsum(self.values)  # 定期重算，消除浮点累积误差
+        return self.total / self.window if len(self.values) == self.window else NAN
+
+
+class _RollingStd:
+    """定长窗口样本标准差（ddof=1），平移后的 sum / sum of squares，O(1)"""
+    __slots__ = ('window', 'values', 'shift', 's1', 's2')
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.shift = None
+        self.s1 = 0.0
+        self.s2 = 0.0
+
+    def push(self, x):
+        if self.shift is None:
+            self.shift = x
+        d = x - self.shift
+        self.values.append(d)
+        self.s1 += d
+        self.s2 += d * d
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            self.s1 -= old
+            self.s2 -= old * old
+        n = len(self.values)
+        if n < self.window:
+            return NAN
+        var = (self.s2 - self.s1 * self.s1 / n) / (n - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class _RollingExtreme:
+    """单调队列求窗口最大/最小值，均摊 O(1)"""
+    __slots__ = ('window', 'is_max', 'q', 'i')
+
+    def __init__(self, window, is_max):
+        self.window = window
+        self.is_max = is_max
+        self.q = deque()   # (index, value)
+        self.i = 0
+
+    def push(self, x):
+        q = self.q
+        if self.is_max:
+            while q and q[-1][1] <= x:
+                q.pop()
+        else:
+            while q and q[-1][1] >= x:
+                q.pop()
+        q.append((self.i, x))
+        if q[0][0] <= self.i - self.window:
+            q.popleft()
+        self.i += 1
+        return q[0][1] if self.i >= self.window else NAN
+
+
+class _Ema:
+    """pandas ewm(adjust=False) 的递推形式，第一根直接取值"""
+    __slots__ = ('alpha', 'value')
+
+    def __init__(self, span=None, alpha=None):
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1.0)
+        self.value = None
+
+    def push(self, x):
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+
+class IndicatorState:
+    """
+    单个 symbol/周期 的流式指标状态，push(bar) 每根 K 线 O(1) 更新，
+    输出列名与 IndicatorCalculator.update_indicators 一致:
+    ma7/ma20/ma30, ma_v_5/10/20, ema7/20/30, rsi_14, bollinger_upper/middle/lower,
+    macd/signal, stochastic_k/stochastic_d
+    :param rsi_mode: 'sma'（与 add_rsi 相同，滚动均值）或 'wilder'（Wilder 平滑，alpha=1/window）
+    冷启动用 warm_up(df)：pandas 一次算完历史，内部状态直接从历史尾部构建
+    """
+
+    def __init__(self, sma_windows=(7, 20, 30), ma_v_windows=(5, 10, 20), ema_spans=(7, 20, 30),
+                 rsi_window=14, rsi_mode='sma', boll_window=20, macd=(12, 26, 9), stoch=(14, 3)):
+        self.sma_windows = tuple(sma_windows)
+        self.ma_v_windows = tuple(ma_v_windows)
+        self.ema_spans = tuple(ema_spans)
+        self.rsi_window = rsi_window
+        self.rsi_mode = rsi_mode
+        self.boll_window = boll_window
+        self.macd_params = macd
+        self.stoch_params = stoch
+        self.reset()
+
+    def reset(self):
+        self.sma = {w: _RollingMean(w) for w in self.sma_windows}
+        self.ma_v = {w: _RollingMean(w) for w in self.ma_v_windows}
+        self.ema = {s: _Ema(span=s) for s in self.ema_spans}
+        if self.rsi_mode == 'wilder':
+            self.rsi_gain = _Ema(alpha=1.0 / self.rsi_window)
+            self.rsi_loss = _Ema(alpha=1.0 / self.rsi_window)
+            self._rsi_n = 0
+        else:
+            self.rsi_gain = _RollingMean(self.rsi_window)
+            self.rsi_loss = _RollingMean(self.rsi_window)
+        self.boll_mean = _RollingMean(self.boll_window)
+        self.boll_std = _RollingStd(self.boll_window)
+        fast, slow, sig = self.macd_params
+        self.macd_fast = _Ema(span=fast)
+        self.macd_slow = _Ema(span=slow)
+        self.macd_signal = _Ema(span=sig)
+        k_window, d_window = self.stoch_params
+        self.low_min = _RollingExtreme(k_window, is_max=False)
+        self.high_max = _RollingExtreme(k_window, is_max=True)
+        self.stoch_d = _RollingMean(d_window)
+        self._stoch_k_hist = deque(maxlen=d_window)
+        self.prev_close = None
+        self.last = {}
+        self.bars = 0
+
+    def push(self, bar):
+        """
+        :param bar: dict / Series，至少有 close，可选 high/low/vol/trade_date
+        :return: dict 指标值（也保存在 self.last）
+        """
+        close = float(bar['close'])
+        high = float(bar['high']) if 'high' in bar else close
+        low = float(bar['low']) if 'low' in bar else close
+        vol = float(bar['vol']) if 'vol' in bar else 0.0
+        out = {}
+        if 'trade_date' in bar:
+            out['trade_date'] = bar['trade_date']
+        for w, st in self.sma.items():
+            out[f'ma{w}'] = st.push(close)
+        for w, st in self.ma_v.items():
+            out[f'ma_v_{w}'] = st.push(vol)
+        for s_, st in self.ema.items():
+            out[f'ema{s_}'] = st.push(close)
+
+        # RSI：第一根没有 delta，按 0 计（同 add_rsi 的 fillna(0)）
+        delta = 0.0 if self.prev_close is None else close - self.prev_close
+        avg_gain = self.rsi_gain.push(delta if delta > 0 else 0.0)
+        avg_loss = self.rsi_loss.push(-delta if delta < 0 else 0.0)
+        if self.rsi_mode == 'wilder':
+            self._rsi_n += 1
+            if self._rsi_n < self.rsi_window:
+                avg_gain = avg_loss = NAN
+        out[f'rsi_{self.rsi_window}'] = _rsi(avg_gain, avg_loss)
+
+        mid = self.boll_mean.push(close)
+        std = self.boll_std.push(close)
+        out['bollinger_upper'] = mid + 2 * std
+        out['bollinger_lower'] = mid - 2 * std
+        out['bollinger_middle'] = mid
+
+        macd = self.macd_fast.push(close) - self.macd_slow.push(close)
+        out['macd'] = macd
+        out['signal'] = self.macd_signal.push(macd)
+
+        lo = self.low_min.push(low)
+        hi = self.high_max.push(high)
+        k = 100 * (close - lo) / (hi - lo) if hi == hi and hi != lo else NAN
+        out['stochastic_k'] = k
+        self._stoch_k_hist.append(k)
+        if len(self._stoch_k_hist) == self._stoch_k_hist.maxlen and all(x == x for x in self._stoch_k_hist):
+            out['stochastic_d'] = sum(self._stoch_k_hist) / len(self._stoch_k_hist)
+        else:
+            out['stochastic_d'] = NAN
+
+        self.prev_close = close
+        self.bars += 1
+        self.last = out
+        return out
+
+    def warm_up(self, df, calculator=None):
+        """
+        用 pandas 一次性算完历史（IndicatorCalculator.update_indicators 的同一套公式），
+        再把各个窗口的状态从历史尾部直接装进来，之后 push() 与批量结果无缝衔接
+        :return: 带指标列的 df
+        """
+        calculator = calculator or IndicatorCalculator.__new__(IndicatorCalculator)
+        df = calculator.update_indicators(df.copy())
+        self.reset()
+        if df.empty:
+            return df
+        close = df['close'].astype(float).values
+        high = df['high'].astype(float).values if 'high' in df else close
+        low = df['low'].astype(float).values if 'low' in df else close
+        vol = df['vol'].astype(float).values if 'vol' in df else [0.0] * len(close)
+
+        for st in list(self.sma.values()) + [self.boll_mean]:
+            _fill_window(st, close)
+        for st in self.ma_v.values():
+            _fill_window(st, vol)
+        for x in close[-self.boll_window:]:
+            self.boll_std.push(float(x))
+        for s_, st in self.ema.items():
+            st.value = float(df[f'ema{s_}'].iloc[-1])
+        fast, slow, sig = self.macd_params
+        self.macd_fast.value = float(df['close'].astype(float).ewm(span=fast, adjust=False).mean().iloc[-1])
+        self.macd_slow.value = float(df['close'].astype(float).ewm(span=slow, adjust=False).mean().iloc[-1])
+        self.macd_signal.value = float(df['signal'].iloc[-1])
+
+        delta = df['close'].astype(float).diff()
+        gain = delta.where(delta > 0, 0).fillna(0)
+        loss = (-delta.where(delta < 0, 0)).fillna(0)
+        if self.rsi_mode == 'wilder':
+            avg_gain = gain.ewm(alpha=1.0 / self.rsi_window, adjust=False).mean()
+            avg_loss = loss.ewm(alpha=1.0 / self.rsi_window, adjust=False).mean()
+            self.rsi_gain.value = float(avg_gain.iloc[-1])
+            self.rsi_loss.value = float(avg_loss.iloc[-1])
+            self._rsi_n = len(df)
+            rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+            rsi.iloc[:self.rsi_window - 1] = NAN
+            df[f'rsi_{self.rsi_window}'] = rsi
+        else:
+            _fill_window(self.rsi_gain, gain.values)
+            _fill_window(self.rsi_loss, loss.values)
+
+        k_window, d_window = self.stoch_params
+        start = max(0, len(close) - k_window)
+        self.low_min.i = self.high_max.i = start
+        for i in range(start, len(close)):
+            self.low_min.push(float(low[i]))
+            self.high_max.push(float(high[i]))
+        for k in df['stochastic_k'].values[-d_window:]:
+            self._stoch_k_hist.append(float(k))
+
+        self.prev_close = float(close[-1])
+        self.bars = len(df)
+        self.last = df.iloc[-1].to_dict()
+        return df
+
+
+def _fill_window(st, values):
+    """把历史尾部装进 _RollingMean（不逐根 push）"""
+    tail = [float(x) for x in values[-st.window:]]
+    st.values = deque(tail)
+    st.total = math.fsum(tail)
+
+
+def _rsi(avg_gain, avg_loss):
+    if avg_gain != avg_gain or avg_loss != avg_loss:
+        return NAN
+    if avg_loss == 0:
+        return NAN if avg_gain == 0 else 100.0
+    return 100 - 100 / (1 + avg_gain / avg_loss)
 
 class IndicatorCalculator:
     def __init__(self, data_handler):
@@ -8,8 +278,25 @@ class IndicatorCalculator:
         :param data_handler: An instance of DataHandler class for fetching trading data.
         """
         self.data_handler = data_handler
+        self.states = {}  # (symbol, interval) -> IndicatorState
         print('__init__ IndicatorCalculator success~~~')
 
+    def get_state(self, symbol, interval, warmup_bars=500, **kwargs):
+        """
+        取（或创建并预热）某个 symbol/周期 的流式指标状态
+        之后每根新 K 线调用 state.push(bar)，不用再重新拉数据全量重算
+        """
+        key = (symbol, interval)
+        state = self.states.get(key)
+        if state is None:
+            state = IndicatorState(**kwargs)
+            if self.data_handler is not None and warmup_bars:
+                df = self.data_handler.fetch_data(symbol, interval, warmup_bars)
+                if df is not None and not df.empty:
+                    state.warm_up(df, calculator=self)
+            self.states[key] = state
+        return state
+
     def add_sma(self, df, column='close', window=14):
         sma_column_name = f'ma{window}'
         if sma_column_name not in df.columns:
@@ -93,6 +380,15 @@ class IndicatorCalculator:
         df = self.add_stochastic_oscillator(df)
         return df
 
+    def update_indicators_panel(self, symbols, interval, *args, align='date'):
+        """
+        多币种一次性计算：从 data_handler 拉各币种数据，组成 symbols × time 面板后向量化计算全部指标
+        :param args: 同 DataHandler.fetch_data 的参数（条数 / 日期区间）
+        :return: IndicatorPanel
+        """
+        frames = {s: self.data_handler.fetch_data(s, interval, *args) for s in symbols}
+        return IndicatorPanel.from_frames(frames, align=align).update_indicators()
+
 
 
 if __name__ == '__main__':
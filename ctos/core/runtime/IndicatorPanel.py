@@ -0,0 +1,276 @@
+"""
+多币种批量指标计算（面板模式）
+
+数据是 symbols × time 的二维 NumPy 数组（每行一个币种，按时间升序），
+所有指标沿时间轴一次性向量化算完，不再逐个币种循环 DataFrame:
+    - 滚动均值 / 标准差：累加和（cumsum）差分，O(S·T)
+    - 滚动最大 / 最小：sliding_window_view
+    - EMA / MACD：时间轴递推，每一步对所有币种同时计算
+
+指标名称、公式与 IndicatorCalculator.update_indicators 一致
+（ma7/ma20/ma30、ma_v_5/10/20、ema7/20/30、rsi_14、bollinger_*、macd/signal、stochastic_k/d），
+窗口内有 NaN（上市晚、缺数据）时结果为 NaN，同 pandas rolling 默认行为。
+
+用法:
+    panel = IndicatorPanel.from_frames({'btc': df_btc, 'eth': df_eth, ...}, align='tail')
+    panel.update_indicators()
+    panel.latest()                  # 每个币种最新一根的全部指标（DataFrame，行为币种）
+    panel.frame('rsi_14')           # time × symbols 的 DataFrame
+    panel.symbol('eth')             # 单个币种，等价 IndicatorCalculator.update_indicators(df)
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+FIELDS = ('open', 'high', 'low', 'close', 'vol')
+
+
+# ---------------- 向量化滚动内核（axis=1 为时间轴） ----------------
+def rolling_sum(x, window):
+    """窗口内任何 NaN -> NaN，窗口未满 -> NaN"""
+    x = np.asarray(x, dtype=np.float64)
+    valid = np.isfinite(x)
+    csum = np.cumsum(np.where(valid, x, 0.0), axis=1)
+    cnt = np.cumsum(valid, axis=1)
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] < window:
+        return out
+    s = csum[:, window - 1:].copy()
+    c = cnt[:, window - 1:].copy()
+    s[:, 1:] -= csum[:, :-window]
+    c[:, 1:] -= cnt[:, :-window]
+    out[:, window - 1:] = np.where(c == window, s, np.nan)
+    return out
+
+
+def rolling_mean(x, window):
+    return rolling_sum(x, window) / window
+
+
+def rolling_std(x, window, ddof=1):
+    """样本标准差（ddof=1，同 pandas），先减去每行均值再累加，减小大数相消误差"""
+    x = np.asarray(x, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        center = np.nanmean(x, axis=1, keepdims=True) if x.shape[1] else 0.0
+    d = x - np.nan_to_num(center)
+    s1 = rolling_sum(d, window)
+    s2 = rolling_sum(d * d, window)
+    var = (s2 - s1 * s1 / window) / (window - ddof)
+    return np.sqrt(np.clip(var, 0.0, None))
+
+
+def _rolling_extreme(x, window, fn):
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] < window:
+        return out
+    out[:, window - 1:] = fn(sliding_window_view(x, window, axis=1), axis=-1)
+    return out
+
+
+def rolling_max(x, window):
+    return _rolling_extreme(x, window, np.max)
+
+
+def rolling_min(x, window):
+    return _rolling_extreme(x, window, np.min)
+
+
+def ewm_mean(x, span=None, alpha=None):
+    """
+    pandas ewm(adjust=False).mean() 的面板版本：
+    每行从第一个有效值开始递推，中间的 NaN 沿用上一值
+    """
+    x = np.asarray(x, dtype=np.float64)
+    a = alpha if alpha is not None else 2.0 / (span + 1.0)
+    out = np.empty_like(x)
+    prev = np.full(x.shape[0], np.nan)
+    for t in range(x.shape[1]):
+        cur = x[:, t]
+        prev = np.where(np.isnan(prev), cur, np.where(np.isnan(cur), prev, prev + a * (cur - prev)))
+        out[:, t] = prev
+    return out
+
+
+def diff(x, periods=1):
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    out[:, periods:] = x[:, periods:] - x[:, :-periods]
+    return out
+
+
+def pct_change(x, periods=1):
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[:, periods:] = x[:, periods:] / x[:, :-periods] - 1
+    return out
+
+
+class IndicatorPanel:
+    """
+    :param symbols: 行对应的币种
+    :param index: 列对应的时间（trade_date），align='tail' 时为 None
+    :param data: {'close': ndarray(S, T), 'high': ..., 'low': ..., 'vol': ...}，至少有 close
+    """
+
+    def __init__(self, symbols, data, index=None):
+        self.symbols = list(symbols)
+        self.index = index
+        self.data = {k: np.asarray(v, dtype=np.float64) for k, v in data.items()}
+        if 'close' not in self.data:
+            raise ValueError("panel data needs at least 'close'")
+        self.shape = self.data['close'].shape
+        for k, v in self.data.items():
+            if v.shape != self.shape:
+                raise ValueError(f"'{k}' shape {v.shape} != close shape {self.shape}")
+        self.indicators = {}
+        self._row = {s: i for i, s in enumerate(self.symbols)}
+
+    @classmethod
+    def from_frames(cls, data_frames, align='date', length=None, fields=FIELDS):
+        """
+        :param data_frames: {symbol: DataFrame(trade_date, open, high, low, close, vol)}
+        :param align: 'date' 按 trade_date 外连接对齐（缺失为 NaN）；
+                      'tail' 各币种取最后 length 根右对齐（不看时间戳，同各币种单独计算）
+        :param length: align='tail' 时的长度，默认取最长的那个
+        """
+        frames = {s: df for s, df in data_frames.items() if df is not None and len(df)}
+        frames = {s: (df.sort_values('trade_date') if 'trade_date' in df.columns else df)
+                  for s, df in frames.items()}
+        symbols = list(frames)
+        fields = [f for f in fields if symbols and all(f in df.columns for df in frames.values())]
+        if align == 'tail':
+            n = length or max((len(df) for df in frames.values()), default=0)
+            data = {}
+            for f in fields:
+                arr = np.full((len(symbols), n), np.nan)
+                for i, s in enumerate(symbols):
+                    v = pd.to_numeric(frames[s][f], errors='coerce').values[-n:]
+                    arr[i, n - len(v):] = v
+                data[f] = arr
+            return cls(symbols, data)
+        if align != 'date':
+            raise ValueError(f"unknown align {align!r}, expected 'date' or 'tail'")
+        times = {s: pd.to_datetime(df['trade_date']).values.astype('datetime64[ns]') for s, df in frames.items()}
+        index = np.unique(np.concatenate(list(times.values()))) if symbols else np.array([], dtype='datetime64[ns]')
+        pos = {s: np.searchsorted(index, t) for s, t in times.items()}
+        data = {}
+        for f in fields:
+            arr = np.full((len(symbols), len(index)), np.nan)
+            for i, s in enumerate(symbols):
+                arr[i, pos[s]] = pd.to_numeric(frames[s][f], errors='coerce').values  # 重复时间戳以后出现的为准
+            data[f] = arr
+        index = pd.DatetimeIndex(index)
+        return cls(symbols, data, index=index)
+
+    # ---------------- 指标（与 IndicatorCalculator 同名同公式） ----------------
+    def _field(self, name):
+        v = self.data.get(name)
+        return v if v is not None else self.data['close']
+
+    def add_sma(self, window=5):
+        self.indicators[f'ma{window}'] = rolling_mean(self.data['close'], window)
+        return self
+
+    def add_ema(self, span=5):
+        self.indicators[f'ema{span}'] = ewm_mean(self.data['close'], span=span)
+        return self
+
+    def add_ma_v(self, window=5):
+        if 'vol' in self.data:
+            self.indicators[f'ma_v_{window}'] = rolling_mean(self.data['vol'], window)
+        return self
+
+    def add_rsi(self, window=14):
+        delta = diff(self.data['close'])
+        missing = np.isnan(self.data['close'])  # 上市前/缺数据的位置不算 0
+        gain = np.where(missing, np.nan, np.where(delta > 0, delta, 0.0))
+        loss = np.where(missing, np.nan, np.where(delta < 0, -delta, 0.0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = rolling_mean(gain, window) / rolling_mean(loss, window)
+            self.indicators[f'rsi_{window}'] = 100 - (100 / (1 + rs))
+        return self
+
+    def add_bollinger_bands(self, window=20, num_std=2):
+        mid = rolling_mean(self.data['close'], window)
+        std = rolling_std(self.data['close'], window)
+        self.indicators['bollinger_upper'] = mid + num_std * std
+        self.indicators['bollinger_lower'] = mid - num_std * std
+        self.indicators['bollinger_middle'] = mid
+        return self
+
+    def add_macd(self, short_window=12, long_window=26, signal_window=9):
+        close = self.data['close']
+        macd = ewm_mean(close, span=short_window) - ewm_mean(close, span=long_window)
+        self.indicators['macd'] = macd
+        self.indicators['signal'] = ewm_mean(macd, span=signal_window)
+        return self
+
+    def add_stochastic_oscillator(self, k_window=14, d_window=3):
+        low_min = rolling_min(self._field('low'), k_window)
+        high_max = rolling_max(self._field('high'), k_window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k = 100 * (self.data['close'] - low_min) / (high_max - low_min)
+        k[~np.isfinite(k)] = np.nan
+        self.indicators['stochastic_k'] = k
+        self.indicators['stochastic_d'] = rolling_mean(k, d_window)
+        return self
+
+    def add_returns(self, periods=1):
+        self.indicators['returns' if periods == 1 else f'returns_{periods}'] = pct_change(self.data['close'], periods)
+        return self
+
+    def update_indicators(self):
+        """同 IndicatorCalculator.update_indicators 的指标集合"""
+        for w in (7, 20, 30):
+            self.add_sma(w)
+        for w in (5, 10, 20):
+            self.add_ma_v(w)
+        for s in (7, 20, 30):
+            self.add_ema(s)
+        self.add_rsi()
+        self.add_bollinger_bands()
+        self.add_macd()
+        self.add_stochastic_oscillator()
+        return self
+
+    # ---------------- 输出 ----------------
+    def __getitem__(self, name):
+        return self.indicators[name] if name in self.indicators else self.data[name]
+
+    def frame(self, name):
+        """time × symbols 的 DataFrame"""
+        return pd.DataFrame(self[name].T, index=self.index, columns=self.symbols)
+
+    def symbol(self, symbol):
+        """单个币种的 DataFrame（原始字段 + 全部指标列）"""
+        i = self._row[symbol]
+        cols = {k: v[i] for k, v in self.data.items()}
+        cols.update({k: v[i] for k, v in self.indicators.items()})
+        df = pd.DataFrame(cols, index=self.index)
+        if self.index is not None:
+            df = df.rename_axis('trade_date').reset_index()
+        return df
+
+    def latest(self, names=None):
+        """
+        每个币种最后一个有效 close 所在列的全部指标
+        :return: DataFrame，index 为 symbols
+        """
+        close = self.data['close']
+        valid = np.isfinite(close)
+        has = valid.any(axis=1)
+        last = np.where(has, close.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1), 0)
+        rows = np.arange(len(self.symbols))
+        names = names or (['close'] + list(self.indicators))
+        out = {n: np.where(has, self[n][rows, last], np.nan) for n in names}
+        return pd.DataFrame(out, index=self.symbols)
+
+    def to_dataframe(self):
+        """长表：MultiIndex(symbol, time)，列为字段与指标"""
+        t = self.index if self.index is not None else pd.RangeIndex(self.shape[1])
+        mi = pd.MultiIndex.from_product([self.symbols, t], names=['symbol', 'trade_date'])
+        cols = {k: v.reshape(-1) for k, v in self.data.items()}
+        cols.update({k: v.reshape(-1) for k, v in self.indicators.items()})
+        return pd.DataFrame(cols, index=mi)
@@ -0,0 +1,365 @@
+"""
+软订单（限价单）追价服务
+
+每个驱动（交易所 + 账户）只有一个 OrderChaser 和一个后台线程，负责所有 focus_on_orders 交进来的订单:
+    - 订单按下次到期时间放进定时堆（heapq），到期才处理，不再每个任务一个线程 + 固定 sleep
+    - 改单频率由驱动上的共享限频器（ctos.core.kernel.ratelimit 的 amend 桶）控制，与其它下单/撤单共用同一套额度
+    - 改价优先用本地订单簿的买一/卖一，没有时用 get_price_now（驱动的价格缓存）
+    - 驱动启用了私有 WS 订单流（driver.order_state）时，状态直接读内存表，
+      成交/撤单推送到达立即结束该订单，不用等下一次到期
+    - 统计追价延迟、每次成交的改单次数、成交耗时等指标（get_metrics）
+"""
+import heapq
+import itertools
+import threading
+import time
+import weakref
+
+from ctos.drivers.okx.util import align_decimal_places
+from ctos.core.io.datafeed.order_state import FILLED, TERMINAL_STATES, normalize_state
+
+
+class _Chase:
+    __slots__ = ('order_id', 'symbol', 'side', 'added_at', 'amends', 'last_price', 'first_amend_at', 'deadline',
+                 'errors')
+
+    def __init__(self, order_id, symbol, deadline):
+        self.order_id = order_id
+        self.symbol = symbol
+        self.side = None
+        self.added_at = time.time()
+        self.amends = 0
+        self.last_price = None
+        self.first_amend_at = None
+        self.deadline = deadline
+        self.errors = 0
+
+
+class OrderChaser:
+    """
+    :param driver: 交易驱动（需要 get_order_status / amend_order / get_price_now）
+    :param interval: 两次改单之间的间隔（秒），同原来的 6.66s
+    :param max_age: 订单最长追踪时间（秒），超时放弃追踪（不撤单）
+    :param max_errors: 连续查询订单状态失败这么多次后放弃追踪（同原来查挂单失败即放弃）
+    """
+
+    def __init__(self, driver, interval=6.66, max_age=10800, max_errors=5, logger=None):
+        # 只弱引用驱动：驱动不再被使用时连同追价服务一起释放，后台线程随之退出
+        self._driver = weakref.ref(driver)
+        self.interval = float(interval)
+        self.max_age = float(max_age)
+        self.max_errors = int(max_errors)
+        self.logger = logger
+        self.chases = {}            # order_id -> _Chase
+        self._wheel = []            # (due, seq, order_id)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._seeded = {}          # order_id -> 订单表 epoch（每次重连后重新对账一次）
+        self._done_listeners = []   # callback(order_id, outcome, new_order_id)
+        self.metrics = {
+            'tracked': 0, 'filled': 0, 'closed': 0, 'expired': 0, 'failed': 0,
+            'amends': 0, 'amend_errors': 0, 'checks': 0,
+            'chase_latency_sum': 0.0, 'chase_latency_max': 0.0, 'chase_latency_n': 0,
+            'time_to_fill_sum': 0.0, 'time_to_fill_max': 0.0,
+            'amends_of_filled': 0,
+        }
+        self._subscribed = None
+
+    @property
+    def driver(self):
+        return self._driver()
+
+    @property
+    def order_state(self):
+        return getattr(self.driver, 'order_state', None)
+
+    @property
+    def thread(self):
+        return self._thread
+
+    # ---------------- 对外接口 ----------------
+    def on_done(self, callback):
+        """callback(order_id, outcome, new_order_id)，outcome: filled / closed / expired / failed / replaced"""
+        self._done_listeners.append(callback)
+        return callback
+
+    def chase(self, orders):
+        """
+        :param orders: {order_id: symbol}，symbol 可为 None
+        :return: 新加入追踪的订单数
+        """
+        added = 0
+        now = time.time()
+        self._subscribe()
+        with self._cond:
+            for order_id, symbol in orders.items():
+                if order_id is None or order_id in self.chases:
+                    continue
+                self.chases[order_id] = _Chase(order_id, symbol, now + self.max_age)
+                self._schedule(order_id, now)
+                added += 1
+            self.metrics['tracked'] += added
+            self._ensure_thread()
+            self._cond.notify_all()
+        return added
+
+    def pending(self):
+        with self._cond:
+            return len(self.chases)
+
+    def wait_idle(self, timeout=None):
+        """阻塞到没有待追踪订单；返回是否已空闲"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self.chases, timeout)
+
+    def stop(self, timeout=5):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def get_metrics(self):
+        with self._cond:
+            m = dict(self.metrics)
+            m['pending'] = len(self.chases)
+        n, latency = m.pop('chase_latency_n'), m.pop('chase_latency_sum')
+        ttf, amends = m.pop('time_to_fill_sum'), m.pop('amends_of_filled')
+        m['avg_chase_latency'] = latency / n if n else None
+        m['avg_time_to_fill'] = ttf / m['filled'] if m['filled'] else None
+        m['amends_per_fill'] = amends / m['filled'] if m['filled'] else None
+        return m
+
+    def _subscribe(self):
+        """驱动的 WS 订单流可能在追价服务创建之后才启用，每次 chase 时检查一次"""
+        order_state = self.order_state
+        if order_state is not None and order_state is not self._subscribed:
+            order_state.on('closed', self._on_closed)
+            self._subscribed = order_state
+
+    # ---------------- 调度 ----------------
+    def _schedule(self, order_id, due):
+        heapq.heappush(self._wheel, (due, next(self._seq), order_id))
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name='order-chaser-%s' % getattr(self.driver, 'cex', ''),
+                                        daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    if not self.chases:
+                        self._thread = None
+                        return
+                    if self._wheel and self._wheel[0][0] <= time.time():
+                        due, _, order_id = heapq.heappop(self._wheel)
+                        if order_id in self.chases:
+                            break
+                        continue
+                    timeout = (self._wheel[0][0] - time.time()) if self._wheel else self.interval
+                    self._cond.wait(max(0.0, timeout))
+                if not self._running or self.driver is None:
+                    self._thread = None
+                    return
+                chase = self.chases[order_id]
+            try:
+                next_due = self._process(chase, due)
+            except Exception as e:
+                self._log(f'❌ 订单追踪失败: {chase.order_id} {chase.symbol} {e}')
+                next_due = time.time() + self.interval
+            if next_due is not None:
+                with self._cond:
+                    if chase.order_id in self.chases:
+                        self._schedule(chase.order_id, next_due)
+
+    # ---------------- 单个订单 ----------------
+    def _order_data(self, chase):
+        order_state = self.order_state
+        if order_state is not None and order_state.live:
+            data = order_state.get(chase.order_id)
+            stale = data is None or data.get('unverified')
+            if stale and self._seeded.get(chase.order_id) != order_state.epoch:
+                # WS 启动前下的单，或重连后没对上账的单：本次连接内 REST 查一次写进订单表，之后全靠推送
+                self._seeded[chase.order_id] = order_state.epoch
+                data, err = self.driver.get_order_status(order_id=chase.order_id, symbol=chase.symbol, keep_origin=False)
+                if not err and data:
+                    order_state.update(data)
+                    data = order_state.get(chase.order_id) or data
+                return data, err
+            if not stale:
+                return data, None
+        return self.driver.get_order_status(order_id=chase.order_id, symbol=chase.symbol, keep_origin=False)
+
+    def _listed_open(self, chase):
+        """订单是否仍在 get_open_orders 里；挂单也查不到（或不知道交易对）时按仍挂着处理，交给连续失败计数"""
+        if chase.symbol is None:
+            return True
+        try:
+            open_ids, err = self.driver.get_open_orders(symbol=chase.symbol, onlyOrderId=True)
+        except Exception as e:
+            open_ids, err = None, e
+        if err or open_ids is None:
+            return True
+        return str(chase.order_id) in set(str(o) for o in open_ids)
+
+    def _top(self, symbol):
+        get_local_book = getattr(self.driver, 'get_local_book', None)
+        if get_local_book is None or symbol is None:
+            return None
+        try:
+            book = get_local_book(symbol)
+            return book.top() if book is not None else None
+        except Exception:
+            return None
+
+    def _new_price(self, chase, price):
+        """
+        目标价：同原来的追价公式，越追越贴近参考价；
+        有本地盘口时买单参考买一、卖单参考卖一，否则用最新价
+        """
+        top = self._top(chase.symbol)
+        if top and chase.side in ('buy', 'sell'):
+            ref = top[0] if chase.side == 'buy' else top[1]
+        else:
+            ref = self.driver.get_price_now(chase.symbol)
+        step = 0.0001 * max(0, 200 - chase.amends) / 200
+        if ref <= price:
+            tmp_price = align_decimal_places(ref, ref * (1 + step))
+            return tmp_price if tmp_price < price else price
+        tmp_price = align_decimal_places(ref, ref * (1 - step))
+        return tmp_price if tmp_price > price else price
+
+    def _process(self, chase, due):
+        """返回下次到期时间，None 表示结束追踪"""
+        now = time.time()
+        self.metrics['checks'] += 1
+        if now > chase.deadline:
+            self._finish(chase, 'expired')
+            return None
+        data, err = self._order_data(chase)
+        if err:
+            chase.errors += 1
+            self._log(f'data: {data}, err: {err}')
+            if not self._listed_open(chase):
+                # 查不到状态且已不在挂单里：同原来离开 get_open_orders 即结束
+                self._finish(chase, 'closed')
+                return None
+            if chase.errors >= self.max_errors:
+                self._log(f'❌ 连续 {chase.errors} 次查询失败，放弃追踪: {chase.order_id} {chase.symbol}')
+                self._finish(chase, 'failed')
+                return None
+            return now + self.interval
+        chase.errors = 0
+        if not data:
+            # 查不到且没有报错：订单已不在挂单里（如 Backpack 只查挂单），同原来离开 get_open_orders 即结束
+            self._finish(chase, 'closed')
+            return None
+        # 与订单状态表同一套归一化：ccxt 'closed'、OKX mmp_canceled 等都算终态
+        state = normalize_state(data.get('state') or data.get('status'))
+        if state in TERMINAL_STATES:
+            self._finish(chase, 'filled' if state == FILLED else 'closed')
+            return None
+        chase.side = chase.side or (str(data.get('side') or '').lower() or None)
+        if chase.symbol is None:
+            chase.symbol = data.get('symbol')
+        price = float(data['price'])
+        new_price = self._new_price(chase, price)
+        if new_price == price:
+            return now + self.interval
+        new_order, err = self.driver.amend_order(order_id=chase.order_id, symbol=chase.symbol, price=new_price,
+                                                 quantity=float(data['quantity']))
+        done_at = time.time()
+        latency = done_at - due
+        self.metrics['chase_latency_sum'] += latency
+        self.metrics['chase_latency_n'] += 1
+        self.metrics['chase_latency_max'] = max(self.metrics['chase_latency_max'], latency)
+        if new_order is None and err is None:
+            # 改单时订单已经成交
+            print(f"\n  {chase.order_id} is deal: {chase.symbol}")
+            self._finish(chase, 'filled')
+            return None
+        if err is not None:
+            self.metrics['amend_errors'] += 1
+            self._log(f'amend_order {chase.order_id} failed: {err}')
+            return done_at + self.interval
+        chase.amends += 1
+        chase.last_price = new_price
+        chase.first_amend_at = chase.first_amend_at or done_at
+        self.metrics['amends'] += 1
+        print(f"\n\namend_order  {chase.order_id} to {new_order}: {chase.symbol} {new_price}, {float(data['quantity'])}")
+        if isinstance(new_order, (str, int)) and str(new_order) != str(chase.order_id):
+            # backpack 之类撤单重下的交易所，换成新订单号继续追
+            self._replace(chase, new_order)
+        return done_at + self.interval
+
+    def _replace(self, chase, new_order):
+        with self._cond:
+            if self.chases.get(chase.order_id) is not chase:
+                # 改单途中 WS 推送已经结束了这笔追踪（_on_closed），不能再以新订单号放回去
+                self._log(f'⚠️ {chase.order_id} 已结束追踪，改单生成的新订单 {new_order} 不再追踪')
+                return
+            self.chases.pop(chase.order_id)
+            self._seeded.pop(chase.order_id, None)
+            old = chase.order_id
+            chase.order_id = new_order
+            self.chases[new_order] = chase
+        for cb in self._done_listeners:
+            try:
+                cb(old, 'replaced', new_order)
+            except Exception as e:
+                self._log(f'on_done callback failed: {e}')
+
+    def _finish(self, chase, outcome):
+        with self._cond:
+            if self.chases.pop(chase.order_id, None) is None:
+                return
+            self._seeded.pop(chase.order_id, None)
+            self.metrics[outcome] += 1
+            if outcome == 'filled':
+                ttf = time.time() - chase.added_at
+                self.metrics['time_to_fill_sum'] += ttf
+                self.metrics['time_to_fill_max'] = max(self.metrics['time_to_fill_max'], ttf)
+                self.metrics['amends_of_filled'] += chase.amends
+            self._cond.notify_all()
+        for cb in self._done_listeners:
+            try:
+                cb(chase.order_id, outcome, None)
+            except Exception as e:
+                self._log(f'on_done callback failed: {e}')
+
+    def _on_closed(self, event, order, delta):
+        """WS 推送订单结束（成交/撤单），立即结束追踪"""
+        chase = self.chases.get(order.get('orderId'))
+        if chase is None:
+            for oid, c in list(self.chases.items()):
+                if str(oid) == str(order.get('orderId')):
+                    chase = c
+                    break
+        if chase is not None:
+            self._finish(chase, 'filled' if order.get('state') == 'filled' else 'closed')
+
+    def _log(self, msg):
+        if self.logger is not None:
+            self.logger.warning(msg)
+        else:
+            print(msg)
+
+
+_CHASERS = weakref.WeakKeyDictionary()     # driver -> OrderChaser，驱动被回收时自动移除
+_CHASERS_LOCK = threading.Lock()
+
+
+def get_order_chaser(driver, **kwargs):
+    """每个驱动实例一个 OrderChaser，多个 ExecutionEngine / 多次调仓共用"""
+    with _CHASERS_LOCK:
+        chaser = _CHASERS.get(driver)
+        if chaser is None:
+            chaser = _CHASERS[driver] = OrderChaser(driver, **kwargs)
+        return chaser
@@ -0,0 +1,260 @@
+"""
+本地列式 K 线存储（Parquet），与 DataHandler 的 insert_data / fetch_data 接口一致
+
+目录结构（按 币种/周期/月 分区）:
+    <root>/ETHUSDT/1m/2024-01.parquet
+    <root>/ETHUSDT/1m/2024-02.parquet
+
+列类型: trade_date 为 int64（UTC 毫秒），open/high/low/close/vol1/vol 为 float64。
+读取时只打开时间范围覆盖到的月份文件，并把 trade_date 条件下推给 pyarrow（按 row group 过滤），
+整列转换，不做逐行 Python 处理；回测读几年的 1m 数据基本只受磁盘 I/O 限制。
+"""
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # 只有真正读写时才需要
+    pa = None
+    pq = None
+
+KLINE_COLUMNS = ['trade_date', 'open', 'high', 'low', 'close', 'vol1', 'vol']
+PRICE_COLUMNS = KLINE_COLUMNS[1:]
+
+# 一个 row group 约一周的 1m 数据，谓词下推的粒度
+ROW_GROUP_SIZE = 10080
+
+
+def to_epoch_ms(values):
+    """
+    整列转换 trade_date -> int64 UTC 毫秒
+    支持 datetime64 / Timestamp / 秒或毫秒(或微秒)整数 / 日期字符串
+    """
+    s = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(s):
+        if getattr(s.dt, 'tz', None) is not None:
+            s = s.dt.tz_convert('UTC').dt.tz_localize(None)
+        return s.values.astype('datetime64[ms]').astype(np.int64)
+    if pd.api.types.is_numeric_dtype(s):
+        v = s.astype(np.int64).values
+        # 10 位≈秒，13 位≈毫秒，16 位≈微秒（2025 年起币安归档用微秒）
+        v = np.where(v > 1e14, v // 1000, v)
+        v = np.where(v < 1e11, v * 1000, v)
+        return v.astype(np.int64)
+    return pd.to_datetime(s).values.astype('datetime64[ms]').astype(np.int64)
+
+
+def _month_key(ms):
+    return datetime.utcfromtimestamp(ms / 1000.0).strftime('%Y-%m')
+
+
+def _parse_date_ms(value):
+    return int(to_epoch_ms([pd.Timestamp(value)])[0])
+
+
+class ParquetDataHandler:
+    """
+    :param root: 存储根目录
+    :param vol1_scale: 写入时 vol1 除以该值，和 DataHandler.insert_data 保持一致（1e6）
+    :param compression: parquet 压缩算法
+    """
+
+    def __init__(self, root='~/Quantify/okx/parquet', vol1_scale=1e6, compression='zstd'):
+        if pq is None:
+            raise RuntimeError("请先安装pyarrow: pip install pyarrow")
+        self.root = os.path.expanduser(root)
+        self.vol1_scale = vol1_scale
+        self.compression = compression
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        print('__init__ ParquetDataHandler success~~~', self.root)
+
+    # -------------- 路径/分区 --------------
+    def _dir(self, symbol, interval):
+        return os.path.join(self.root, symbol.replace('-', '_'), interval)
+
+    def _path(self, symbol, interval, month):
+        return os.path.join(self._dir(symbol, interval), f'{month}.parquet')
+
+    def months(self, symbol, interval):
+        """已有的月份分区，升序"""
+        d = self._dir(symbol, interval)
+        if not os.path.isdir(d):
+            return []
+        return sorted(f[:-len('.parquet')] for f in os.listdir(d) if f.endswith('.parquet'))
+
+    def _lock(self, path):
+        with self._locks_guard:
+            lk = self._locks.get(path)
+            if lk is None:
+                lk = self._locks[path] = threading.Lock()
+            return lk
+
+    # -------------- 写入 --------------
+    def _normalize(self, data):
+        df = data.rename(columns=lambda c: str(c).lower())
+        out = pd.DataFrame({'trade_date': to_epoch_ms(df['trade_date'].values)})
+        for c in PRICE_COLUMNS:
+            out[c] = pd.to_numeric(df[c], errors='coerce').astype(np.float64).values
+        if self.vol1_scale:
+            out['vol1'] = out['vol1'] / self.vol1_scale
+        return out
+
+    def _read_month(self, path, filters=None, columns=None):
+        if not os.path.exists(path):
+            return None
+        return pq.read_table(path, columns=columns, filters=filters).to_pandas()
+
+    def _write_month(self, path, df):
+        table = pa.Table.from_pandas(df, preserve_index=False, schema=self.schema())
+        tmp = path + '.tmp'
+        pq.write_table(table, tmp, compression=self.compression, row_group_size=ROW_GROUP_SIZE)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def schema():
+        return pa.schema([('trade_date', pa.int64())] + [(c, pa.float64()) for c in PRICE_COLUMNS])
+
+    def insert_data(self, symbol, interval, data, remove_duplicates=False):
+        """
+        写入/覆盖 K 线；同一 trade_date 以新数据为准（等价 ON DUPLICATE KEY UPDATE），
+        remove_duplicates 仅为兼容 DataHandler 接口保留
+        """
+        if data is None or len(data) == 0:
+            return 0
+        new = self._normalize(data)
+        new = new.drop_duplicates('trade_date', keep='last')
+        months = pd.to_datetime(new['trade_date'], unit='ms').dt.strftime('%Y-%m')
+        os.makedirs(self._dir(symbol, interval), exist_ok=True)
+        for month, part in new.groupby(months.values, sort=True):
+            path = self._path(symbol, interval, month)
+            with self._lock(path):
+                old = self._read_month(path)
+                if old is not None and len(old):
+                    part = pd.concat([old, part], ignore_index=True).drop_duplicates('trade_date', keep='last')
+                part = part.sort_values('trade_date', kind='mergesort').reset_index(drop=True)
+                self._write_month(path, part)
+        print(len(new), "records inserted into", f"{symbol}_{interval}")
+        return len(new)
+
+    # -------------- 读取 --------------
+    def _scan(self, symbol, interval, start_ms=None, end_ms=None, columns=None, reverse=False, limit=None):
+        """按月份扫描，[start_ms, end_ms] 条件下推；limit 时够数即停"""
+        lo = _month_key(start_ms) if start_ms is not None else None
+        hi = _month_key(end_ms) if end_ms is not None else None
+        months = [m for m in self.months(symbol, interval)
+                  if (lo is None or m >= lo) and (hi is None or m <= hi)]
+        if reverse:
+            months = months[::-1]
+        filters = []
+        if start_ms is not None:
+            filters.append(('trade_date', '>=', int(start_ms)))
+        if end_ms is not None:
+            filters.append(('trade_date', '<=', int(end_ms)))
+        if columns is not None and 'trade_date' not in columns:
+            columns = ['trade_date'] + list(columns)
+        parts, n = [], 0
+        for m in months:
+            df = self._read_month(self._path(symbol, interval, m), filters=filters or None, columns=columns)
+            if df is None or df.empty:
+                continue
+            parts.append(df)
+            n += len(df)
+            if limit is not None and n >= limit:
+                break
+        if not parts:
+            return pd.DataFrame(columns=columns or KLINE_COLUMNS)
+        if reverse:
+            parts = parts[::-1]
+        return pd.concat(parts, ignore_index=True)
+
+    def fetch_data(self, symbol, interval, *args, columns=None):
+        """
+        与 DataHandler.fetch_data 相同的调用方式:
+        - (X)                       最近 X 条
+        - ('2024-01-01', X)         起始日期之后 X 条
+        - ('20240101', X)           结束日期之前 X 条（不含 '-' 视为结束日期，同 DataHandler）
+        - ('2024-01-01', '2024-02-01')  区间
+        :param columns: 只读取这些列（trade_date 总会带上）
+        返回按 trade_date 升序的 DataFrame，trade_date 为 datetime64
+        """
+        if len(args) == 1 and isinstance(args[0], int):
+            df = self._scan(symbol, interval, columns=columns, reverse=True, limit=args[0])
+            df = df.iloc[-args[0]:] if args[0] else df.iloc[0:0]
+        elif len(args) == 2 and isinstance(args[0], str) and isinstance(args[1], int):
+            if '-' in args[0]:
+                df = self._scan(symbol, interval, start_ms=_parse_date_ms(args[0]), columns=columns, limit=args[1])
+                df = df.iloc[:args[1]]
+            else:
+                df = self._scan(symbol, interval, end_ms=_parse_date_ms(args[0]), columns=columns,
+                                reverse=True, limit=args[1])
+                df = df.iloc[-args[1]:] if args[1] else df.iloc[0:0]
+        elif len(args) == 2 and isinstance(args[0], str) and isinstance(args[1], str):
+            df = self._scan(symbol, interval, start_ms=_parse_date_ms(args[0]),
+                            end_ms=_parse_date_ms(args[1]), columns=columns)
+        else:
+            print(f"Error fetching data: unsupported arguments {args}")
+            return pd.DataFrame()
+        df = df.reset_index(drop=True)
+        if len(df):
+            df['trade_date'] = pd.to_datetime(df['trade_date'].astype(np.int64), unit='ms')
+        return df
+
+    def fetch_iter(self, symbol, interval, start_date=None, end_date=None, chunk_size=100000, columns=None):
+        """
+        与 DataHandler.fetch_iter 相同：按 row group 流式读取，逐块 yield DataFrame
+        """
+        start_ms = _parse_date_ms(start_date) if start_date is not None else None
+        end_ms = _parse_date_ms(end_date) if end_date is not None else None
+        lo = _month_key(start_ms) if start_ms is not None else None
+        hi = _month_key(end_ms) if end_ms is not None else None
+        cols = ['trade_date'] + [c for c in (columns or PRICE_COLUMNS) if c != 'trade_date']
+        for m in self.months(symbol, interval):
+            if (lo is not None and m < lo) or (hi is not None and m > hi):
+                continue
+            pf = pq.ParquetFile(self._path(symbol, interval, m))
+            for batch in pf.iter_batches(batch_size=chunk_size, columns=cols):
+                df = batch.to_pandas()
+                if start_ms is not None:
+                    df = df[df['trade_date'] >= start_ms]
+                if end_ms is not None:
+                    df = df[df['trade_date'] <= end_ms]
+                if df.empty:
+                    continue
+                df = df.reset_index(drop=True)
+                df['trade_date'] = pd.to_datetime(df['trade_date'].astype(np.int64), unit='ms')
+                yield df
+
+    def close(self):
+        pass
+
+
+def migrate_mysql_to_parquet(data_handler, store, coins, intervals, start='2017-01-01', end=None):
+    """
+    把 DataHandler(MySQL) 的表按月搬到 ParquetDataHandler
+    MySQL 里的 vol1 已经缩放过，这里不再重复缩放
+    """
+    end = pd.Timestamp(end) if end else pd.Timestamp.utcnow().tz_localize(None)
+    months = pd.date_range(pd.Timestamp(start).replace(day=1), end, freq='MS')
+    scale, store.vol1_scale = store.vol1_scale, None
+    try:
+        for cc in coins:
+            coin = cc.upper() + 'USDT' if not cc.upper().endswith('USDT') else cc.upper()
+            for interval in intervals:
+                total = 0
+                for m in months:
+                    m_end = m + pd.offsets.MonthBegin(1) - pd.Timedelta(seconds=1)
+                    df = data_handler.fetch_data(coin, interval, m.strftime('%Y-%m-%d %H:%M:%S'),
+                                                 m_end.strftime('%Y-%m-%d %H:%M:%S'))
+                    if df is None or df.empty:
+                        continue
+                    total += store.insert_data(coin, interval, df)
+                print(f"✅ {coin}_{interval} 迁移 {total} 行")
+    finally:
+        store.vol1_scale = scale
@@ -1,7 +1,7 @@
 from Config import ACCESS_KEY, SECRET_KEY, PASSPHRASE, HOST_IP, HOST_USER, HOST_PASSWD, HOST_IP_1
 import pandas as pd
 from util import format_decimal_places, convert_columns_to_numeric
-from DataHandler import DataHandler,
+from DataHandler import DataHandler
 from IndicatorCalculator import IndicatorCalculator
 import numpy as np
 import time
@@ -45,6 +45,41 @@ def process_data(df):
     return df
 
 
+def signal_window_hits(df, point_type, start_times, end_times):
+    """
+    对每个 [start, end] 时间窗口，判断 df 在窗口内是否有 point_type 非空的信号
+    信号时间排序后用 searchsorted 一次算完，O((N + M) log M)，替代逐行布尔筛选整张表
+    :return: bool ndarray，长度与 start_times 相同
+    """
+    if point_type not in df.columns:
+        return np.zeros(len(start_times), dtype=bool)
+    sig_times = np.sort(pd.to_datetime(df.loc[~pd.isna(df[point_type]), 'trade_date']).values)
+    start_times = np.asarray(start_times, dtype=sig_times.dtype)
+    end_times = np.asarray(end_times, dtype=sig_times.dtype)
+    lo = np.searchsorted(sig_times, start_times, side='left')
+    hi = np.searchsorted(sig_times, end_times, side='right')
+    return hi > lo
+
+
+def nested_confirm(start_times, end_times, point_type, timeframes):
+    """check_nested_signals 的向量化版本：过半周期在窗口内有信号"""
+    hits = sum(signal_window_hits(df, point_type, start_times, end_times).astype(int)
+               for df in timeframes.values())
+    return hits >= (len(timeframes) // 2 + 1)
+
+
+def higher_timeframes_confirm(start_times, end_times, point_type, timeframes):
+    """is_higher_timeframes 的向量化版本：第 i 个周期缺信号扣 i 分，剩余分数 >= 周期数 即确认"""
+    ensure_rate = np.full(len(start_times), len(timeframes) * 2)
+    for count, df in enumerate(timeframes.values(), 1):
+        ensure_rate -= count * ~signal_window_hits(df, point_type, start_times, end_times)
+    return ensure_rate >= len(timeframes)
+
+
+def _windows(df, minutes=15):
+    start_times = pd.to_datetime(df['trade_date']).values
+    return start_times, start_times + np.timedelta64(minutes, 'm')
+
 
 class SignalGenerator:
     def __init__(self, indicator_calculator):
@@ -127,118 +162,49 @@ class SignalGenerator:
 
     def check_nested_signals(self, start_time, end_time, point_type, timeframes):
         # This function checks for the presence of a point type in all specified timeframes within the given window
-        ensure_rate = len(timeframes)
-        for timeframe, df in timeframes.items():
-            # Find any matching signals in this timeframe
-            matching_signals = df[
-                (df['trade_date'] >= start_time) & (df['trade_date'] <= end_time) & (~pd.isna(df[point_type]))]
-            if matching_signals.empty:
-                ensure_rate -= 1
-        return True if ensure_rate >= (len(timeframes) // 2 + 1) else False  # Signal confirmed across all required timeframes
+        return bool(nested_confirm([start_time], [end_time], point_type, timeframes)[0])
 
 
+    def _strong_signals(self, df_15m, timeframes, name):
+        """
+        15m 的 {name}_buy/sell_point，在 1h/4h/1d 的同一窗口内过半也有同类信号则记为 strong_{name}_*
+        一次向量化完成，不再 iterrows
+        """
+        start_times, end_times = _windows(df_15m)
+        for side in ('buy', 'sell'):
+            point = f'{name}_{side}_point'
+            strong = f'strong_{name}_{side}_point'
+            confirmed = ~pd.isna(df_15m[point]).values & nested_confirm(start_times, end_times, point, timeframes)
+            df_15m[strong] = np.where(confirmed, df_15m[point].values, np.nan)
+            if confirmed.any():
+                print(f'ok I found {int(confirmed.sum())} {strong}!')
+        return df_15m
+
     def strong_macd_signals(self, df_15m, df_1h, df_4h, df_1d):
         # Ensure all dataframes have necessary MACD point columns
         timeframes = {'1h': df_1h, '4h': df_4h, '1d': df_1d}
         if 'macd_buy_point' not in df_15m.columns or 'macd_sell_point' not in df_15m.columns:
-            df_15m = self.macd_signals(
-                df_15m)  # Assuming this function updates df in place or returns updated df
-
-        # Initialize columns for strong MACD points in 15m df
-        df_15m['strong_macd_buy_point'] = np.nan
-        df_15m['strong_macd_sell_point'] = np.nan
-
-        # Process each 15m MACD point and check for nested signals in higher timeframes
-        for index, row in df_15m.iterrows():
-            # Define the time window for this row
-            start_time = row['trade_date']
-            end_time = start_time + pd.Timedelta(minutes=15)
-
-            # Check for strong buy signals
-            if not pd.isna(row['macd_buy_point']) and self.check_nested_signals(start_time, end_time, 'macd_buy_point',
-                                                                                timeframes):
-                print('ok I found one strong_macd_buy_point!')
-                df_15m.at[index, 'strong_macd_buy_point'] = row['macd_buy_point']
-
-            # Check for strong sell signals
-            if not pd.isna(row['macd_sell_point']) and self.check_nested_signals(start_time, end_time,
-                                                                                 'macd_sell_point', timeframes):
-                print('ok I found one strong_macd_sell_point!')
-                df_15m.at[index, 'strong_macd_sell_point'] = row['macd_sell_point']
+            self.macd_signals(df_15m)  # updates df in place
+        return self._strong_signals(df_15m, timeframes, 'macd')
 
     def strong_bolling_signals(self, df_15m, df_1h, df_4h, df_1d):
-        # Ensure all dataframes have necessary MACD point columns
         timeframes = {'1h': df_1h, '4h': df_4h, '1d': df_1d}
         if 'bolling_buy_point' not in df_15m.columns or 'bolling_sell_point' not in df_15m.columns:
-            df_15m = self.bolling_signals(df_15m)  # Assuming this function updates df in place or returns updated df
-
-        # Initialize columns for strong MACD points in 15m df
-        df_15m['strong_bolling_buy_point'] = np.nan
-        df_15m['strong_bolling_sell_point'] = np.nan
-
-        # Process each 15m MACD point and check for nested signals in higher timeframes
-        for index, row in df_15m.iterrows():
-            # Define the time window for this row
-            start_time = row['trade_date']
-            end_time = start_time + pd.Timedelta(minutes=15)
-
-            # Check for strong buy signals
-            if not pd.isna(row['bolling_buy_point']) and self.check_nested_signals(start_time, end_time, 'bolling_buy_point',
-                                                                                timeframes):
-                print('ok I found one strong_bolling_buy_point!')
-                df_15m.at[index, 'strong_bolling_buy_point'] = row['bolling_buy_point']
-
-            # Check for strong sell signals
-            if not pd.isna(row['bolling_sell_point']) and self.check_nested_signals(start_time, end_time,
-                                                                                 'bolling_sell_point', timeframes):
-                print('ok I found one strong_bolling_sell_point!')
-                df_15m.at[index, 'strong_bolling_sell_point'] = row['bolling_sell_point']
-
+            self.bolling_signals(df_15m)  # updates df in place
+        return self._strong_signals(df_15m, timeframes, 'bolling')
 
     def strong_ma_signals(self, df_15m, df_1h, df_4h, df_1d):
-        # Ensure all dataframes have necessary MACD point columns
         timeframes = {'1h': df_1h, '4h': df_4h, '1d': df_1d}
         if 'ma_buy_point' not in df_15m.columns or 'ma_sell_point' not in df_15m.columns:
-            df_15m = self.ma_signals(df_15m)  # Assuming this function updates df in place or returns updated df
-
-        # Initialize columns for strong MACD points in 15m df
-        df_15m['strong_ma_buy_point'] = np.nan
-        df_15m['strong_ma_sell_point'] = np.nan
-
-        # Process each 15m MACD point and check for nested signals in higher timeframes
-        for index, row in df_15m.iterrows():
-            # Define the time window for this row
-            start_time = row['trade_date']
-            end_time = start_time + pd.Timedelta(minutes=15)
-
-            # Check for strong buy signals
-            if not pd.isna(row['ma_buy_point']) and self.check_nested_signals(start_time, end_time, 'ma_buy_point',
-                                                                                timeframes):
-                print('ok I found one strong_ma_buy_point!')
-                df_15m.at[index, 'strong_ma_buy_point'] = row['ma_buy_point']
-
-            # Check for strong sell signals
-            if not pd.isna(row['ma_sell_point']) and self.check_nested_signals(start_time, end_time,
-                                                                                 'ma_sell_point', timeframes):
-                print('ok I found one strong_ma_sell_point!')
-                df_15m.at[index, 'strong_ma_sell_point'] = row['ma_sell_point']
+            self.ma_signals(df_15m)  # updates df in place
+        return self._strong_signals(df_15m, timeframes, 'ma')
 
 
 
     # Function to check higher timeframe alignment
     def is_higher_timeframes(self, start_time, end_time, point_type, timeframes):
         # This function checks for the presence of a point type in all specified timeframes within the given window
-        ensure_rate = len(timeframes) * 2
-        count = 0
-        for timeframe, df in timeframes.items():
-            count+=1
-            # Find any matching signals in this timeframe
-            matching_signals = df[
-                (df['trade_date'] >= start_time) & (df['trade_date'] <= end_time) & (~pd.isna(df[point_type]))]
-            if matching_signals.empty:
-                ensure_rate -= count
-        return True if ensure_rate >= len(timeframes) else False  # Signal confirmed across all required timeframes
-        # return True if ensure_rate >= (len(timeframes) // 2 + 1) else False  # Signal confirmed across all required timeframes
+        return bool(higher_timeframes_confirm([start_time], [end_time], point_type, timeframes)[0])
 
 
 
@@ -265,35 +231,27 @@ class SignalGenerator:
 
 
 
+    def _area_signals(self, df_15m, timeframes, name):
+        """
+        15m 的 {name}_buy/sell_point，结合高周期的 {name}_positive/negative_area 确认，写入 area_{name}_*
+        """
+        start_times, end_times = _windows(df_15m)
+        for side, area in (('buy', 'positive'), ('sell', 'negative')):
+            point = f'{name}_{side}_point'
+            col = f'area_{name}_{side}_point'
+            confirmed = ~pd.isna(df_15m[point]).values & \
+                higher_timeframes_confirm(start_times, end_times, f'{name}_{area}_area', timeframes)
+            values = np.full(len(df_15m), np.nan, dtype=object)
+            values[confirmed] = True
+            df_15m[col] = values
+            if confirmed.any():
+                print(f'ok I found {int(confirmed.sum())} {col}!')
+        return df_15m
+
     def area_macd_signals(self, df_15m, df_1h, df_4h, df_1d):
         # Analyze 15m data for buy and sell points supported by higher timeframe trends
-        area_buy_signals = []
-        area_sell_signals = []
         timeframes = {'1h': df_1h, '4h': df_4h, '1d': df_1d}
-        for index, row in df_15m.iterrows():
-            # Define the time window for this row
-            start_time = row['trade_date']
-            end_time = start_time + pd.Timedelta(minutes=15)
-
-            # Check for strong buy signals
-            if not pd.isna(row['macd_buy_point']) and self.is_higher_timeframes(start_time, end_time, 'macd_positive_area',
-                                                                              timeframes):
-                print('ok I found one area_macd_buy_point!')
-                area_buy_signals.append(index)
-
-            # Check for strong sell signals
-            if not pd.isna(row['macd_sell_point']) and self.is_higher_timeframes(start_time, end_time,
-                                                                               'macd_negative_area', timeframes):
-                print('ok I found one area_macd_sell_point!')
-                area_sell_signals.append(index)
-
-        # Mark these strong buy and sell signals in the 15m dataframe
-        df_15m['area_macd_buy_point'] = np.nan
-        df_15m['area_macd_sell_point'] = np.nan
-        df_15m.loc[area_buy_signals, 'area_macd_buy_point'] = True
-        df_15m.loc[area_sell_signals, 'area_macd_sell_point'] = True
-
-        return df_15m
+        return self._area_signals(df_15m, timeframes, 'macd')
 
     def area_ma(self, df):
         # Check where MA5 is greater than MA10
@@ -316,33 +274,8 @@ class SignalGenerator:
 
     def area_ma_signals(self, df_15m, df_1h, df_4h, df_1d):
         # Analyze 15m data for buy and sell points supported by higher timeframe trends
-        area_buy_signals = []
-        area_sell_signals = []
         timeframes = {'1h': df_1h, '4h': df_4h, '1d': df_1d}
-        for index, row in df_15m.iterrows():
-            # Define the time window for this row
-            start_time = row['trade_date']
-            end_time = start_time + pd.Timedelta(minutes=15)
-
-            # Check for strong buy signals
-            if not pd.isna(row['ma_buy_point']) and self.is_higher_timeframes(start_time, end_time, 'ma_positive_area',
-                                                                              timeframes):
-                print('ok I found one area_ma_buy_point!')
-                area_buy_signals.append(index)
-
-            # Check for strong sell signals
-            if not pd.isna(row['ma_sell_point']) and self.is_higher_timeframes(start_time, end_time,
-                                                                               'ma_negative_area', timeframes):
-                print('ok I found one area_ma_sell_point!')
-                area_sell_signals.append(index)
-
-        # Mark these strong buy and sell signals in the 15m dataframe
-        df_15m['area_ma_buy_point'] = np.nan
-        df_15m['area_ma_sell_point'] = np.nan
-        df_15m.loc[area_buy_signals, 'area_ma_buy_point'] = True
-        df_15m.loc[area_sell_signals, 'area_ma_sell_point'] = True
-
-        return df_15m
+        return self._area_signals(df_15m, timeframes, 'ma')
 
     def pre_process_for_plot(self, df):
         df['histogram'] = df['macd'] - df['signal']
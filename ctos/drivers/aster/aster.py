@@ -35,6 +35,7 @@ class AsterWebSocketManager:
         self._keepalive_task = None
         self._last_ping_time = None
         self.config = config
+        self.connection_callback = None  # callable(connected: bool), run in the default executor
 
     def _generate_signature(self, params: Dict[str, Any]) -> str:
         """Generate HMAC SHA256 signature for Aster API authentication."""
@@ -193,14 +194,28 @@ class AsterWebSocketManager:
             # Start keepalive task
             self._keepalive_task = asyncio.create_task(self._start_keepalive_task())
 
-            # Start listening for messages
-            await self._listen()
+            await self._notify_connection(True)
+            try:
+                # Start listening for messages
+                await self._listen()
+            finally:
+                await self._notify_connection(False)
 
         except Exception as e:
             if self.logger:
                 self.logger.log(f"WebSocket connection error: {e}", "ERROR")
             raise
 
+    async def _notify_connection(self, connected: bool):
+        """Run connection_callback off the event loop (it may block, e.g. REST reconciliation)."""
+        if not self.connection_callback:
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.connection_callback, connected)
+        except Exception as e:
+            if self.logger:
+                self.logger.log(f"Error in connection callback: {e}", "ERROR")
+
     async def _listen(self):
         """Listen for WebSocket messages."""
         try:
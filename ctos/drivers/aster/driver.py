@@ -34,6 +34,9 @@ except ImportError:
     sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
     from ctos.core.kernel.syscalls import TradingSyscalls
 
+from ctos.core.io.datafeed.order_state import OrderStateEngine
+from ctos.core.kernel.ratelimit import install_rate_limiter
+
 # Import account reader
 try:
     from configs.account_reader import get_aster_credentials, list_accounts
@@ -352,6 +355,32 @@ class AsterDriver(TradingSyscalls):
         self.size_scale = size_scale
         self.load_exchange_trade_info()
         self.order_id_to_symbol = {}
+        self.order_state = None
+        # 限频：同一账户的所有驱动/引擎共享令牌桶，撤单优先
+        self.rate_limiter = install_rate_limiter(self, methods={'get_price_now': 'market'})
+
+    def enable_order_stream(self, ws_source, bus=None):
+        """
+        接入 Aster 订单推送，写入 self.order_state（OrderStateEngine）
+        :param ws_source: aster.AsterWebSocketManager（替换其 order_update_callback），
+                          或带 setup_order_update_handler 的 aster.AsterClient；连接由调用方负责
+        订单表只在 socket 真正连上时才标记为实时（断开即退回 REST）：
+        AsterWebSocketManager 通过其 connection_callback 自动切换；AsterClient 的连接管理器在 connect() 里才创建，
+        需在 connect() 之后再调用本方法，否则订单表保持非实时，由调用方自行 set_live
+        """
+        if self.order_state is None:
+            self.order_state = OrderStateEngine(exchange=self.cex, bus=bus, reconcile_fn=self.get_order_status)
+        if hasattr(ws_source, "setup_order_update_handler"):
+            ws_source.setup_order_update_handler(self.order_state.on_aster_update)
+            manager = getattr(ws_source, "ws_manager", None)
+        else:
+            ws_source.order_update_callback = self.order_state.aster_callback
+            manager = ws_source
+        if manager is not None and hasattr(manager, "connection_callback"):
+            manager.connection_callback = self.order_state.set_live
+            if manager.running and manager.websocket is not None:
+                self.order_state.set_live(True)
+        return self.order_state
 
     def save_exchange_trade_info(self):
         """保存交易所交易信息到本地文件"""
@@ -757,12 +786,14 @@ class AsterDriver(TradingSyscalls):
             return order_id, err
         raise NotImplementedError("aster client lacks amend_order/modify_order")
 
-    def revoke_order(self, order_id):
+    def revoke_order(self, order_id, symbol=None):
         """
         撤销单个订单
         
         Args:
             order_id: 订单ID
+            symbol: 交易对符号（Aster 按订单ID撤单用不到，保留以与 TradingSyscalls.revoke_order 签名一致，
+                    cancel_orders_batch 会传入）
             
         Returns:
             tuple: (success, error)
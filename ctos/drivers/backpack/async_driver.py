@@ -0,0 +1,105 @@
+"""
+Backpack 的 asyncio 适配器
+
+撤单类 syscall（revoke_order / cancel_orders_batch / cancel_all）直接用 bpx.async_ 的原生协程客户端（aiohttp，
+长连接复用），几百笔撤单只占用事件循环，不占线程；其余 syscall 沿用 BackpackDriver 的同步实现，
+由 AsyncSyscalls 放到共享 I/O 线程池执行。两条路径共用同一个账户信号量和限频器。
+
+用法:
+    adapter = driver.async_adapter()            # 或 to_async(driver)
+    ok, err = await adapter.revoke_order(oid, 'ETH_USDC_PERP')
+    await adapter.close()
+"""
+import asyncio
+import base64
+import os
+import sys
+
+from ctos.core.kernel.async_syscalls import AsyncSyscalls, DEFAULT_ACCOUNT_CONCURRENCY
+from ctos.core.kernel.ratelimit import CANCEL
+from ctos.core.kernel.syscalls import normalize_cancel_items
+
+
+def _import_async_account():
+    try:
+        import aiohttp  # noqa: F401
+    except ImportError:
+        raise RuntimeError("请先安装aiohttp: pip install aiohttp")
+    # bpx.async_ 内部用绝对导入 `bpx.xxx`，需要 backpack 目录在 sys.path 中
+    backpack_dir = os.path.dirname(os.path.abspath(__file__))
+    if backpack_dir not in sys.path:
+        sys.path.append(backpack_dir)
+    from bpx.async_.account import Account as AsyncAccount
+    from bpx.http_client.async_http_client import AsyncHttpClient
+    return AsyncAccount, AsyncHttpClient
+
+
+def async_account_from(account):
+    """
+    用同步 bpx Account 的密钥构造 bpx.async_ Account（同一账户，同一 window）
+    每个适配器一个独立的 AsyncHttpClient：模块级 default_http_client 被所有账户共用，
+    close() 会关掉其它引擎正在用的连接，构造 Account 时还会覆盖它的 proxy
+    """
+    from cryptography.hazmat.primitives import serialization
+    AsyncAccount, AsyncHttpClient = _import_async_account()
+    secret = base64.b64encode(account.private_key.private_bytes(
+        serialization.Encoding.Raw, serialization.PrivateFormat.Raw, serialization.NoEncryption())).decode()
+    return AsyncAccount(account.public_key, secret, window=account.window, http_client=AsyncHttpClient())
+
+
+class BackpackAsyncSyscalls(AsyncSyscalls):
+    """
+    :param driver: BackpackDriver
+    :param account_client: 可选，已初始化的 bpx.async_ Account；默认用 driver.account 的密钥创建
+    """
+
+    def __init__(self, driver, max_concurrency=DEFAULT_ACCOUNT_CONCURRENCY, executor=None, account_client=None):
+        super().__init__(driver, max_concurrency=max_concurrency, executor=executor)
+        self.async_account = account_client
+        if self.async_account is None and getattr(driver, 'account', None) is not None:
+            self.async_account = async_account_from(driver.account)
+        self.limiter = getattr(driver, 'rate_limiter', None)
+
+    async def _native(self, fn, *args, weight=None, **kwargs):
+        async with self.semaphore:
+            if self.limiter is not None:
+                await self.limiter.acquire_async(CANCEL, weight=weight)
+            return await fn(*args, **kwargs)
+
+    async def revoke_order(self, order_id, symbol=None):
+        if self.async_account is None:
+            return await self.call('revoke_order', order_id, symbol)
+        if not symbol:
+            raise ValueError("symbol is required for cancel_order on Backpack")
+        full, _, _ = self.driver._norm_symbol(symbol)
+        try:
+            resp = await self._native(self.async_account.cancel_order, full, order_id=order_id)
+            return (True, None) if resp is not None else (False, resp)
+        except Exception as e:
+            return False, e
+
+    async def cancel_orders_batch(self, orders, symbol=None, max_workers=None):
+        """同 TradingSyscalls.cancel_orders_batch：([(success, error), ...], None)，并发度由账户信号量限制"""
+        items = normalize_cancel_items(orders, symbol)
+
+        async def _one(o):
+            try:
+                return await self.revoke_order(o['order_id'], symbol=o['symbol'])
+            except Exception as e:
+                return False, e
+
+        return list(await asyncio.gather(*[_one(o) for o in items])), None
+
+    async def cancel_all(self, symbol='ETH_USDC_PERP', order_ids=None):
+        if self.async_account is None or not symbol:
+            return await self.call('cancel_all', symbol, order_ids or [])
+        full, _, _ = self.driver._norm_symbol(symbol)
+        try:
+            resp = await self._native(self.async_account.cancel_all_orders, full)
+            return {"ok": True, "raw": resp}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+
+    async def close(self):
+        if self.async_account is not None:
+            await self.async_account.close()
@@ -578,6 +578,21 @@ class Account(BaseAccount):
             data=request_config.data,
         )
 
+    def execute_orders(
+        self, orders: List[dict], window: Optional[int] = None
+    ) -> Union[Dict[str, Any], List[Any], str]:
+        """
+        Posts a list of orders in one request and returns their statuses in order
+
+        https://docs.backpack.exchange/#tag/Order/operation/execute_order_batch
+        """
+        request_config = super().execute_orders(orders=orders, window=window)
+        return self.http_client.post(
+            url=request_config.url,
+            headers=request_config.headers,
+            data=request_config.data,
+        )
+
     def cancel_order(
         self,
         symbol: str,
@@ -22,6 +22,16 @@ class Public(BasePublic):
         self.http_client = http_client
         self.http_client.proxy = proxy
 
+    async def __aenter__(self) -> "Public":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the underlying HTTP session (shared with other clients using the same http_client)."""
+        await self.http_client.close()
+
     async def get_assets(self) -> Union[Dict[str, Any], List[Any], str]:
         """
         Returns all assets
@@ -1,7 +1,7 @@
 from cryptography.hazmat.primitives.asymmetric import ed25519
 import base64
 
-from typing import Optional, Union
+from typing import List, Optional, Union
 from ...bpx.models.objects import RequestConfiguration
 from time import time
 from ...bpx.exceptions import *
@@ -687,6 +687,21 @@ class BaseAccount:
         request_config = RequestConfiguration(url=url, headers=headers, data=params)
         return request_config
 
+    def execute_orders(
+        self, orders: List[dict], window: Optional[int] = None
+    ) -> RequestConfiguration:
+        """
+        Returns the url, headers and request body for placing a list of orders in one request
+
+        Each item takes the same keyword arguments as ``execute_order``.
+
+        https://docs.backpack.exchange/#tag/Order/operation/execute_order_batch
+        """
+        params_list = [BaseAccount.execute_order(self, **order).data for order in orders]
+        headers = self._batch_headers(params_list, "orderExecute", window=window)
+        url = self.BPX_API_URL + "api/v1/orders"
+        return RequestConfiguration(url=url, headers=headers, data=params_list)
+
     def cancel_order(
         self,
         symbol: str,
@@ -787,6 +802,42 @@ class BaseAccount:
             print(headers)
         return headers
 
+    def _batch_headers(
+        self, params_list: List[dict], instruction: str, window: Optional[int]
+    ) -> dict:
+        """
+        Returns headers for a batch request: one instruction block per item, then timestamp/window
+        """
+        window = self.window if window is None else window
+        timestamp = int(time() * 1e3)
+        blocks = []
+        for params in params_list:
+            block = f"instruction={instruction}"
+            sorted_params = self._sorted_params(params)
+            if sorted_params:
+                block += "&" + sorted_params
+            blocks.append(block)
+        sign_str = "&".join(blocks) + f"&timestamp={timestamp}&window={window}"
+        if self.debug:
+            print(sign_str)
+        signature_bytes = self.private_key.sign(sign_str.encode())
+        return {
+            "X-API-Key": self.public_key,
+            "X-Signature": base64.b64encode(signature_bytes).decode(),
+            "X-Timestamp": str(timestamp),
+            "X-Window": str(window),
+            "Content-Type": "application/json; charset=utf-8",
+        }
+
+    @staticmethod
+    def _sorted_params(params: dict) -> str:
+        sorted_params_list = []
+        for key, value in sorted(params.items()):
+            if isinstance(value, bool):
+                value = str(value).lower()
+            sorted_params_list.append(f"{key}={value}")
+        return "&".join(sorted_params_list)
+
     def _sign(self, params: dict, instruction: str, timestamp: int, window: int):
         """
         Returns encoded signature for given parameters, instruction, timestamp and window
@@ -1,86 +1,124 @@
+import asyncio
+import threading
 import aiohttp
-from typing import Union, List, Dict, Any, Awaitable
+from typing import Union, List, Dict, Any, Optional
 from bpx.http_client.base.http_client import HttpClient
 import json
 import certifi
 import ssl
 
+_ssl_context: Optional[ssl.SSLContext] = None
+
+
+def get_ssl_context() -> ssl.SSLContext:
+    """Load the certifi CA bundle once per process instead of once per request."""
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context(cafile=certifi.where())
+    return _ssl_context
+
 
 class AsyncHttpClient(HttpClient):
+    """
+    aiohttp client backed by long-lived ClientSessions, one per event loop.
 
-    def __init__(self, proxy: str = ""):
+    A session (and its connector) is bound to the loop it was created on, so
+    each loop using the client lazily gets its own and keeps it until
+    ``close()``; sessions of loops that have since been closed are dropped
+    (their connections died with the loop). Use it as
+    ``async with AsyncHttpClient() as client: ...`` or call ``await close()``
+    when done.
+    """
+
+    def __init__(
+        self,
+        proxy: str = "",
+        limit: int = 100,
+        limit_per_host: int = 32,
+        ttl_dns_cache: int = 300,
+        timeout: float = 10,
+        keepalive_timeout: float = 30,
+    ):
         self.proxy = proxy
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        self._lock = threading.Lock()
+
+    async def __aenter__(self) -> "AsyncHttpClient":
+        await self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for owner in [l for l in self._sessions if l.is_closed()]:
+                del self._sessions[owner]
+            session = self._sessions.get(loop)
+            if session is None or session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    ttl_dns_cache=self.ttl_dns_cache,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ssl=get_ssl_context(),
+                )
+                session = self._sessions[loop] = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=aiohttp.ClientTimeout(total=self.timeout),
+                )
+        return session
+
+    async def close(self) -> None:
+        """Close every session, each on the loop that owns it."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for owner, session in sessions.items():
+            if session.closed or owner.is_closed():
+                continue
+            if owner is loop:
+                await session.close()
+            elif owner.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), owner))
+
+    async def _request(
+        self, method, url, headers=None, params=None, data=None, send_body=False
+    ) -> Union[Dict[str, Any], List[Any], str]:
+        session = await self._get_session()
+        kwargs = {"proxy": self.proxy or None, "headers": headers}
+        if params is not None:
+            kwargs["params"] = params
+        if send_body:
+            kwargs["data"] = json.dumps(data)
+        async with session.request(method, url, **kwargs) as response:
+            try:
+                return await response.json()
+            except json.JSONDecodeError:
+                return await response.text()
+            except aiohttp.client_exceptions.ContentTypeError:
+                return await response.text()
 
     async def get(
         self, url, headers=None, params=None
     ) -> Union[Dict[str, Any], List[Any], str]:
-        ssl_context = ssl.create_default_context(cafile=certifi.where())
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                url, proxy=self.proxy, params=params, headers=headers, ssl=ssl_context
-            ) as response:
-
-                try:
-                    return await response.json()
-                except json.JSONDecodeError:
-                    return await response.text()
-                except aiohttp.client_exceptions.ContentTypeError:
-                    return await response.text()
+        return await self._request("GET", url, headers=headers, params=params)
 
     async def post(
         self, url, headers=None, data=None
     ) -> Union[Dict[str, Any], List[Any], str]:
-        ssl_context = ssl.create_default_context(cafile=certifi.where())
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                url,
-                proxy=self.proxy,
-                headers=headers,
-                data=json.dumps(data),
-                ssl=ssl_context,
-            ) as response:
-
-                try:
-                    return await response.json()
-                except json.JSONDecodeError:
-                    return await response.text()
-                except aiohttp.client_exceptions.ContentTypeError:
-                    return await response.text()
+        return await self._request("POST", url, headers=headers, data=data, send_body=True)
 
     async def delete(
         self, url, headers=None, data=None
     ) -> Union[Dict[str, Any], List[Any], str]:
-        ssl_context = ssl.create_default_context(cafile=certifi.where())
-        async with aiohttp.ClientSession() as session:
-            async with session.delete(
-                url,
-                proxy=self.proxy,
-                headers=headers,
-                data=json.dumps(data),
-                ssl=ssl_context,
-            ) as response:
-
-                try:
-                    return await response.json()
-                except json.JSONDecodeError:
-                    return await response.text()
-                except aiohttp.client_exceptions.ContentTypeError:
-                    return await response.text()
+        return await self._request("DELETE", url, headers=headers, data=data, send_body=True)
 
     async def patch(self, url, headers=None, data=None):
-        ssl_context = ssl.create_default_context(cafile=certifi.where())
-        async with aiohttp.ClientSession() as session:
-            async with session.patch(
-                url,
-                proxy=self.proxy,
-                headers=headers,
-                data=json.dumps(data),
-                ssl=ssl_context,
-            ) as response:
-
-                try:
-                    return await response.json()
-                except json.JSONDecodeError:
-                    return await response.text()
-                except aiohttp.client_exceptions.ContentTypeError:
-                    return await response.text()
+        return await self._request("PATCH", url, headers=headers, data=data, send_body=True)
@@ -1,19 +1,154 @@
+import os
+import threading
+import time
+from collections import deque
+from multiprocessing import cpu_count
+from urllib.parse import urlparse
+
 import requests
-from typing import Dict, Any, List, Union
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, List, Optional, Tuple, Union
 from ...bpx.http_client.base.http_client import HttpClient
 import json
 
+Timeout = Union[float, Tuple[float, float]]
+
+# (connect, read) seconds
+DEFAULT_TIMEOUT: Timeout = (3.05, 10)
+
+# Longest matching path prefix wins.
+DEFAULT_ENDPOINT_TIMEOUTS: Dict[str, Timeout] = {
+    "/api/v1/order": (3.05, 8),
+    "/api/v1/orders": (3.05, 8),
+    "/api/v1/klines": (3.05, 20),
+    "/wapi/v1/history": (3.05, 30),
+}
+
+
+def default_pool_size() -> int:
+    """
+    Keep-alive connections per host.
+
+    ExecutionEngine fans out over ``cpu_count()`` worker threads by default, so
+    the pool is sized to that (override with ``BPX_HTTP_POOL_SIZE``).
+    """
+    env = os.getenv("BPX_HTTP_POOL_SIZE")
+    if env and env.isdigit():
+        return max(1, int(env))
+    return max(10, cpu_count())
+
 
 class SyncHttpClient(HttpClient):
-    def __init__(self, proxies: dict = None):
+    """
+    requests-based client sharing one pooled Session across threads.
+
+    Connections are kept alive between calls, every request has a timeout
+    (per endpoint, see ``endpoint_timeouts``) and per-endpoint timing is
+    recorded for ``get_stats()``.
+    """
+
+    RECENT_SAMPLES = 256
+
+    def __init__(
+        self,
+        proxies: dict = None,
+        pool_size: Optional[int] = None,
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        endpoint_timeouts: Optional[Dict[str, Timeout]] = None,
+    ):
         self.proxies = proxies
+        self.timeout = timeout
+        self.endpoint_timeouts = dict(DEFAULT_ENDPOINT_TIMEOUTS)
+        if endpoint_timeouts:
+            self.endpoint_timeouts.update(endpoint_timeouts)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._recent = deque(maxlen=self.RECENT_SAMPLES)
+        self.pool_size = 0
+        self.session = requests.Session()
+        self.set_pool_size(pool_size or default_pool_size())
+
+    def set_pool_size(self, pool_size: int) -> None:
+        """(Re)mount the adapter so the pool matches the number of worker threads."""
+        pool_size = max(1, int(pool_size))
+        if pool_size == self.pool_size:
+            return
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.pool_size = pool_size
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _timeout_for(self, path: str) -> Timeout:
+        best, best_len = self.timeout, -1
+        for prefix, value in self.endpoint_timeouts.items():
+            if path.startswith(prefix) and len(prefix) > best_len:
+                best, best_len = value, len(prefix)
+        return best
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        path = urlparse(url).path
+        start = time.perf_counter()
+        status = None
+        try:
+            response = self.session.request(
+                method,
+                url,
+                proxies=self.proxies,
+                timeout=self._timeout_for(path),
+                **kwargs,
+            )
+            status = response.status_code
+            return response
+        finally:
+            self._record(method, path, time.perf_counter() - start, status)
+
+    def _record(self, method: str, path: str, elapsed: float, status: Optional[int]) -> None:
+        key = f"{method} {path}"
+        failed = status is None or status >= 400
+        with self._lock:
+            s = self._stats.get(key)
+            if s is None:
+                s = self._stats[key] = {"count": 0, "errors": 0, "total": 0.0, "max": 0.0, "last": 0.0}
+            s["count"] += 1
+            s["total"] += elapsed
+            s["last"] = elapsed
+            if elapsed > s["max"]:
+                s["max"] = elapsed
+            if failed:
+                s["errors"] += 1
+            self._recent.append((time.time(), key, elapsed, status))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-endpoint count/errors/avg/max/last latency in milliseconds."""
+        with self._lock:
+            endpoints = {
+                key: {
+                    "count": int(s["count"]),
+                    "errors": int(s["errors"]),
+                    "avg_ms": s["total"] / s["count"] * 1000 if s["count"] else 0.0,
+                    "max_ms": s["max"] * 1000,
+                    "last_ms": s["last"] * 1000,
+                }
+                for key, s in self._stats.items()
+            }
+            recent = [
+                {"ts": ts, "endpoint": key, "ms": elapsed * 1000, "status": status}
+                for ts, key, elapsed, status in self._recent
+            ]
+        return {"pool_size": self.pool_size, "endpoints": endpoints, "recent": recent}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._recent.clear()
 
     def get(
         self, url, headers=None, params=None
     ) -> Union[Dict[str, Any], List[Any], str]:
-        response = requests.get(
-            url=url, proxies=self.proxies, headers=headers, params=params
-        )
+        response = self._request("GET", url, headers=headers, params=params)
 
         try:
             return response.json()
@@ -23,9 +158,7 @@ class SyncHttpClient(HttpClient):
     def post(
         self, url, headers=None, data=None
     ) -> Union[Dict[str, Any], List[Any], str]:
-        response = requests.post(
-            url=url, proxies=self.proxies, headers=headers, json=data
-        )
+        response = self._request("POST", url, headers=headers, json=data)
         try:
             return response.json()
         except json.JSONDecodeError:
@@ -34,9 +167,7 @@ class SyncHttpClient(HttpClient):
     def delete(
         self, url, headers=None, data=None
     ) -> Union[Dict[str, Any], List[Any], str]:
-        response = requests.delete(
-            url, proxies=self.proxies, headers=headers, json=data
-        )
+        response = self._request("DELETE", url, headers=headers, json=data)
         try:
             return response.json()
         except json.JSONDecodeError:
@@ -45,7 +176,7 @@ class SyncHttpClient(HttpClient):
     def patch(
         self, url, headers=None, data=None
     ) -> Union[Dict[str, Any], List[Any], str]:
-        response = requests.patch(url, proxies=self.proxies, headers=headers, json=data)
+        response = self._request("PATCH", url, headers=headers, json=data)
         try:
             return response.json()
         except json.JSONDecodeError:
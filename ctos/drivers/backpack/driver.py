@@ -6,6 +6,7 @@ from __future__ import print_function
 
 from ast import main
 import os
+import random
 import time
 from datetime import datetime, timezone
 from decimal import Decimal, ROUND_DOWN
@@ -68,6 +69,10 @@ except ImportError:
     from ctos.core.kernel.syscalls import TradingSyscalls
 
 # Import account reader
+from ctos.core.io.datafeed.price_cache import get_price_cache
+from ctos.core.io.datafeed.exchange_info import get_exchange_info_cache
+from ctos.core.kernel.ratelimit import install_rate_limiter
+
 try:
     from configs.account_reader import get_backpack_credentials, list_accounts
 except ImportError:
@@ -187,7 +192,7 @@ class BackpackDriver(TradingSyscalls):
     Accepts inputs like 'eth-usdc', 'ETH/USDC', 'ETH-USDC-SWAP', 'eth', etc.
     """
 
-    def __init__(self, account_client=None, public_client=None, mode="perp", default_quote="USDC", account_id=0):
+    def __init__(self, account_client=None, public_client=None, mode="perp", default_quote="USDC", account_id=0, price_max_age=1.0):
         self.cex = 'Backpack'
         self.quote_ccy = 'USDC'
         self.account_id = account_id
@@ -197,6 +202,7 @@ class BackpackDriver(TradingSyscalls):
         :param mode: "perp" or "spot". If "perp", we append '_PERP' suffix when needed.
         :param default_quote: default quote when user passes 'ETH' without '_USDC'
         :param account_id: 账户ID，根据配置文件中的账户顺序映射 (0=第一个账户, 1=第二个账户, ...)
+        :param price_max_age: get_price_now 缓存有效期(秒)，0 表示每次都请求
         """
         if account_client is None or public_client is None:
             acc, pub = init_BackpackClients(account_id=account_id)
@@ -213,21 +219,107 @@ class BackpackDriver(TradingSyscalls):
         self.mode = (mode or "perp").lower()
         self.default_quote = default_quote or "USDC"
         self.symbol = 'ETH_USDC_PERP'
+        # 限频：同一账户的所有驱动/引擎共享令牌桶，撤单优先
+        self.rate_limiter = install_rate_limiter(self)
         self.load_exchange_trade_info()
         self.order_id_to_symbol = {}
+        # 价格缓存：同进程内所有 Backpack 驱动共享，一次 get_tickers 刷新全部交易对
+        self.price_max_age = price_max_age
+        self.price_cache = get_price_cache('Backpack', self._fetch_all_prices, fetch_one=self._fetch_one_price,
+                                           max_age=price_max_age)
+
 
+    def async_adapter(self, **kwargs):
+        """asyncio 适配器：撤单类走 bpx.async_ 原生协程，其它 syscall 走共享 I/O 线程池（见 async_driver.py）"""
+        from ctos.drivers.backpack.async_driver import BackpackAsyncSyscalls
+        return BackpackAsyncSyscalls(self, **kwargs)
 
     def save_exchange_trade_info(self):
-        with open(os.path.dirname(os.path.abspath(__file__)) + '/exchange_trade_info.json', 'w') as f:
-            json.dump(self.exchange_trade_info, f)
+        # 合并写：短时间内多次更新只落盘一次（临时文件 + os.replace 原子替换）
+        self.limits_cache.mark_dirty()
 
     def load_exchange_trade_info(self):
-        if not os.path.exists(os.path.dirname(os.path.abspath(__file__)) + '/exchange_trade_info.json'):
+        """
+        交易规则缓存：同进程内所有 Backpack 驱动共享，启动时后台用一次 get_markets 批量拉取全部交易对，
+        之后按 TTL 后台刷新；self.exchange_trade_info 就是缓存表本身
+        """
+        self.limits_cache = get_exchange_info_cache(
+            'Backpack', os.path.dirname(os.path.abspath(__file__)) + '/exchange_trade_info.json',
+            fetch_all=self._fetch_all_limits)
+        self.exchange_trade_info = self.limits_cache.table
+        self.limits_cache.start()
+
+    def _fetch_all_limits(self, group=None):
+        """一次 get_markets 请求拉取全部交易对的 tickSize/stepSize/minQuantity -> {symbol: limits}"""
+        if getattr(self, 'public', None) is None or not hasattr(self.public, 'get_markets'):
             return {}
-        with open(os.path.dirname(os.path.abspath(__file__)) + '/exchange_trade_info.json', 'r') as f:
-            self.exchange_trade_info = json.load(f)
-            # print('load_exchange_trade_info', os.path.dirname(os.path.abspath(__file__)) + '/exchange_trade_info.json')
-            # print('load_exchange_trade_info', self.exchange_trade_info)
+        markets = self.public.get_markets()
+        if isinstance(markets, dict) and 'data' in markets:
+            markets = markets['data']
+        if not isinstance(markets, list):
+            raise ValueError(f"Unexpected markets response format: {markets}")
+        out = {}
+        for m in markets:
+            limits = self._extract_limits_from_market(m) if isinstance(m, dict) else None
+            if limits and 'error' not in limits and limits['symbol']:
+                out[limits['symbol']] = limits
+        return out
+
+    def _extract_limits_from_market(self, market):
+        """
+        从 get_markets 的 filters 中提取限制信息（交易所给出的真实精度，无需推测）
+
+        :param market: 单个市场数据，如 {'symbol': 'SOL_USDC_PERP', 'marketType': 'PERP',
+                       'filters': {'price': {'tickSize': '0.01'}, 'quantity': {'stepSize': '0.01', 'minQuantity': '0.01'}}}
+        """
+        try:
+            filters = market.get('filters') or {}
+            price_f = filters.get('price') or {}
+            qty_f = filters.get('quantity') or {}
+            tick = float(price_f.get('tickSize') or 0)
+            step = float(qty_f.get('stepSize') or 0)
+            if tick <= 0 or step <= 0:
+                return {"error": f"{market.get('symbol', '')} 缺少 tickSize/stepSize"}
+            state = market.get('orderBookState')
+            return {
+                'symbol': market.get('symbol', ''),
+                'instType': market.get('marketType', 'PERP'),
+                'price_precision': tick,                                   # 下单价格精度
+                'size_precision': step,                                    # 下单数量精度
+                'min_order_size': float(qty_f.get('minQuantity') or step), # 最小下单数量
+                'contract_value': 1.0,                                     # 合约面值固定为1
+                'max_leverage': 10.0,                                      # 最大杠杆倍数固定为10
+                'state': 'live' if state in (None, 'Open') else str(state).lower(),
+                'raw': market
+            }
+        except Exception as e:
+            return {"error": f"解析market数据时发生异常: {str(e)}"}
+
+
+    def _http_clients(self):
+        clients = {}
+        for name, client in (("account", self.account), ("public", self.public)):
+            http_client = getattr(client, "http_client", None)
+            if http_client is not None:
+                clients[name] = http_client
+        return clients
+
+    def get_http_stats(self):
+        """
+        返回 account/public 两个 HTTP 客户端的分接口耗时统计
+        {'account': {'pool_size', 'endpoints': {'GET /api/v1/...': {...}}, 'recent': [...]}, 'public': {...}}
+        """
+        stats = {}
+        for name, http_client in self._http_clients().items():
+            if hasattr(http_client, "get_stats"):
+                stats[name] = http_client.get_stats()
+        return stats, None
+
+    def set_http_pool_size(self, pool_size):
+        """按并发线程数调整 keep-alive 连接池大小（只增不减，多个引擎共享同一客户端）"""
+        for http_client in self._http_clients().values():
+            if hasattr(http_client, "set_pool_size"):
+                http_client.set_pool_size(max(int(pool_size), getattr(http_client, "pool_size", 0)))
     # -------------- helpers --------------
     def _norm_symbol(self, symbol):
         """
@@ -332,9 +424,14 @@ class BackpackDriver(TradingSyscalls):
         """
         if symbol:
             symbol, _, _ = self._norm_symbol(symbol)
-            # print('symbol', symbol, self.exchange_trade_info)
-            if symbol in self.exchange_trade_info:
-                return self.exchange_trade_info[symbol], None
+            limits = self.exchange_trade_info.get(symbol)
+            if limits is not None:
+                return limits, None
+            # 未命中：先等（或触发）get_markets 批量加载，仍没有再按 ticker 推测
+            self.limits_cache.ensure_fresh()
+            limits = self.exchange_trade_info.get(symbol)
+            if limits is not None:
+                return limits, None
         try:
             # 如果指定了symbol，获取单个ticker
             if symbol:
@@ -347,8 +444,7 @@ class BackpackDriver(TradingSyscalls):
                 
                 limits = self._extract_limits_from_ticker(ticker_data)
                 if limits and 'error' not in limits:
-                    self.exchange_trade_info[symbol] = limits
-                    self.save_exchange_trade_info()
+                    self.limits_cache.put(symbol, limits)
                 return limits, None
             
             # 如果没有指定symbol，获取所有tickers
@@ -359,20 +455,22 @@ class BackpackDriver(TradingSyscalls):
             if not tickers_data or not isinstance(tickers_data, list):
                 return {"error": "未获取到tickers数据"}
             
-            # 过滤指定类型的数据
+            # 优先使用 get_markets 的真实精度，缺失的交易对才按 ticker 推测
+            self.limits_cache.ensure_fresh()
             result = []
+            fetched = {}
             for ticker in tickers_data:
                 if not isinstance(ticker, dict):
                     continue
                 
                 ticker_symbol = ticker.get('symbol', '')
                 if instType.upper() in ticker_symbol.upper():
-                    limits = self._extract_limits_from_ticker(ticker)
+                    limits = self.exchange_trade_info.get(ticker_symbol) or self._extract_limits_from_ticker(ticker)
                     if limits and 'error' not in limits:
                         result.append(limits)
-                        self.exchange_trade_info[ticker_symbol] = limits
+                        fetched[ticker_symbol] = limits
             
-            self.save_exchange_trade_info()
+            self.limits_cache.put_many(fetched)
             return result, None
             
         except Exception as e:
@@ -546,8 +644,35 @@ class BackpackDriver(TradingSyscalls):
             return None, e
 
     # -------------- market data --------------
+    def _fetch_all_prices(self, group=None):
+        data = self.public.get_tickers()
+        if not isinstance(data, list):
+            raise RuntimeError(data)
+        prices = {}
+        for x in data:
+            price = x.get('lastPrice') if isinstance(x, dict) else None
+            if price:
+                prices[x['symbol']] = float(price)
+        return prices
+
+    def _fetch_one_price(self, full):
+        data = self.public.get_ticker(full)
+        if isinstance(data, dict):
+            price = data.get('lastPrice') or data.get('last') or data.get('price')
+            if price is not None:
+                return float(price)
+        return None
+
+    def get_price_stats(self):
+        """价格缓存命中统计"""
+        return self.price_cache.get_stats()
+
     def get_price_now(self, symbol='ETH_USDC_PERP'):
         full, base, _ = self._norm_symbol(symbol)
+        if hasattr(self.public, "get_tickers"):
+            price = self.price_cache.get(full, max_age=self.price_max_age)
+            if price is not None:
+                return price
         if hasattr(self.public, "get_ticker"):
             try:
                 data = self.public.get_ticker(full)
@@ -831,6 +956,88 @@ class BackpackDriver(TradingSyscalls):
         
         return None, "Max retries exceeded"
 
+    # -------------- batch trading --------------
+    BATCH_PLACE_MAX = 20
+
+    def place_orders_batch(self, orders, max_workers=8):
+        """
+        批量下单：走 POST /api/v1/orders（order list execute），交易所明确拒绝的单笔再用 place_order 重试（含精度自动修正）
+        请求本身失败（超时/非列表返回）时请求可能已被受理，不重下：按 clientId 查挂单对账，找到的算成功，其余返回错误
+        撤单/改单 Backpack 没有按订单ID批量的接口，沿用基类的并发回退
+        :param orders: [{'symbol','side','order_type','size','price','client_id', ...}, ...]
+        :return: ([(order_id, err), ...], None)
+        """
+        if not hasattr(self.account, "execute_orders"):
+            return super(BackpackDriver, self).place_orders_batch(orders, max_workers=max_workers)
+        orders = [dict(o) for o in orders]
+        params_list = []
+        for o in orders:
+            extra = dict(o)
+            full, _, _ = self._norm_symbol(extra.pop("symbol"))
+            params = {
+                "symbol": full,
+                "side": "Bid" if str(extra.pop("side")).lower() in ("buy", "bid", "long") else "Ask",
+                "order_type": "Limit" if str(extra.pop("order_type", "limit")).lower() in ("limit",) else "Market",
+                "quantity": str(extra.pop("size")),
+                "time_in_force": extra.pop("time_in_force", "GTC"),
+            }
+            price = extra.pop("price", None)
+            if price is not None:
+                params["price"] = str(price)
+            # 每笔都带 clientId，批量请求结果未知时据此对账
+            client_id = extra.pop("client_id", None) or random.randrange(1, 2 ** 31)
+            o["client_id"] = client_id
+            params["client_id"] = client_id
+            extra.pop("max_retries", None)
+            params.update(extra)
+            params_list.append(params)
+
+        results = [None] * len(orders)
+        retry = []
+        for start in range(0, len(params_list), self.BATCH_PLACE_MAX):
+            chunk = params_list[start:start + self.BATCH_PLACE_MAX]
+            try:
+                resp = self.account.execute_orders(chunk)
+            except Exception as e:
+                resp = e
+            if not isinstance(resp, list) or len(resp) != len(chunk):
+                print(f"⚠ 批量下单结果未知，按 clientId 对账: {resp}")
+                found = self._open_orders_by_client_id(set(p["symbol"] for p in chunk))
+                for i, p in enumerate(chunk):
+                    oid = found.get(str(p["client_id"]))
+                    if oid:
+                        results[start + i] = (oid, None)
+                        self.order_id_to_symbol[oid] = p["symbol"]
+                    else:
+                        results[start + i] = (None, RuntimeError(
+                            f"批量下单结果未知({resp})，未找到 clientId={p['client_id']} 的挂单，为避免重复未重下"))
+                continue
+            for i, od in enumerate(resp):
+                if isinstance(od, dict) and 'id' in od:
+                    results[start + i] = (od.get('id'), None)
+                    self.order_id_to_symbol[od.get('id')] = chunk[i]["symbol"]
+                else:
+                    retry.append(start + i)
+        if retry:
+            rest, _ = super(BackpackDriver, self).place_orders_batch([orders[i] for i in retry], max_workers=max_workers)
+            for i, r in zip(retry, rest):
+                results[i] = r
+        return results, None
+
+    def _open_orders_by_client_id(self, symbols):
+        """{str(clientId): order_id}，查询失败的交易对跳过"""
+        out = {}
+        for symbol in symbols:
+            try:
+                raw = self.account.get_open_orders(symbol=symbol)
+            except Exception as e:
+                print(f"⚠ 对账查询挂单失败 {symbol}: {e}")
+                continue
+            for od in raw if isinstance(raw, list) else []:
+                if isinstance(od, dict) and od.get('clientId') is not None and od.get('id'):
+                    out[str(od['clientId'])] = od['id']
+        return out
+
     def amend_order(self, order_id, symbol, price=None, size=None, side=None, order_type=None,
                     time_in_force=None, post_only=None, **kwargs):
         """
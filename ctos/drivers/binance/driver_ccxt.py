@@ -7,18 +7,27 @@ from __future__ import annotations
 import os
 import time
 import json
+import uuid
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, Tuple
 import pandas as pd
 
 # syscall base（与你的项目保持一致）
 try:
-    from ctos.core.kernel.syscalls import TradingSyscalls
+    from ctos.core.kernel.syscalls import TradingSyscalls, chunked, normalize_cancel_items
 except ImportError:
     import sys
     import os
     sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
-    from ctos.core.kernel.syscalls import TradingSyscalls
+    from ctos.core.kernel.syscalls import TradingSyscalls, chunked, normalize_cancel_items
+
+try:
+    from ctos.drivers.binance.ws import WsClient, UserDataClient
+except ImportError:
+    from .ws import WsClient, UserDataClient
+from ctos.core.io.datafeed.orderbook import BookManager
+from ctos.core.io.datafeed.order_state import OrderStateEngine
+from ctos.core.kernel.ratelimit import install_rate_limiter
 
 # ccxt connector
 try:
@@ -61,7 +70,7 @@ class BinanceDriver(TradingSyscalls):
     Accepts inputs like 'eth-usdt', 'ETH/USDT', 'ETH-USDT-SWAP', 'eth', etc.
     """
 
-    def __init__(self, account_client=None, public_client=None, mode="usdm", default_quote="USDT", account_id=0):
+    def __init__(self, account_client=None, public_client=None, mode="usdm", default_quote="USDT", account_id=0, ws_client=None):
         self.cex = 'Binance'
         self.quote_ccy = 'USDT'
         self.account_id = account_id
@@ -71,7 +80,13 @@ class BinanceDriver(TradingSyscalls):
         :param mode: "usdm" or "spot". If "usdm", we use futures markets.
         :param default_quote: default quote when user passes 'ETH' without '_USDT'
         :param account_id: 账户ID，根据配置文件中的账户顺序映射 (0=第一个账户, 1=第二个账户, ...)
+        :param ws_client: Optional. A started ws.WsClient; price/kline queries are served from it when fresh.
         """
+        self.ws = ws_client
+        self.ws_max_age = 5.0
+        self.books = None
+        self.user_ws = None
+        self.order_state = None
         if account_client is None or public_client is None:
             cli = init_binance_clients(mode=mode, account_id=account_id)
             self.account = account_client or cli["um"] or cli["spot"]
@@ -90,6 +105,8 @@ class BinanceDriver(TradingSyscalls):
         self.symbol = 'ETHUSDT'
         self.load_exchange_trade_info()
         self.order_id_to_symbol = {}
+        # 限频：同一账户的所有驱动/引擎共享令牌桶，撤单优先
+        self.rate_limiter = install_rate_limiter(self, methods={'get_price_now': 'market'})
 
     def save_exchange_trade_info(self):
         with open(os.path.dirname(os.path.abspath(__file__)) + '/exchange_trade_info.json', 'w') as f:
@@ -102,6 +119,81 @@ class BinanceDriver(TradingSyscalls):
         with open(os.path.dirname(os.path.abspath(__file__)) + '/exchange_trade_info.json', 'r') as f:
             self.exchange_trade_info = json.load(f)
 
+    def enable_ws(self, symbols=None, timeframes=None, bus=None, max_age=5.0):
+        """
+        启动行情 WS（ticker/bookTicker/kline/depth），之后 get_price_now / get_klines 优先读内存
+        :param symbols: 订阅的币种列表，可后续 self.ws.subscribe 追加
+        :param timeframes: K线周期列表，默认 ['1m']
+        :param bus: 可选 EventBus，推送 md.binance.<SYMBOL>.<kind>
+        """
+        if self.ws is None:
+            config = {
+                "mode": "spot" if self.mode == "spot" else "usdm",
+                "symbols": [self._norm_symbol(s)[0] for s in (symbols or [self.symbol])],
+                "timeframes": timeframes or ["1m"],
+            }
+            self.ws = WsClient(config, None, bus=bus)
+        elif symbols:
+            self.ws.subscribe([self._norm_symbol(s)[0] for s in symbols])
+        self.ws_max_age = max_age
+        if self.books is None and "depth" in self.ws.streams:
+            # 本地 L2 订单簿: REST 快照 + WS 增量，断档自动重新拉快照
+            self.books = BookManager(snapshot_fn=self._depth_snapshot, max_depth=1000, max_age=max_age)
+            self.ws.add_listener(self._on_ws_depth)
+        self.ws.start()
+        return self.ws
+
+    def enable_order_stream(self, bus=None):
+        """
+        启动用户数据流（listenKey），订单/成交推送写入 self.order_state（OrderStateEngine），
+        ExecutionEngine 追单时据此判断成交，不再轮询 get_open_orders / get_order_status
+        """
+        if self.order_state is None:
+            self.order_state = OrderStateEngine(exchange=self.cex, bus=bus, reconcile_fn=self.get_order_status)
+        if self.user_ws is None:
+            self.user_ws = UserDataClient(self._create_listen_key, self._keepalive_listen_key,
+                                          order_state=self.order_state,
+                                          mode="spot" if self.mode == "spot" else "usdm")
+        self.user_ws.start()
+        return self.order_state
+
+    def _create_listen_key(self):
+        if self.mode == "spot":
+            return self.account.publicPostUserDataStream().get("listenKey")
+        return self.account.fapiPrivatePostListenKey().get("listenKey")
+
+    def _keepalive_listen_key(self, listen_key):
+        if self.mode == "spot":
+            return self.account.publicPutUserDataStream({"listenKey": listen_key})
+        return self.account.fapiPrivatePutListenKey({"listenKey": listen_key})
+
+    def _on_ws_depth(self, kind, symbol, data):
+        if kind != "depth":
+            return
+        self.books.on_diff(symbol, data["bids"], data["asks"], data["first_id"], data["final_id"], data["prev_final_id"])
+
+    def _depth_snapshot(self, symbol):
+        if self.mode != "spot":
+            # WS 增量来自 fstream（U/u/pu 为合约序号），快照必须取合约的 /fapi/v1/depth，
+            # ccxt.binance 默认 fetch_order_book 返回的是现货盘口，序号永远对不上
+            raw = self.public.fapiPublicGetDepth({"symbol": symbol, "limit": 1000})
+            return raw.get("bids", []), raw.get("asks", []), int(raw["lastUpdateId"])
+        raw = self.public.fetch_order_book(symbol=symbol, limit=1000)
+        # ccxt 把 Binance 的 lastUpdateId 放在 nonce
+        return raw.get("bids", []), raw.get("asks", []), raw.get("nonce")
+
+    def get_local_book(self, symbol):
+        """已同步的本地订单簿（OrderBook），未启用/未同步时返回 None"""
+        if self.books is None:
+            return None
+        full, _, _ = self._norm_symbol(symbol)
+        book = self.books.get(full)
+        if book is None and self.ws is not None:
+            self.ws.subscribe([full])
+            self.books.book(full)
+            self.books.resync(full)
+        return book
+
     # -------------- helpers --------------
     def _norm_symbol(self, symbol):
         """
@@ -298,6 +390,12 @@ class BinanceDriver(TradingSyscalls):
     # -------------- market data --------------
     def get_price_now(self, symbol='ETHUSDT'):
         full, base, _ = self._norm_symbol(symbol)
+        if self.ws is not None:
+            price = self.ws.get_price(full, max_age=self.ws_max_age)
+            if price is not None:
+                return price, None
+            # 未订阅的币种自动加入，下次即可命中内存
+            self.ws.subscribe([full])
         if hasattr(self.public, "fetch_ticker"):
             try:
                 data = self.public.fetch_ticker(symbol=full)
@@ -312,6 +410,9 @@ class BinanceDriver(TradingSyscalls):
 
     def get_orderbook(self, symbol='ETHUSDT', level=50):
         full, _, _ = self._norm_symbol(symbol)
+        book = self.get_local_book(full)
+        if book is not None:
+            return book.to_ctos(int(level)), None
         if hasattr(self.public, "fetch_order_book"):
             try:
                 raw = self.public.fetch_order_book(symbol=full, limit=int(level))
@@ -324,6 +425,16 @@ class BinanceDriver(TradingSyscalls):
 
     def get_klines(self, symbol='ETHUSDT', timeframe='1m', limit=200, start_time=None, end_time=None):
         full, _, _ = self._norm_symbol(symbol)
+        use_ws = self.ws is not None and timeframe in self.ws.timeframes
+        if use_ws:
+            rows = self.ws.get_klines(full, timeframe, limit=limit, start_time=start_time, end_time=end_time,
+                                    max_age=self.ws_max_age)
+            if rows is not None:
+                try:
+                    return pd.DataFrame.from_records(rows, columns=['trade_date', 'open', 'high', 'low', 'close', 'vol1', 'vol']), None
+                except Exception:
+                    return rows, None
+            self.ws.subscribe([full])
         if not hasattr(self.public, "fetch_ohlcv"):
             return None, NotImplementedError("Public.fetch_ohlcv unavailable")
 
@@ -385,6 +496,9 @@ class BinanceDriver(TradingSyscalls):
         records.sort(key=lambda r: r['trade_date'])
         if limit and len(records) > int(limit):
             records = records[-int(limit):]
+        if use_ws and records:
+            # 用 REST 历史回填内存，后续由 WS 增量维护
+            self.ws.seed_klines(full, timeframe, records)
 
         # 优先返回 pandas.DataFrame
         try:
@@ -590,6 +704,144 @@ class BinanceDriver(TradingSyscalls):
             **kwargs
         )
 
+    # -------------- batch trading --------------
+    # U本位合约 batchOrders 每次最多 5 笔，批量撤单每次最多 10 笔（同一 symbol）
+    BATCH_PLACE_MAX = 5
+    BATCH_CANCEL_MAX = 10
+
+    def place_orders_batch(self, orders, max_workers=8):
+        """
+        批量下单：合约走 ccxt.create_orders (POST /fapi/v1/batchOrders)，现货或不支持时并发单笔下单
+        每笔都带 clientOrderId；请求超时等结果未知时交易所可能已受理，按 clientOrderId 查单对账，不重下
+        :param orders: [{'symbol','side','order_type','size','price','client_id', ...}, ...]
+        :return: ([(order_id, err), ...], None)
+        """
+        if self.mode == "spot" or not hasattr(self.account, "create_orders"):
+            return super(BinanceDriver, self).place_orders_batch(orders, max_workers=max_workers)
+        reqs = []
+        for o in orders:
+            o = dict(o)
+            full, _, _ = self._norm_symbol(o.pop("symbol"))
+            req = {
+                "symbol": full,
+                "side": "buy" if str(o.pop("side")).lower() in ("buy", "bid", "long") else "sell",
+                "type": "limit" if str(o.pop("order_type", "limit")).lower() in ("limit",) else "market",
+                "amount": float(o.pop("size")),
+            }
+            price = o.pop("price", None)
+            if price is not None:
+                req["price"] = float(price)
+            o["clientOrderId"] = o.pop("client_id", None) or uuid.uuid4().hex
+            req["params"] = o
+            reqs.append(req)
+        results = []
+        for chunk in chunked(reqs, self.BATCH_PLACE_MAX):
+            try:
+                resp = self.account.create_orders(chunk)
+            except Exception as e:
+                print(f"⚠ 批量下单结果未知，按 clientOrderId 对账: {e}")
+                results.extend(self._reconcile_placed(req, e) for req in chunk)
+                continue
+            for req, od in zip(chunk, resp):
+                order_id = od.get("id") if isinstance(od, dict) else None
+                if order_id:
+                    self.order_id_to_symbol[str(order_id)] = req["symbol"]
+                    results.append((str(order_id), None))
+                else:
+                    results.append((None, od.get("info", od) if isinstance(od, dict) else od))
+        return results, None
+
+    def _reconcile_placed(self, req, error):
+        """按 clientOrderId 查单：查到即已下单成功并记账；查不到返回错误，不重下以免重复"""
+        client_id = req["params"]["clientOrderId"]
+        try:
+            od = self.account.fetch_order(None, req["symbol"], {"origClientOrderId": client_id})
+            order_id = od.get("id") if isinstance(od, dict) else None
+        except Exception as e:
+            od, order_id = e, None
+        if order_id:
+            self.order_id_to_symbol[str(order_id)] = req["symbol"]
+            return str(order_id), None
+        return None, RuntimeError(f"批量下单结果未知({error})，未找到 clientOrderId={client_id} 的订单({od})，为避免重复未重下")
+
+    def cancel_orders_batch(self, orders, symbol=None, max_workers=8):
+        """
+        批量撤单：按 symbol 分组走 ccxt.cancel_orders (DELETE /fapi/v1/batchOrders)
+        :param orders: 订单ID列表，或 (order_id, symbol) / {'order_id','symbol'}
+        :return: ([(success, err), ...], None)
+        """
+        if self.mode == "spot" or not hasattr(self.account, "cancel_orders"):
+            return super(BinanceDriver, self).cancel_orders_batch(orders, symbol=symbol, max_workers=max_workers)
+        items = normalize_cancel_items(orders, symbol)
+        results = [None] * len(items)
+        groups = {}
+        for idx, o in enumerate(items):
+            sym = o["symbol"] or self.order_id_to_symbol.get(str(o["order_id"]))
+            if not sym:
+                results[idx] = (False, ValueError("symbol is required"))
+                continue
+            groups.setdefault(self._norm_symbol(sym)[0], []).append(idx)
+        for full, idxs in groups.items():
+            for chunk in chunked(idxs, self.BATCH_CANCEL_MAX):
+                ids = [str(items[i]["order_id"]) for i in chunk]
+                try:
+                    resp = self.account.cancel_orders(ids, full)
+                except Exception as e:
+                    for i in chunk:
+                        results[i] = (False, e)
+                    continue
+                for i, od in zip(chunk, resp or []):
+                    ok = isinstance(od, dict) and bool(od.get("id"))
+                    results[i] = (True, None) if ok else (False, od.get("info", od) if isinstance(od, dict) else od)
+                for i in chunk:
+                    if results[i] is None:
+                        results[i] = (False, RuntimeError("missing cancel result"))
+        return results, None
+
+    def amend_orders_batch(self, amends, max_workers=8):
+        """
+        批量改单：合约走 ccxt.edit_orders (PUT /fapi/v1/batchOrders)，否则并发 查单->撤单->下单
+        :param amends: [{'order_id','symbol','price','size','side','order_type'}, ...]
+                       原生接口需要 side/size/price 齐全，缺字段的条目走单笔 amend_order
+        :return: ([(order_id, err), ...], None)
+        """
+        if self.mode == "spot" or not hasattr(self.account, "edit_orders"):
+            return super(BinanceDriver, self).amend_orders_batch(amends, max_workers=max_workers)
+        native, fallback = [], []
+        for idx, a in enumerate(amends):
+            complete = all(a.get(k) is not None for k in ("symbol", "side", "size", "price"))
+            (native if complete else fallback).append(idx)
+        results = [None] * len(amends)
+        reqs = []
+        for idx in native:
+            a = amends[idx]
+            reqs.append({
+                "id": str(a["order_id"]),
+                "symbol": self._norm_symbol(a["symbol"])[0],
+                "type": "limit",
+                "side": "buy" if str(a["side"]).lower() in ("buy", "bid", "long") else "sell",
+                "amount": float(a["size"]),
+                "price": float(a["price"]),
+            })
+        for chunk_idx, chunk in zip(chunked(native, self.BATCH_PLACE_MAX), chunked(reqs, self.BATCH_PLACE_MAX)):
+            try:
+                resp = self.account.edit_orders(chunk)
+            except Exception as e:
+                for i in chunk_idx:
+                    results[i] = (None, e)
+                continue
+            for i, od in zip(chunk_idx, resp):
+                order_id = od.get("id") if isinstance(od, dict) else None
+                results[i] = (str(order_id), None) if order_id else (None, od.get("info", od) if isinstance(od, dict) else od)
+        if fallback:
+            rest, _ = super(BinanceDriver, self).amend_orders_batch([amends[i] for i in fallback], max_workers=max_workers)
+            for i, r in zip(fallback, rest):
+                results[i] = r
+        for i in range(len(results)):
+            if results[i] is None:
+                results[i] = (None, RuntimeError("missing amend result"))
+        return results, None
+
     def revoke_order(self, order_id, symbol=None):
         if hasattr(self.account, "cancel_order"):
             if not symbol:
@@ -3,10 +3,602 @@ Websocket adapter for this exchange.
 Responsibilities:
 - Connect, subscribe, and normalize streams (ticks/klines/orderbook/orders/balances)
 - Auto-reconnect & backoff
+
+Market data goes over one combined-stream connection
+(``/stream?streams=a/b/c``) per client:
+
+- ``<sym>@ticker``        24h rolling ticker -> last price
+- ``<sym>@bookTicker``    best bid/ask
+- ``<sym>@kline_<tf>``    klines, kept in memory per (symbol, timeframe)
+- ``<sym>@depth@100ms``   depth diffs, sequence-checked (U/u/pu)
+
+The socket runs in a daemon thread with its own asyncio loop so the sync
+driver can read the in-memory state without blocking. Everything is stored
+in CTOS shapes: prices are floats, klines are dict rows with
+trade_date(ms)/open/high/low/close/vol1/vol, depth is [[price, size], ...].
+
+Private order/fill pushes come from :class:`UserDataClient` (listen key
+stream), which feeds an ``OrderStateEngine``.
 """
+import asyncio
+import json
+import random
+import threading
+import time
+from bisect import bisect_left
+
+try:
+    import websockets
+except ImportError:  # optional dependency, only needed when the client is started
+    websockets = None
+
+
+WS_URLS = {
+    "usdm": "wss://fstream.binance.com/stream",
+    "spot": "wss://stream.binance.com:9443/stream",
+}
+
+KLINE_COLUMNS = ["trade_date", "open", "high", "low", "close", "vol1", "vol"]
+
+_TIMEFRAME_UNITS_MS = {"s": 1000, "m": 60000, "h": 3600000, "d": 86400000, "w": 604800000}
+
+
+def timeframe_ms(timeframe):
+    """'1m' -> 60000; None for month bars ('1M'), which are not evenly spaced."""
+    tf = str(timeframe or "")
+    unit = _TIMEFRAME_UNITS_MS.get(tf[-1:])
+    if unit is None or not tf[:-1].isdigit():
+        return None
+    return int(tf[:-1]) * unit
+
+
+def norm_ws_symbol(symbol):
+    """'eth' / 'ETH-USDT-SWAP' / 'ETH/USDT' / 'ETHUSDT' -> 'ETHUSDT'"""
+    s = str(symbol or "").strip().upper()
+    for suffix in ("-SWAP", "_PERP"):
+        if s.endswith(suffix):
+            s = s[: -len(suffix)]
+    s = s.replace("-", "").replace("/", "").replace("_", "")
+    if not s:
+        return s
+    if not (s.endswith("USDT") or s.endswith("BUSD") or s.endswith("FDUSD") or s.endswith("USDC")):
+        s += "USDT"
+    return s
+
+
 class WsClient:
-    def __init__(self, config, secrets):
-        self.config = config
+    """
+    Binance market-data websocket client.
+
+    :param config: dict, keys (all optional)
+        mode            'usdm' (default) or 'spot'
+        symbols         initial symbols
+        streams         subset of ('ticker', 'bookTicker', 'kline', 'depth')
+        timeframes      kline intervals, default ['1m']
+        depth_speed     '100ms' (default) / '250ms' / '500ms'
+        kline_maxlen    klines kept per (symbol, timeframe), default 1500
+        url             override base url
+        max_backoff     reconnect backoff cap in seconds, default 30
+    :param secrets: unused for public streams (user data stream needs a listen key)
+    :param bus: optional EventBus; every normalized update is also published as
+        ``md.binance.<SYMBOL>.<kind>``
+    """
+
+    DEFAULT_STREAMS = ("ticker", "bookTicker", "kline", "depth")
+
+    def __init__(self, config=None, secrets=None, bus=None):
+        self.config = dict(config or {})
         self.secrets = secrets
+        self.bus = bus
+        self.mode = self.config.get("mode", "usdm").lower()
+        self.url = self.config.get("url") or WS_URLS["spot" if self.mode == "spot" else "usdm"]
+        self.streams = tuple(self.config.get("streams") or self.DEFAULT_STREAMS)
+        self.timeframes = list(self.config.get("timeframes") or ["1m"])
+        self.depth_speed = self.config.get("depth_speed", "100ms")
+        self.kline_maxlen = int(self.config.get("kline_maxlen", 1500))
+        self.max_backoff = float(self.config.get("max_backoff", 30))
+
+        self.symbols = set()
+        for s in self.config.get("symbols") or []:
+            self.symbols.add(norm_ws_symbol(s))
+
+        self._lock = threading.RLock()
+        self.tickers = {}       # SYMBOL -> {'last','open','high','low','vol1','vol','ts'}
+        self.book_tickers = {}  # SYMBOL -> {'bid','bidSize','ask','askSize','ts'}
+        self.klines = {}        # (SYMBOL, tf) -> list[row] sorted by trade_date
+        self.depth_seq = {}     # SYMBOL -> last final update id (u)
+        self.listeners = []     # callback(kind, symbol, data)
+
+        self.stats = {
+            "messages": 0,
+            "reconnects": 0,
+            "depth_gaps": 0,
+            "parse_errors": 0,
+            "connected_at": None,
+            "last_message_at": None,
+        }
+
+        self._ws = None
+        self._loop = None
+        self._thread = None
+        self._running = False
+        self._req_id = 0
+
+    # ---------------- lifecycle ----------------
+    def start(self):
+        if websockets is None:
+            raise RuntimeError("请先安装websockets: pip install websockets")
+        if self._thread and self._thread.is_alive():
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._thread_main, name="binance-ws", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._running = False
+        if self._loop is not None and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def connected(self):
+        return self._ws is not None
+
+    def add_listener(self, callback):
+        """callback(kind, symbol, data); kind in ticker/bookTicker/kline/depth/gap"""
+        self.listeners.append(callback)
+
+    def subscribe(self, symbols):
+        """Add symbols; sent live if connected, otherwise used on next connect."""
+        new = [norm_ws_symbol(s) for s in symbols]
+        new = [s for s in new if s and s not in self.symbols]
+        if not new:
+            return
+        with self._lock:
+            self.symbols.update(new)
+        if self._loop is not None and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._send_subscribe(new), self._loop)
+
+    def _stream_names(self, symbols):
+        names = []
+        for sym in sorted(symbols):
+            s = sym.lower()
+            if "ticker" in self.streams:
+                names.append(f"{s}@ticker")
+            if "bookTicker" in self.streams:
+                names.append(f"{s}@bookTicker")
+            if "kline" in self.streams:
+                names.extend(f"{s}@kline_{tf}" for tf in self.timeframes)
+            if "depth" in self.streams:
+                names.append(f"{s}@depth@{self.depth_speed}")
+        return names
+
+    async def _send_subscribe(self, symbols):
+        self._req_id += 1
+        msg = {"method": "SUBSCRIBE", "params": self._stream_names(symbols), "id": self._req_id}
+        await self._ws.send(json.dumps(msg))
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._run_forever())
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    async def _run_forever(self):
+        backoff = 1.0
+        while self._running:
+            try:
+                await self._connect_and_listen()
+                backoff = 1.0
+            except Exception as e:
+                print(f"[BinanceWS] 连接异常: {e}")
+            self._ws = None
+            if not self._running:
+                break
+            # 所有深度序列作废，重连后等待新快照
+            with self._lock:
+                self.depth_seq.clear()
+            self.stats["reconnects"] += 1
+            delay = min(self.max_backoff, backoff) * (0.5 + random.random() / 2)
+            print(f"[BinanceWS] {delay:.1f}s 后重连 (第{self.stats['reconnects']}次)")
+            await asyncio.sleep(delay)
+            backoff = min(self.max_backoff, backoff * 2)
+
+    async def _connect_and_listen(self):
+        with self._lock:
+            symbols = set(self.symbols)
+        names = self._stream_names(symbols)
+        # 单连接最多 1024 个流，超出部分连上后再 SUBSCRIBE
+        url = self.url + ("?streams=" + "/".join(names[:200]) if names else "")
+        async with websockets.connect(url, ping_interval=20, ping_timeout=20, max_queue=4096) as ws:
+            self._ws = ws
+            self.stats["connected_at"] = time.time()
+            if len(names) > 200:
+                for i in range(200, len(names), 200):
+                    self._req_id += 1
+                    await ws.send(json.dumps({"method": "SUBSCRIBE", "params": names[i:i + 200], "id": self._req_id}))
+            async for raw in ws:
+                if not self._running:
+                    break
+                self._on_raw(raw)
+
+    # ---------------- message handling ----------------
+    def _on_raw(self, raw):
+        self.stats["messages"] += 1
+        self.stats["last_message_at"] = time.time()
+        try:
+            msg = json.loads(raw)
+        except ValueError:
+            self.stats["parse_errors"] += 1
+            return
+        if "result" in msg and "id" in msg:
+            return  # subscribe ack
+        stream = msg.get("stream", "")
+        data = msg.get("data", msg)
+        try:
+            if "@kline_" in stream or data.get("e") == "kline":
+                self._on_kline(data)
+            elif stream.endswith("@bookTicker") or data.get("e") == "bookTicker":
+                self._on_book_ticker(data)
+            elif "@depth" in stream or data.get("e") == "depthUpdate":
+                self._on_depth(data)
+            elif stream.endswith("@ticker") or data.get("e") == "24hrTicker":
+                self._on_ticker(data)
+        except Exception as e:
+            self.stats["parse_errors"] += 1
+            print(f"[BinanceWS] 解析失败 {stream}: {e}")
+
+    def _emit(self, kind, symbol, data):
+        for cb in self.listeners:
+            try:
+                cb(kind, symbol, data)
+            except Exception as e:
+                print(f"[BinanceWS] listener 异常: {e}")
+        if self.bus is not None:
+            try:
+                self.bus.publish_threadsafe(f"md.binance.{symbol}.{kind}", data)
+            except Exception:
+                pass
+
+    def _on_ticker(self, d):
+        sym = d["s"]
+        t = {
+            "symbol": sym,
+            "last": float(d["c"]),
+            "open": float(d["o"]),
+            "high": float(d["h"]),
+            "low": float(d["l"]),
+            "vol1": float(d["v"]),
+            "vol": float(d["q"]),
+            "ts": int(d.get("E") or time.time() * 1000),
+            "recv": time.time(),
+        }
+        with self._lock:
+            self.tickers[sym] = t
+        self._emit("ticker", sym, t)
+
+    def _on_book_ticker(self, d):
+        sym = d["s"]
+        t = {
+            "symbol": sym,
+            "bid": float(d["b"]),
+            "bidSize": float(d["B"]),
+            "ask": float(d["a"]),
+            "askSize": float(d["A"]),
+            "ts": int(d.get("E") or d.get("T") or time.time() * 1000),
+            "recv": time.time(),
+        }
+        with self._lock:
+            self.book_tickers[sym] = t
+        self._emit("bookTicker", sym, t)
+
+    def _on_kline(self, d):
+        k = d["k"]
+        sym, tf = k["s"], k["i"]
+        row = {
+            "trade_date": int(k["t"]),
+            "open": float(k["o"]),
+            "high": float(k["h"]),
+            "low": float(k["l"]),
+            "close": float(k["c"]),
+            "vol1": float(k["v"]),
+            "vol": float(k["q"]),
+            "closed": bool(k.get("x")),
+        }
+        with self._lock:
+            self._merge_klines(sym, tf, [row])
+        self._emit("kline", sym, dict(row, timeframe=tf))
+
+    def _merge_klines(self, sym, tf, rows):
+        """Insert/replace rows by open time; caller holds the lock."""
+        arr = self.klines.setdefault((sym, tf), [])
+        for row in rows:
+            ts = row["trade_date"]
+            if not arr or ts > arr[-1]["trade_date"]:
+                arr.append(row)
+            elif ts == arr[-1]["trade_date"]:
+                arr[-1] = row
+            else:
+                i = bisect_left([r["trade_date"] for r in arr], ts)
+                if i < len(arr) and arr[i]["trade_date"] == ts:
+                    arr[i] = row
+                else:
+                    arr.insert(i, row)
+        if len(arr) > self.kline_maxlen:
+            del arr[: len(arr) - self.kline_maxlen]
+
+    def _on_depth(self, d):
+        sym = d["s"]
+        first, final = int(d["U"]), int(d["u"])
+        prev = d.get("pu")
+        with self._lock:
+            last = self.depth_seq.get(sym)
+            if last is None:
+                gap = False
+            elif prev is not None:
+                # 合约: pu 必须等于上一条的 u
+                gap = int(prev) != last
+            else:
+                # 现货: U 必须等于上一条 u + 1
+                gap = first != last + 1
+            self.depth_seq[sym] = final
+        diff = {
+            "symbol": sym,
+            "first_id": first,
+            "final_id": final,
+            "prev_final_id": int(prev) if prev is not None else None,
+            "bids": [[float(p), float(q)] for p, q in d.get("b", [])],
+            "asks": [[float(p), float(q)] for p, q in d.get("a", [])],
+            "ts": int(d.get("E") or time.time() * 1000),
+        }
+        if gap:
+            self.stats["depth_gaps"] += 1
+            self._emit("gap", sym, {"symbol": sym, "expected": last, "got": diff})
+        self._emit("depth", sym, diff)
+
+    # ---------------- queries (CTOS shapes) ----------------
+    def get_price(self, symbol, max_age=5.0):
+        """Latest trade price (or book mid) if fresher than max_age seconds, else None."""
+        sym = norm_ws_symbol(symbol)
+        now = time.time()
+        with self._lock:
+            t = self.tickers.get(sym)
+            b = self.book_tickers.get(sym)
+        best = None
+        if t is not None and now - t["recv"] <= max_age:
+            best = (t["recv"], t["last"])
+        if b is not None and now - b["recv"] <= max_age and b["bid"] > 0 and b["ask"] > 0:
+            if best is None or b["recv"] > best[0]:
+                best = (b["recv"], (b["bid"] + b["ask"]) / 2.0)
+        return best[1] if best else None
+
+    def get_book_ticker(self, symbol, max_age=5.0):
+        sym = norm_ws_symbol(symbol)
+        with self._lock:
+            b = self.book_tickers.get(sym)
+        if b is None or time.time() - b["recv"] > max_age:
+            return None
+        return dict(b)
+
+    def get_klines(self, symbol, timeframe="1m", limit=200, start_time=None, end_time=None, max_age=5.0):
+        """
+        Rows oldest-first, same columns as BinanceDriver.get_klines.
+        Returns None when memory does not cover the request (caller falls back to REST):
+        too few rows, the newest bar is older than one interval plus ``max_age``
+        seconds (socket stalled or reconnecting), or bars are missing in between.
+        """
+        sym = norm_ws_symbol(symbol)
+        with self._lock:
+            arr = list(self.klines.get((sym, timeframe), ()))
+        if not arr:
+            return None
+        step = timeframe_ms(timeframe)
+        if step is not None and max_age is not None:
+            now_ms = int(time.time() * 1000)
+            until = min(now_ms, int(end_time * 1000)) if end_time is not None else now_ms
+            if until - arr[-1]["trade_date"] > step + max_age * 1000:
+                return None
+        if start_time is not None:
+            start_ms = int(start_time * 1000)
+            if arr[0]["trade_date"] > start_ms:
+                return None
+            arr = [r for r in arr if r["trade_date"] >= start_ms]
+        if end_time is not None:
+            end_ms = int(end_time * 1000)
+            arr = [r for r in arr if r["trade_date"] <= end_ms]
+        if start_time is None and limit and len(arr) < int(limit):
+            return None
+        if limit:
+            # 同 REST fetch_ohlcv(since, limit)：给了起点取起点之后的前 limit 根，否则取最新的 limit 根
+            arr = arr[:int(limit)] if start_time is not None else arr[-int(limit):]
+        if step is not None and any(b["trade_date"] - a["trade_date"] != step for a, b in zip(arr, arr[1:])):
+            return None
+        return [{c: r[c] for c in KLINE_COLUMNS} for r in arr]
+
+    def seed_klines(self, symbol, timeframe, rows):
+        """Backfill history from REST rows (dicts with KLINE_COLUMNS)."""
+        sym = norm_ws_symbol(symbol)
+        clean = []
+        for r in rows:
+            row = {c: (int(r[c]) if c == "trade_date" else float(r[c])) for c in KLINE_COLUMNS}
+            row["closed"] = True
+            clean.append(row)
+        with self._lock:
+            # WS 推送的行更新，优先保留
+            merged = {r["trade_date"]: r for r in clean}
+            for r in self.klines.get((sym, timeframe), ()):
+                merged[r["trade_date"]] = r
+            self.klines[(sym, timeframe)] = []
+            self._merge_klines(sym, timeframe, [merged[k] for k in sorted(merged)])
+
+    def get_stats(self):
+        with self._lock:
+            s = dict(self.stats)
+            s.update({
+                "symbols": len(self.symbols),
+                "tickers": len(self.tickers),
+                "kline_series": len(self.klines),
+                "connected": self.connected,
+            })
+        return s
+
+
+USER_WS_URLS = {
+    "usdm": "wss://fstream.binance.com/ws/",
+    "spot": "wss://stream.binance.com:9443/ws/",
+}
+
+
+class UserDataClient:
+    """
+    Binance user data stream (``/ws/<listenKey>``): order and fill pushes.
+
+    :param listen_key_fn: callable() -> listenKey, e.g. via ccxt
+        ``fapiPrivatePostListenKey`` / ``publicPostUserDataStream``
+    :param keepalive_fn: callable(listen_key), called every ``keepalive``
+        seconds (Binance expires keys after 60 minutes)
+    :param order_state: optional OrderStateEngine fed with every order update
+    :param mode: 'usdm' (default) or 'spot'
+    """
+
+    def __init__(self, listen_key_fn, keepalive_fn=None, order_state=None, mode="usdm",
+                 keepalive=1800, max_backoff=30, url=None):
+        self.listen_key_fn = listen_key_fn
+        self.keepalive_fn = keepalive_fn
+        self.order_state = order_state
+        self.mode = (mode or "usdm").lower()
+        self.url = url or USER_WS_URLS["spot" if self.mode == "spot" else "usdm"]
+        self.keepalive = float(keepalive)
+        self.max_backoff = float(max_backoff)
+        self.listeners = []     # callback(event_type, msg)
+        self.listen_key = None
+        self.stats = {
+            "messages": 0,
+            "order_updates": 0,
+            "reconnects": 0,
+            "parse_errors": 0,
+            "connected_at": None,
+            "last_message_at": None,
+        }
+        self._ws = None
+        self._loop = None
+        self._thread = None
+        self._running = False
+
+    # ---------------- lifecycle ----------------
+    def start(self):
+        if websockets is None:
+            raise RuntimeError("请先安装websockets: pip install websockets")
+        if self._thread and self._thread.is_alive():
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._thread_main, name="binance-user-ws", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._running = False
+        if self._loop is not None and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def connected(self):
+        return self._ws is not None
+
+    def add_listener(self, callback):
+        """callback(event_type, msg) for every user data event (ORDER_TRADE_UPDATE, ACCOUNT_UPDATE ...)"""
+        self.listeners.append(callback)
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._run_forever())
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    async def _run_forever(self):
+        backoff = 1.0
+        while self._running:
+            try:
+                await self._connect_and_listen()
+                backoff = 1.0
+            except Exception as e:
+                print(f"[BinanceUserWS] 连接异常: {e}")
+            self._ws = None
+            if self.order_state is not None:
+                self.order_state.set_live(False)
+            if not self._running:
+                break
+            self.stats["reconnects"] += 1
+            delay = min(self.max_backoff, backoff) * (0.5 + random.random() / 2)
+            print(f"[BinanceUserWS] {delay:.1f}s 后重连 (第{self.stats['reconnects']}次)")
+            await asyncio.sleep(delay)
+            backoff = min(self.max_backoff, backoff * 2)
+
+    async def _keepalive_loop(self):
+        while self._running and self._ws is not None:
+            await asyncio.sleep(self.keepalive)
+            if self.keepalive_fn is None or not self.listen_key:
+                continue
+            try:
+                await self._loop.run_in_executor(None, self.keepalive_fn, self.listen_key)
+            except Exception as e:
+                print(f"[BinanceUserWS] listenKey 续期失败: {e}")
+
+    async def _connect_and_listen(self):
+        self.listen_key = await self._loop.run_in_executor(None, self.listen_key_fn)
+        if not self.listen_key:
+            raise RuntimeError("获取 listenKey 失败")
+        async with websockets.connect(self.url + self.listen_key, ping_interval=20, ping_timeout=20) as ws:
+            self._ws = ws
+            self.stats["connected_at"] = time.time()
+            if self.order_state is not None:
+                # 先用 REST 对账断线期间漏掉的推送，再把订单表标记为实时（推送在此期间缓存在连接里）
+                await self._loop.run_in_executor(None, self.order_state.set_live, True)
+            keepalive = asyncio.ensure_future(self._keepalive_loop())
+            try:
+                async for raw in ws:
+                    if not self._running:
+                        break
+                    if self._on_raw(raw) == "listenKeyExpired":
+                        break
+            finally:
+                keepalive.cancel()
+
+    def _on_raw(self, raw):
+        self.stats["messages"] += 1
+        self.stats["last_message_at"] = time.time()
+        try:
+            msg = json.loads(raw)
+        except ValueError:
+            self.stats["parse_errors"] += 1
+            return None
+        event = msg.get("e")
+        if event in ("ORDER_TRADE_UPDATE", "executionReport"):
+            self.stats["order_updates"] += 1
+            if self.order_state is not None:
+                try:
+                    self.order_state.on_binance_message(msg)
+                except Exception as e:
+                    self.stats["parse_errors"] += 1
+                    print(f"[BinanceUserWS] 订单更新解析失败: {e}")
+        for cb in self.listeners:
+            try:
+                cb(event, msg)
+            except Exception as e:
+                print(f"[BinanceUserWS] listener 异常: {e}")
+        return event
 
-    # TODO: implement WS subscriptions and message normalization
+    def get_stats(self):
+        s = dict(self.stats)
+        s["connected"] = self.connected
+        return s
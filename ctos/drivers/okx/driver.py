@@ -41,12 +41,18 @@ except Exception as e:
 # Import syscall base
 try:
     # 包内正常导入
-    from ctos.core.kernel.syscalls import TradingSyscalls
+    from ctos.core.kernel.syscalls import TradingSyscalls, normalize_cancel_items
 except ImportError:
     # 单文件执行时，修正 sys.path 再导入
     import os, sys
     sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
-    from ctos.core.kernel.syscalls import TradingSyscalls
+    from ctos.core.kernel.syscalls import TradingSyscalls, normalize_cancel_items
+
+from ctos.core.io.datafeed.price_cache import get_price_cache
+from ctos.core.io.datafeed.exchange_info import get_exchange_info_cache
+from ctos.core.kernel.ratelimit import install_rate_limiter
+from ctos.core.io.datafeed.order_state import OrderStateEngine
+from ctos.drivers.okx.ws import OkxPrivateWs
 
 # Import account reader
 try:
@@ -150,7 +156,7 @@ class OkxDriver(TradingSyscalls):
     """
 
     def __init__(self, okx_client=None, mode="swap", default_quote="USDT",
-                 price_scale=1e-8, size_scale=1e-8, account_id=0):
+                 price_scale=1e-8, size_scale=1e-8, account_id=0, price_max_age=1.0):
         self.cex = 'OKX'
         self.quote_ccy = 'USDT'
         self.account_id = account_id
@@ -160,6 +166,7 @@ class OkxDriver(TradingSyscalls):
         :param mode: "swap" or "spot". If "swap", we append '-SWAP' suffix when needed.
         :param default_quote: default quote when user passes 'BTC' without '-USDT'
         :param account_id: 账户ID，根据配置文件中的账户顺序映射 (0=第一个账户, 1=第二个账户, ...)
+        :param price_max_age: get_price_now 缓存有效期(秒)，0 表示每次都请求
         """
         if okx_client is None:
             try:
@@ -175,21 +182,66 @@ class OkxDriver(TradingSyscalls):
         self.default_quote = default_quote or "USDT"
         self.price_scale = price_scale
         self.size_scale = size_scale
+        # 限频：同一账户的所有驱动/引擎共享令牌桶，撤单优先
+        self.rate_limiter = install_rate_limiter(self)
         self.load_exchange_trade_info()
         self.order_id_to_symbol = {}
+        # 价格缓存：同进程内所有 OKX 驱动共享，一次 /market/tickers 刷新整类产品
+        self.price_max_age = price_max_age
+        self.price_cache = get_price_cache('OKX', self._fetch_all_prices, fetch_one=self._fetch_one_price,
+                                           group_fn=self._price_group, max_age=price_max_age)
+        self.private_ws = None
+        self.order_state = None
+
+    def enable_order_stream(self, bus=None):
+        """
+        启动私有 WS orders 频道，订单/成交推送写入 self.order_state（OrderStateEngine），
+        ExecutionEngine 追单时据此判断成交，不再轮询 get_open_orders / get_order_status
+        """
+        if self.order_state is None:
+            self.order_state = OrderStateEngine(exchange=self.cex, bus=bus, reconcile_fn=self.get_order_status)
+        if self.private_ws is None:
+            self.private_ws = OkxPrivateWs(self.okx._access_key, self.okx._secret_key, self.okx._passphrase,
+                                           order_state=self.order_state)
+        self.private_ws.start()
+        return self.order_state
 
     def save_exchange_trade_info(self):
-        with open(os.path.dirname(os.path.abspath(__file__)) + '/exchange_trade_info.json', 'w') as f:
-            json.dump(self.exchange_trade_info, f)
-        # print('save_exchange_trade_info')
+        # 合并写：短时间内多次更新只落盘一次（临时文件 + os.replace 原子替换）
+        self.limits_cache.mark_dirty()
 
     def load_exchange_trade_info(self):
-        if not os.path.exists(os.path.dirname(os.path.abspath(__file__)) + '/exchange_trade_info.json'):
-            self.exchange_trade_info =  {}
-            return
-        with open(os.path.dirname(os.path.abspath(__file__)) + '/exchange_trade_info.json', 'r') as f:
-            self.exchange_trade_info = json.load(f)
-            
+        """
+        交易规则缓存：同进程内所有 OKX 驱动共享，启动时后台按 instType 一次性批量拉取，
+        之后按 TTL 后台刷新；self.exchange_trade_info 就是缓存表本身
+        """
+        self.limits_cache = get_exchange_info_cache(
+            'OKX', os.path.dirname(os.path.abspath(__file__)) + '/exchange_trade_info.json',
+            fetch_all=self._fetch_all_limits)
+        self.exchange_trade_info = self.limits_cache.table
+        self.limits_cache.start(self._limits_group())
+
+    def _limits_group(self, symbol=None):
+        if symbol:
+            return 'SWAP' if str(symbol).upper().endswith('-SWAP') else 'SPOT'
+        return 'SWAP' if self.mode == 'swap' else 'SPOT'
+
+    def _fetch_all_limits(self, instType='SWAP'):
+        """一次 /public/instruments 请求拉取整类产品的交易规则 -> {instId: limits}"""
+        if self.okx is None or not hasattr(self.okx, 'get_exchange_info'):
+            return {}
+        success, error = self.okx.get_exchange_info(instType=instType)
+        if error:
+            raise RuntimeError(f"API调用失败: {error}")
+        if not success or success.get('code') != '0':
+            raise RuntimeError(f"API返回错误: {(success or {}).get('msg', '未知错误')}")
+        out = {}
+        for item in success.get('data', []):
+            limits = self._extract_limits_from_item(item)
+            if limits and 'error' not in limits and item.get('instId'):
+                out[item['instId']] = limits
+        return out
+
 
     # -------------- helpers --------------
     def _norm_symbol(self, symbol):
@@ -255,8 +307,14 @@ class OkxDriver(TradingSyscalls):
         """
         if symbol:
             symbol, _, _ = self._norm_symbol(symbol)
-            if symbol in self.exchange_trade_info:
-                return self.exchange_trade_info[symbol], None
+            limits = self.exchange_trade_info.get(symbol)
+            if limits is not None:
+                return limits, None
+            # 未命中：先等（或触发）该类产品的批量加载，仍没有再单独请求
+            self.limits_cache.ensure_fresh(self._limits_group(symbol))
+            limits = self.exchange_trade_info.get(symbol)
+            if limits is not None:
+                return limits, None
         if not hasattr(self.okx, 'get_exchange_info'):
             return {"error": "okx client lacks get_exchange_info method"}
         
@@ -280,14 +338,14 @@ class OkxDriver(TradingSyscalls):
                     item = data_list[0]
                     limits = self._extract_limits_from_item(item)
                     if limits and 'error' not in limits:
-                        self.exchange_trade_info[symbol] = limits
-                        self.save_exchange_trade_info()
+                        self.limits_cache.put(symbol, limits)
                     return limits, None
                 else:
                     return None, {"error": f"未找到指定交易对 {symbol} 的信息"}
             
             # 如果没有指定symbol，返回全类型数据数组
             result = []
+            fetched = {}
             for item in data_list:
                 limits = self._extract_limits_from_item(item)
                 if limits and 'error' in limits:
@@ -296,8 +354,8 @@ class OkxDriver(TradingSyscalls):
                 if instType.upper() in ticker_symbol.upper():
                     if limits and 'error' not in limits:
                         result.append(limits)
-                        self.exchange_trade_info[ticker_symbol] = limits
-            self.save_exchange_trade_info()
+                        fetched[ticker_symbol] = limits
+            self.limits_cache.put_many(fetched)
             return result, None
             
         except Exception as e:
@@ -399,9 +457,31 @@ class OkxDriver(TradingSyscalls):
             return None, e
 
     # -------------- market data --------------
+    @staticmethod
+    def _price_group(full):
+        return 'SWAP' if full.endswith('-SWAP') else 'SPOT'
+
+    def _fetch_all_prices(self, instType):
+        data, err = self.okx.get_tickers(instType)
+        if err:
+            raise RuntimeError(err)
+        return {x['instId']: float(x['last']) for x in data if x.get('last')}
+
+    def _fetch_one_price(self, full):
+        price = self.okx.get_price_now(full)
+        return float(price) if price is not None else None
+
+    def get_price_stats(self):
+        """价格缓存命中统计"""
+        return self.price_cache.get_stats()
+
     def get_price_now(self, symbol='ETH-USDT-SWAP'):
         full, base, _ = self._norm_symbol(symbol)
         # print(full, base)
+        if hasattr(self.okx, "get_tickers"):
+            price = self.price_cache.get(full, max_age=self.price_max_age)
+            if price is not None:
+                return price
         # Strategy shows: okx.get_price_now('btc')
         if hasattr(self.okx, "get_price_now"):
             return float(self.okx.get_price_now(full))
@@ -508,6 +588,71 @@ class OkxDriver(TradingSyscalls):
             return success, error
         raise NotImplementedError("okex.py client lacks cancel_order(order_id=...)")
 
+    # -------------- batch trading --------------
+    def place_orders_batch(self, orders, max_workers=8):
+        """
+        批量下单：走 /trade/batch-orders（每次 20 笔），客户端不支持时回退为并发单笔下单
+        :param orders: [{'symbol','side','order_type','size','price','client_id', ...}, ...]
+        :return: ([(order_id, err), ...], None)
+        """
+        if not hasattr(self.okx, "place_orders"):
+            return super(OkxDriver, self).place_orders_batch(orders, max_workers=max_workers)
+        bodies = []
+        for o in orders:
+            o = dict(o)
+            full, _, _ = self._norm_symbol(o.pop("symbol"))
+            body = {
+                "symbol": full,
+                "side": str(o.pop("side")).lower(),
+                "order_type": str(o.pop("order_type", "limit")).lower(),
+                "quantity": float(o.pop("size")),
+                "price": o.pop("price", None),
+            }
+            client_id = o.pop("client_id", None)
+            if client_id:
+                body["clOrdId"] = client_id
+            body.update(o)
+            bodies.append(body)
+        results = self.okx.place_orders(bodies)
+        for body, (order_id, _) in zip(bodies, results):
+            if order_id:
+                self.order_id_to_symbol[order_id] = body["symbol"]
+        return results, None
+
+    def cancel_orders_batch(self, orders, symbol=None, max_workers=8):
+        """
+        批量撤单：走 /trade/cancel-batch-orders（每次 20 笔）
+        :param orders: 订单ID列表，或 (order_id, symbol) / {'order_id','symbol'}
+        :return: ([(success, err), ...], None)
+        """
+        if not hasattr(self.okx, "revoke_orders_batch"):
+            return super(OkxDriver, self).cancel_orders_batch(orders, symbol=symbol, max_workers=max_workers)
+        items = []
+        for o in normalize_cancel_items(orders, symbol):
+            sym = o["symbol"] or self.order_id_to_symbol.get(o["order_id"])
+            items.append((o["order_id"], self._norm_symbol(sym)[0] if sym else None))
+        results = self.okx.revoke_orders_batch(items)
+        return [(True, None) if order_id else (False, err) for order_id, err in results], None
+
+    def amend_orders_batch(self, amends, max_workers=8):
+        """
+        批量改单：走 /trade/amend-batch-orders（每次 20 笔）
+        :param amends: [{'order_id','symbol','price','size'}, ...]
+        :return: ([(order_id, err), ...], None)
+        """
+        if not hasattr(self.okx, "amend_orders"):
+            return super(OkxDriver, self).amend_orders_batch(amends, max_workers=max_workers)
+        items = []
+        for a in amends:
+            sym = a.get("symbol") or self.order_id_to_symbol.get(a["order_id"])
+            items.append({
+                "orderId": a["order_id"],
+                "symbol": self._norm_symbol(sym)[0] if sym else None,
+                "price": a.get("price"),
+                "quantity": a.get("size", a.get("quantity")),
+            })
+        return self.okx.amend_orders(items), None
+
     def get_order_status(self, order_id, symbol=None, keep_origin=False):
         if hasattr(self.okx, "get_order_status"):
             if not symbol:
@@ -7,11 +7,15 @@ import time
 from urllib.parse import urljoin
 import pandas as pd
 import json
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 import hmac
 import base64
 import random
+import uuid
 
 
 def _add_bpx_path():
@@ -51,17 +55,123 @@ except Exception as e:
         print('Error okex.py from util import *', e)
 
 
+# ---------------- HTTP 连接池 ----------------
+# 同一 host 的所有 OkexSpot 实例共享一个 keep-alive Session，避免每次请求重新做 TCP+TLS 握手
+DEFAULT_POOL_SIZE = 16
+DEFAULT_TIMEOUT = 10
+DEFAULT_GET_RETRIES = 2
+
+
+class PooledSession:
+    """带连接池/重试/复用统计的 requests.Session 封装（线程安全）"""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_GET_RETRIES):
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        retry_kw = dict(total=retries, connect=retries, read=retries, backoff_factor=0.2,
+                        status_forcelist=(429, 500, 502, 503, 504), raise_on_status=False)
+        try:
+            # 只对幂等的 GET 重试；下单/撤单等 POST 绝不自动重发
+            retry = Retry(allowed_methods=frozenset(["GET"]), **retry_kw)
+        except TypeError:
+            # urllib3 < 1.26
+            retry = Retry(method_whitelist=frozenset(["GET"]), **retry_kw)
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size,
+                                   max_retries=retry, pool_block=False)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def request(self, method, url, **kwargs):
+        t0 = time.time()
+        try:
+            return self.session.request(method, url, **kwargs)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            cost = time.time() - t0
+            with self._lock:
+                self.requests += 1
+                self.total_time += cost
+                if cost > self.max_time:
+                    self.max_time = cost
+
+    def _pool_counters(self):
+        """从 urllib3 连接池读取新建连接数与请求数"""
+        new_conns, pool_reqs = 0, 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            new_conns += getattr(pool, "num_connections", 0)
+            pool_reqs += getattr(pool, "num_requests", 0)
+        return new_conns, pool_reqs
+
+    def get_stats(self):
+        new_conns, pool_reqs = self._pool_counters()
+        with self._lock:
+            n = self.requests
+            return {
+                "pool_size": self.pool_size,
+                "requests": n,
+                "errors": self.errors,
+                "new_connections": new_conns,
+                "reused_connections": max(0, pool_reqs - new_conns),
+                "reuse_ratio": (1 - new_conns / pool_reqs) if pool_reqs else 0.0,
+                "avg_ms": (self.total_time / n * 1000) if n else 0.0,
+                "max_ms": self.max_time * 1000,
+            }
+
+    def close(self):
+        self.session.close()
+
+
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def get_pooled_session(host, pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_GET_RETRIES):
+    """按 (host, pool_size, retries) 复用全局 Session"""
+    key = (host, pool_size, retries)
+    with _SESSIONS_LOCK:
+        sess = _SESSIONS.get(key)
+        if sess is None:
+            sess = PooledSession(pool_size=pool_size, retries=retries)
+            _SESSIONS[key] = sess
+        return sess
+
 
 class OkexSpot:
     """OKEX Spot REST API client."""
 
-    def __init__(self, symbol, access_key, secret_key, passphrase, host=None):
+    def __init__(self, symbol, access_key, secret_key, passphrase, host=None,
+                 pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_GET_RETRIES,
+                 session=None):
+        """
+        :param pool_size: 每个 host 的 keep-alive 连接数上限，建议 >= 并发线程数
+        :param timeout: 请求超时(秒)，可为 (connect, read) 元组
+        :param retries: 幂等 GET 的自动重试次数
+        :param session: 自定义 PooledSession；默认同 host 共享
+        """
         self.symbol = symbol
         self._host = host or "https://www.okx.com"
         self._access_key = access_key
         self._secret_key = secret_key
         self._passphrase = passphrase
         self.account_type = 'MAIN'
+        self.timeout = timeout
+        self._session = session or get_pooled_session(self._host, pool_size=pool_size, retries=retries)
+
+    def get_http_stats(self):
+        """连接复用/耗时统计"""
+        return self._session.get_stats()
 
     def request(self, method, uri, params=None, body=None, headers=None, auth=False):
         """Initiate network request
@@ -106,8 +216,8 @@ class OkexSpot:
             headers["OK-ACCESS-SIGN"] = sign
             headers["OK-ACCESS-TIMESTAMP"] = str(timestamp)
             headers["OK-ACCESS-PASSPHRASE"] = self._passphrase
-        result = requests.request(
-            method, url, data=body, headers=headers, timeout=10
+        result = self._session.request(
+            method, url, data=body, headers=headers, timeout=self.timeout
         ).json()
         if result.get("code") and result.get("code") != "0":
             return None, result
@@ -376,14 +486,8 @@ class OkexSpot:
             return None, error
         return success["data"][0]["ordId"], error
 
-    def place_order(self, price, quantity, order_type='limit', tdMode='cross', side=None, symbol=None, ccy=None, posSide=None):
-        """
-       Open buy order.
-       :param price:order price
-       :param quantity:order quantity
-       :param order_type:order type, "LIMIT" or "MARKET"
-       :return:order id and None, otherwise None and error information
-       """
+    def _order_body(self, price, quantity, order_type='limit', tdMode='cross', side=None, symbol=None, ccy=None, posSide=None, clOrdId=None):
+        """组装 /trade/order 与 /trade/batch-orders 共用的下单参数"""
         symbol = symbol if symbol else self.symbol
         poside_mapping = {
             'buy': 'long',
@@ -392,7 +496,6 @@ class OkexSpot:
         if posSide is None:
             
             posSide = poside_mapping.get(side, 'long')
-        uri = "/api/v5/trade/order"
         if symbol.find('USDT') != -1:
             data = {"instId": symbol, "tdMode": tdMode, "side": side if side else 'buy', "posSide": posSide, "ccy": 'USDT'} if posSide else {"instId": symbol, "tdMode": tdMode, "side": side if side else 'buy', "ccy": 'USDT'}
         else:
@@ -401,6 +504,8 @@ class OkexSpot:
             quantity = quantity
         if ccy:
             data['ccy'] = ccy
+        if clOrdId:
+            data['clOrdId'] = str(clOrdId)
         if order_type.upper() == "POST_ONLY":
             data["ordType"] = "post_only"
             data["px"] = price
@@ -412,6 +517,19 @@ class OkexSpot:
             data["ordType"] = "limit"
             data["px"] = price
             data["sz"] = quantity
+        return data
+
+    def place_order(self, price, quantity, order_type='limit', tdMode='cross', side=None, symbol=None, ccy=None, posSide=None):
+        """
+       Open buy order.
+       :param price:order price
+       :param quantity:order quantity
+       :param order_type:order type, "LIMIT" or "MARKET"
+       :return:order id and None, otherwise None and error information
+       """
+        uri = "/api/v5/trade/order"
+        data = self._order_body(price, quantity, order_type=order_type, tdMode=tdMode, side=side,
+                                symbol=symbol, ccy=ccy, posSide=posSide)
         success, error = self.request(method="POST", uri=uri, body=data, auth=True)
         if error:
             return None, error
@@ -563,6 +681,106 @@ class OkexSpot:
             return None, error
         return success["data"][0]["ordId"], error
 
+    # ---------------- 批量接口（每次最多 20 笔） ----------------
+    BATCH_MAX = 20
+
+    @staticmethod
+    def _batch_results(success, error, n):
+        """
+        解析批量接口返回：code=0 全部成功，1 全部失败，2 部分成功；逐笔看 sCode
+        :return: [(ordId, None) | (None, item_or_error), ...] 与请求顺序一致
+        """
+        resp = success if success is not None else error
+        data = resp.get("data") if isinstance(resp, dict) else None
+        if not isinstance(data, list) or len(data) != n:
+            return [(None, error or resp)] * n
+        out = []
+        for item in data:
+            if str(item.get("sCode", "0")) == "0":
+                out.append((item.get("ordId"), None))
+            else:
+                out.append((None, item))
+        return out
+
+    def _batch_post(self, uri, bodies, reconcile=None):
+        """
+        :param reconcile: 可选 callable(body, error) -> (ordId, error)；请求超时/返回无法逐笔解析时
+                          交易所可能已经受理，逐笔用它对账，而不是直接报错
+        """
+        results = []
+        for i in range(0, len(bodies), self.BATCH_MAX):
+            chunk = bodies[i:i + self.BATCH_MAX]
+            try:
+                success, error = self.request(method="POST", uri=uri, body=chunk, auth=True)
+            except Exception as e:
+                success, error = None, e
+            resp = success if success is not None else error
+            data = resp.get("data") if isinstance(resp, dict) else None
+            if reconcile is not None and (not isinstance(data, list) or len(data) != len(chunk)):
+                print(f"⚠ 批量请求结果未知，按 clOrdId 对账: {error or resp}")
+                results.extend(reconcile(body, error or resp) for body in chunk)
+                continue
+            results.extend(self._batch_results(success, error, len(chunk)))
+        return results
+
+    def _reconcile_placed(self, body, error):
+        """按 clOrdId 查订单（含已成交/已撤）：查到即已下单成功；查不到返回错误，不重下以免重复"""
+        try:
+            success, err = self.request(method="GET", uri="/api/v5/trade/order",
+                                        params={"instId": body["instId"], "clOrdId": body["clOrdId"]}, auth=True)
+        except Exception as e:
+            success, err = None, e
+        data = success.get("data") if isinstance(success, dict) else None
+        if data and data[0].get("ordId"):
+            return data[0]["ordId"], None
+        return None, RuntimeError(f"批量下单结果未知({error})，未找到 clOrdId={body['clOrdId']} 的订单({err})，为避免重复未重下")
+
+    def place_orders(self, orders):
+        """
+        批量下单 /api/v5/trade/batch-orders
+        每笔都带 clOrdId（未指定时自动生成），请求结果未知时据此对账
+        :param orders: list[dict]，字段同 place_order（price, quantity, order_type, side, symbol, tdMode, posSide, ccy, clOrdId）
+        :return: [(ordId, error), ...]
+        """
+        bodies = [self._order_body(**dict(o, clOrdId=o.get("clOrdId") or uuid.uuid4().hex)) for o in orders]
+        return self._batch_post("/api/v5/trade/batch-orders", bodies, reconcile=self._reconcile_placed)
+
+    def revoke_orders_batch(self, orders):
+        """
+        批量撤单 /api/v5/trade/cancel-batch-orders
+        :param orders: list[(order_id, symbol)]
+        :return: [(ordId, error), ...]
+        """
+        bodies = [{"instId": symbol or self.symbol, "ordId": order_id} for order_id, symbol in orders]
+        return self._batch_post("/api/v5/trade/cancel-batch-orders", bodies)
+
+    def amend_orders(self, amends):
+        """
+        批量改单 /api/v5/trade/amend-batch-orders
+        :param amends: list[dict(orderId, symbol, price, quantity)]
+        :return: [(ordId, error), ...]
+        """
+        bodies = []
+        for a in amends:
+            data = {"instId": a.get("symbol") or self.symbol, "ordId": a["orderId"]}
+            if a.get("price"):
+                data["newPx"] = float(a["price"])
+            if a.get("quantity"):
+                data["newSz"] = a["quantity"]
+            bodies.append(data)
+        return self._batch_post("/api/v5/trade/amend-batch-orders", bodies)
+
+    def get_tickers(self, instType='SWAP'):
+        """
+        一次请求拿到某类产品的全部行情 (/api/v5/market/tickers)
+        :return: (list[dict], error)，每项含 instId/last/bidPx/askPx/ts
+        """
+        uri = "/api/v5/market/tickers"
+        success, error = self.request(method="GET", uri=uri, params={"instType": instType})
+        if error:
+            return None, error
+        return success.get("data", []), None
+
     def get_market(self, instId='', all=False, condition='SWAP'):
         """Get all unfilled orders.
        * NOTE: up to 100 orders
@@ -469,8 +469,8 @@ def get_current_dir() -> str:
     """返回当前文件所在的目录"""
     return os.path.dirname(os.path.abspath(__file__))
 
-def round_like(ref: float, x: float ) -> float:
-    """按 ref 的小数位数对齐 x"""
+def decimals_like(ref: float) -> int:
+    """ref 的小数位数（整数末尾的 0 记为负数位，如 100 -> -2），round_like 用"""
     if int(ref) == ref:
         ref=int(ref)
     # 处理科学计数法
@@ -493,7 +493,12 @@ def round_like(ref: float, x: float ) -> float:
                     decimals -= 1
                 else:
                     break
-    return round(x, decimals)
+    return decimals
+
+
+def round_like(ref: float, x: float ) -> float:
+    """按 ref 的小数位数对齐 x"""
+    return round(x, decimals_like(ref))
 
 
 def fuzzy_exchange_input(user_input: str) -> str:
@@ -0,0 +1,184 @@
+"""
+OKX private websocket (``/ws/v5/private``): order and fill pushes.
+
+The client logs in with the account's API key (HMAC-SHA256 over
+``timestamp + 'GET' + '/users/self/verify'``), subscribes to the ``orders``
+channel for all instrument types and feeds every push into an
+``OrderStateEngine``. It runs in a daemon thread with its own asyncio loop
+and reconnects with jittered exponential backoff, like the Binance client.
+"""
+import asyncio
+import base64
+import hmac
+import json
+import random
+import threading
+import time
+
+try:
+    import websockets
+except ImportError:  # optional dependency, only needed when the client is started
+    websockets = None
+
+
+PRIVATE_WS_URL = "wss://ws.okx.com:8443/ws/v5/private"
+
+
+def login_args(access_key, secret_key, passphrase, timestamp=None):
+    ts = str(int(timestamp if timestamp is not None else time.time()))
+    mac = hmac.new(secret_key.encode("utf-8"), (ts + "GET" + "/users/self/verify").encode("utf-8"), "sha256")
+    return {
+        "apiKey": access_key,
+        "passphrase": passphrase,
+        "timestamp": ts,
+        "sign": base64.b64encode(mac.digest()).decode(),
+    }
+
+
+class OkxPrivateWs:
+    """
+    :param access_key/secret_key/passphrase: same credentials as OkexSpot
+    :param order_state: optional OrderStateEngine fed with the ``orders`` channel
+    :param inst_type: ``orders`` channel instType, default 'ANY'
+    """
+
+    PING_INTERVAL = 20  # OKX closes idle connections after 30s
+
+    def __init__(self, access_key, secret_key, passphrase, order_state=None, inst_type="ANY",
+                 url=PRIVATE_WS_URL, max_backoff=30):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.passphrase = passphrase
+        self.order_state = order_state
+        self.inst_type = inst_type
+        self.url = url
+        self.max_backoff = float(max_backoff)
+        self.listeners = []     # callback(channel, msg)
+        self.stats = {
+            "messages": 0,
+            "order_updates": 0,
+            "reconnects": 0,
+            "parse_errors": 0,
+            "connected_at": None,
+            "last_message_at": None,
+        }
+        self._ws = None
+        self._loop = None
+        self._thread = None
+        self._running = False
+
+    # ---------------- lifecycle ----------------
+    def start(self):
+        if websockets is None:
+            raise RuntimeError("请先安装websockets: pip install websockets")
+        if self._thread and self._thread.is_alive():
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._thread_main, name="okx-private-ws", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._running = False
+        if self._loop is not None and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def connected(self):
+        return self._ws is not None
+
+    def add_listener(self, callback):
+        """callback(channel, msg) for every data push"""
+        self.listeners.append(callback)
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._run_forever())
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    async def _run_forever(self):
+        backoff = 1.0
+        while self._running:
+            try:
+                await self._connect_and_listen()
+                backoff = 1.0
+            except Exception as e:
+                print(f"[OkxPrivateWS] 连接异常: {e}")
+            self._ws = None
+            if self.order_state is not None:
+                self.order_state.set_live(False)
+            if not self._running:
+                break
+            self.stats["reconnects"] += 1
+            delay = min(self.max_backoff, backoff) * (0.5 + random.random() / 2)
+            print(f"[OkxPrivateWS] {delay:.1f}s 后重连 (第{self.stats['reconnects']}次)")
+            await asyncio.sleep(delay)
+            backoff = min(self.max_backoff, backoff * 2)
+
+    async def _ping_loop(self, ws):
+        while self._running:
+            await asyncio.sleep(self.PING_INTERVAL)
+            await ws.send("ping")
+
+    async def _connect_and_listen(self):
+        async with websockets.connect(self.url, ping_interval=None) as ws:
+            await ws.send(json.dumps({"op": "login", "args": [
+                login_args(self.access_key, self.secret_key, self.passphrase)]}))
+            resp = json.loads(await asyncio.wait_for(ws.recv(), 10))
+            if resp.get("event") != "login" or str(resp.get("code")) != "0":
+                raise RuntimeError(f"登录失败: {resp}")
+            await ws.send(json.dumps({"op": "subscribe", "args": [
+                {"channel": "orders", "instType": self.inst_type}]}))
+            self._ws = ws
+            self.stats["connected_at"] = time.time()
+            if self.order_state is not None:
+                # 先用 REST 对账断线期间漏掉的推送，再把订单表标记为实时（推送在此期间缓存在连接里）
+                await self._loop.run_in_executor(None, self.order_state.set_live, True)
+            pinger = asyncio.ensure_future(self._ping_loop(ws))
+            try:
+                async for raw in ws:
+                    if not self._running:
+                        break
+                    self._on_raw(raw)
+            finally:
+                pinger.cancel()
+
+    def _on_raw(self, raw):
+        self.stats["messages"] += 1
+        self.stats["last_message_at"] = time.time()
+        if raw == "pong":
+            return
+        try:
+            msg = json.loads(raw)
+        except ValueError:
+            self.stats["parse_errors"] += 1
+            return
+        if "event" in msg:
+            if msg["event"] == "error":
+                print(f"[OkxPrivateWS] 错误: {msg}")
+            return
+        channel = (msg.get("arg") or {}).get("channel")
+        if channel == "orders":
+            self.stats["order_updates"] += len(msg.get("data") or [])
+            if self.order_state is not None:
+                try:
+                    self.order_state.on_okx_message(msg)
+                except Exception as e:
+                    self.stats["parse_errors"] += 1
+                    print(f"[OkxPrivateWS] 订单更新解析失败: {e}")
+        for cb in self.listeners:
+            try:
+                cb(channel, msg)
+            except Exception as e:
+                print(f"[OkxPrivateWS] listener 异常: {e}")
+
+    def get_stats(self):
+        s = dict(self.stats)
+        s["connected"] = self.connected
+        return s
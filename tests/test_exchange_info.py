@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# tests/test_exchange_info.py
+# 交易规则缓存单元测试：合并落盘、原子替换、批量刷新合并请求、TTL（离线，无网络）
+
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+_THIS_FILE = Path(__file__).resolve()
+_PROJECT_ROOT = _THIS_FILE.parents[1]
+if str(_PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(_PROJECT_ROOT))
+
+from ctos.core.io.datafeed import exchange_info
+from ctos.core.io.datafeed.exchange_info import ExchangeInfoCache
+
+
+def test_loads_existing_file(tmp_path):
+    path = tmp_path / "exchange_trade_info.json"
+    path.write_text(json.dumps({"ETH-USDT-SWAP": {"tick_size": 0.01}}))
+    cache = ExchangeInfoCache(str(path))
+    assert cache.get("ETH-USDT-SWAP") == {"tick_size": 0.01}
+
+
+def test_updates_are_coalesced_into_one_atomic_write(tmp_path):
+    path = tmp_path / "exchange_trade_info.json"
+    cache = ExchangeInfoCache(str(path), save_delay=0.1)
+    for i in range(50):
+        cache.put("SYM%d" % i, {"tick_size": i})
+    assert cache.saves == 0 and not path.exists()
+    time.sleep(0.4)
+    assert cache.saves == 1
+    assert len(json.loads(path.read_text())) == 50
+    # 临时文件已被 os.replace 掉
+    assert os.listdir(str(tmp_path)) == ["exchange_trade_info.json"]
+    # 没有新改动时 flush 不写
+    assert cache.flush() is False and cache.saves == 1
+
+
+def test_failed_write_keeps_previous_file(tmp_path, monkeypatch):
+    path = tmp_path / "exchange_trade_info.json"
+    cache = ExchangeInfoCache(str(path), save_delay=60)
+    cache.put("ETH", {"tick_size": 0.01})
+    assert cache.flush() is True
+    good = path.read_text()
+
+    def broken_dump(obj, f):
+        f.write('{"ETH": {"tick')
+        raise OSError("disk full")
+
+    monkeypatch.setattr(exchange_info.json, "dump", broken_dump)
+    cache.put("BTC", {"tick_size": 0.1})
+    assert cache.flush() is False and cache.errors == 1
+    assert path.read_text() == good
+
+
+def test_concurrent_refreshes_share_one_request(tmp_path):
+    calls = []
+
+    def fetch_all(group):
+        calls.append(group)
+        time.sleep(0.1)
+        return {"ETH-USDT-SWAP": {"group": group}, "BTC-USDT-SWAP": {"group": group}}
+
+    cache = ExchangeInfoCache(str(tmp_path / "info.json"), fetch_all=fetch_all, ttl=60, save_delay=60)
+    threads = [threading.Thread(target=cache.refresh, args=("SWAP", 60)) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(2)
+    assert calls == ["SWAP"] and cache.bulk_refreshes == 1
+    assert cache.get("BTC-USDT-SWAP") == {"group": "SWAP"}
+    # TTL 内不再请求；另一个分组单独请求
+    assert cache.ensure_fresh("SWAP") == 0
+    assert cache.ensure_fresh("SPOT") == 2
+    assert calls == ["SWAP", "SPOT"]
+    assert cache.refresh("SWAP", max_age=0) == 2 and calls[-1] == "SWAP"
+
+
+def test_ensure_fresh_survives_fetch_errors(tmp_path):
+    def failing(group):
+        raise IOError("rate limited")
+
+    cache = ExchangeInfoCache(str(tmp_path / "info.json"), fetch_all=failing, save_delay=60)
+    assert cache.ensure_fresh("SWAP") == 0
+    assert cache.errors == 1 and cache.age("SWAP") is None
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# tests/test_order_state.py
+# 订单状态表单元测试：推送归一化、过期推送丢弃、成交事件、重连对账（epoch / unverified）（离线，无网络）
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+_THIS_FILE = Path(__file__).resolve()
+_PROJECT_ROOT = _THIS_FILE.parents[1]
+if str(_PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(_PROJECT_ROOT))
+
+from ctos.core.io.datafeed.order_state import (CANCELED, FILLED, OPEN, PARTIAL, OrderStateEngine,
+                                               normalize_state)
+
+
+def _okx_push(ord_id, state, acc_fill, u_time, sz="2"):
+    return {"arg": {"channel": "orders"}, "data": [{
+        "ordId": ord_id, "instId": "ETH-USDT-SWAP", "side": "buy", "ordType": "limit", "px": "100",
+        "sz": sz, "accFillSz": acc_fill, "state": state, "uTime": str(u_time)}]}
+
+
+def test_normalize_state():
+    assert normalize_state("live") == OPEN
+    assert normalize_state("NEW", 1.0, 2.0) == PARTIAL
+    assert normalize_state("closed") == FILLED
+    assert normalize_state("mmp_canceled") == CANCELED
+    assert normalize_state("something-new") == OPEN
+
+
+def test_fill_events_and_stale_pushes():
+    engine = OrderStateEngine("okx")
+    events = []
+    for name in OrderStateEngine.EVENTS:
+        engine.on(name, lambda ev, o, delta: events.append((ev, o["orderId"], delta)))
+    engine.on_okx_message(_okx_push("1", "live", "0", 100))
+    engine.on_okx_message(_okx_push("1", "partially_filled", "0.5", 200))
+    # 晚到的旧推送（uTime 更小）不能把状态改回去
+    engine.on_okx_message(_okx_push("1", "live", "0", 150))
+    engine.on_okx_message(_okx_push("1", "filled", "2", 300))
+    engine.on_okx_message(_okx_push("1", "filled", "2", 300))
+    order = engine.get("1")
+    assert order["state"] == FILLED and order["filledQuantity"] == 2.0
+    assert engine.stats["stale"] == 1
+    assert ("partial", "1", 0.5) in events and ("fill", "1", 1.5) in events
+    assert [e for e in events if e[0] == "closed"] == [("closed", "1", 1.5)]
+    assert not engine.is_open("1") and engine.open_orders() == []
+
+
+def test_wait_returns_changed_orders():
+    engine = OrderStateEngine("okx")
+    engine.track("7", "ETH-USDT-SWAP", quantity=1.0)
+    threading.Timer(0.05, engine.update, args=({"orderId": "7", "status": "FILLED", "filledQuantity": 1.0},)).start()
+    assert engine.wait(["7", "8"], timeout=2) == ["7"]
+    assert engine.wait(["8"], timeout=0.05) == []
+
+
+def test_going_live_reconciles_open_orders():
+    calls = []
+
+    def rest(order_id=None, symbol=None, keep_origin=False):
+        calls.append((order_id, symbol))
+        if order_id == "2":
+            return None, RuntimeError("timeout")
+        return {"orderId": order_id, "symbol": symbol, "status": "FILLED", "filledQuantity": 1.0,
+                "quantity": 1.0}, None
+
+    engine = OrderStateEngine("okx", reconcile_fn=rest)
+    engine.track("1", "ETH-USDT-SWAP", quantity=1.0)
+    engine.track("2", "BTC-USDT-SWAP", quantity=1.0)
+    engine.update({"orderId": "3", "status": "CANCELED"})
+    closed = []
+    engine.on("closed", lambda ev, o, delta: closed.append(o["orderId"]))
+    assert not engine.live and engine.epoch == 0
+
+    engine.set_live(True)
+    assert engine.live and engine.epoch == 1
+    # 只对未结束的订单对账；断线期间成交的订单补发 closed
+    assert sorted(calls) == [("1", "ETH-USDT-SWAP"), ("2", "BTC-USDT-SWAP")]
+    assert closed == ["1"] and engine.get("1")["state"] == FILLED
+    # 对账失败的订单标记 unverified，直到下一次推送
+    assert engine.get("2")["unverified"] is True
+    assert engine.stats["reconciled"] == 1 and engine.stats["errors"] == 1
+    engine.update({"orderId": "2", "status": "LIVE"})
+    assert "unverified" not in engine.get("2")
+
+    engine.set_live(False)
+    assert not engine.live and engine.live_since is None and engine.epoch == 1
+    engine.set_live(True)
+    assert engine.epoch == 2 and len(calls) == 3
+
+
+def test_going_live_without_reconcile_fn_flags_open_orders():
+    engine = OrderStateEngine("binance")
+    engine.track("1", "ETHUSDT", quantity=1.0)
+    before = time.time()
+    engine.set_live(True)
+    assert engine.live_since >= before
+    assert engine.get("1")["unverified"] is True
+    assert engine.get_stats()["open"] == 1
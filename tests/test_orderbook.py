@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# tests/test_orderbook.py
+# 本地订单簿单元测试：REST 快照 + WS 增量（Binance U/u/pu）衔接、断档重拉快照（离线，无网络）
+
+import sys
+import time
+from pathlib import Path
+
+_THIS_FILE = Path(__file__).resolve()
+_PROJECT_ROOT = _THIS_FILE.parents[1]
+if str(_PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(_PROJECT_ROOT))
+
+from ctos.core.io.datafeed.orderbook import OrderBook, BookManager
+
+
+def test_snapshot_then_bridging_diffs():
+    book = OrderBook("ETHUSDT")
+    # 快照前到达的增量先缓存，其中 u < lastUpdateId 的会被丢弃
+    assert book.apply_diff([["99", "1"]], [], first_id=90, final_id=95, prev_final_id=89)
+    assert book.apply_diff([["100", "2"]], [["101", "1"]], first_id=96, final_id=105, prev_final_id=95)
+    assert book.apply_snapshot([["100", "1"], ["99", "5"]], [["101", "3"], ["102", "1"]], snapshot_id=100)
+    assert book.synced and book.last_id == 105
+    assert book.best_bid() == (100.0, 2.0)
+    assert book.best_ask() == (101.0, 1.0)
+    # 后续增量必须 pu == 上一条 u
+    assert book.apply_diff([["100", "0"]], [], first_id=106, final_id=110, prev_final_id=105)
+    assert book.top() == (99.0, 101.0)
+    # 断档：pu 对不上 -> 失去同步
+    assert not book.apply_diff([], [["101", "0"]], first_id=120, final_id=125, prev_final_id=118)
+    assert not book.synced and book.top() is None
+
+
+def test_first_diff_must_straddle_snapshot():
+    book = OrderBook("ETHUSDT")
+    book.apply_snapshot([["100", "1"]], [["101", "1"]], snapshot_id=100)
+    # 第一条增量 U > lastUpdateId + 1：中间缺了数据
+    assert not book.apply_diff([["100", "2"]], [], first_id=103, final_id=110, prev_final_id=102)
+    assert not book.synced
+
+
+def test_manager_resyncs_and_backs_off():
+    calls = []
+
+    def snapshot(symbol):
+        calls.append(time.time())
+        if len(calls) == 1:
+            # 序号和增量对不上的快照（比如取错了现货盘口）
+            return [["100", "1"]], [["101", "1"]], 10
+        return [["100", "1"]], [["101", "1"]], 200
+
+    books = BookManager(snapshot_fn=snapshot, max_age=None, resync_backoff=0.05, max_resync_backoff=0.2)
+    books.on_diff("ETHUSDT", [["100", "3"]], [], first_id=198, final_id=205, prev_final_id=197)
+    deadline = time.time() + 5
+    while time.time() < deadline and books.get("ETHUSDT") is None:
+        # 失步期间持续到达的增量不会触发额外的快照请求
+        books.on_diff("ETHUSDT", [["100", "3"]], [], first_id=198, final_id=205, prev_final_id=197)
+        time.sleep(0.01)
+    book = books.get("ETHUSDT")
+    assert book is not None and book.best_bid() == (100.0, 3.0)
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.05
+
+
+def test_manager_backoff_is_capped():
+    calls = []
+
+    def failing(symbol):
+        calls.append(time.time())
+        raise IOError("rate limited")
+
+    books = BookManager(snapshot_fn=failing, resync_backoff=0.05, max_resync_backoff=0.1)
+    books.resync("BTCUSDT")
+    books.resync("BTCUSDT")  # 已在重试中，不会再起一个线程
+    time.sleep(1.2)
+    books.stop()
+    gaps = [b - a for a, b in zip(calls, calls[1:])]
+    assert 3 <= len(calls) <= 6
+    assert all(g < 0.1 + 0.2 + 0.15 for g in gaps)
+    # 停止后重试线程退出，不再请求快照
+    assert not books._resyncing
+    n = len(calls)
+    books.resync("BTCUSDT")
+    time.sleep(0.4)
+    assert len(calls) == n
+
+
+def test_manager_remove_cancels_resync():
+    calls = []
+
+    def failing(symbol):
+        calls.append(symbol)
+        raise IOError("rate limited")
+
+    books = BookManager(snapshot_fn=failing, resync_backoff=0.05, max_resync_backoff=0.05)
+    books.resync("BTCUSDT")
+    time.sleep(0.5)
+    books.remove("BTCUSDT")
+    time.sleep(0.1)
+    n = len(calls)
+    time.sleep(0.4)
+    assert n > 0 and len(calls) == n and not books._resyncing
+
+
+def test_sorted_keys_matches_sorted_list():
+    import random
+    from ctos.core.io.datafeed.orderbook import _SortedKeys
+    rng = random.Random(7)
+    keys, ref = _SortedKeys(), set()
+    for _ in range(20000):
+        k = float(rng.randrange(2000))
+        if rng.random() < 0.6:
+            assert keys.add(k) == (k not in ref)
+            ref.add(k)
+        else:
+            assert keys.discard(k) == (k in ref)
+            ref.discard(k)
+        if rng.random() < 0.001:
+            n = rng.randrange(len(ref) + 1)
+            removed = keys.truncate(n)
+            expected = sorted(ref)
+            assert removed == expected[n:]
+            ref = set(expected[:n])
+    expected = sorted(ref)
+    assert len(keys) == len(expected) and list(keys) == expected
+    assert keys.head(10) == expected[:10] and keys.first() == expected[0]
+
+
+def test_book_levels_stay_sorted_under_churn():
+    book = OrderBook("ETHUSDT", max_depth=300)
+    book.apply_snapshot([[str(1000 - i), "1"] for i in range(500)], [[str(1001 + i), "1"] for i in range(500)], 1)
+    assert len(book.bids.keys) == 300 and book.best_bid() == (1000.0, 1.0)
+    for i in range(2, 400):
+        px = 1000 - (i * 37) % 250
+        book.apply_diff([[str(px), "0" if i % 3 == 0 else "2"]], [], first_id=i, final_id=i, prev_final_id=i - 1)
+    bids = [p for p, _ in book.depth_at(None)["bids"]]
+    assert bids == sorted(bids, reverse=True) and len(bids) <= 300
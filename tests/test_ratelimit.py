@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# tests/test_ratelimit.py
+# 限频器单元测试：令牌桶排队优先级、超时、批量计费、嵌套调用不重复计费、协程版 acquire（离线，无网络）
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+_THIS_FILE = Path(__file__).resolve()
+_PROJECT_ROOT = _THIS_FILE.parents[1]
+if str(_PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(_PROJECT_ROOT))
+
+from ctos.core.kernel.ratelimit import (CANCEL, MARKET, ORDER, PRIORITIES, QUERY, RateLimiter,
+                                        install_rate_limiter)
+from ctos.core.kernel.syscalls import run_concurrent
+
+
+def _limits(capacity, period):
+    return {"buckets": {"all": (capacity, period)}, "classes": {c: ("all", 1) for c in PRIORITIES}}
+
+
+def test_waiters_are_served_by_priority():
+    limiter = RateLimiter("test-prio", limits=_limits(1, 0.2))
+    limiter.acquire(MARKET)     # 桶已空，之后的请求都要排队
+    served = []
+
+    def worker(cls):
+        limiter.acquire(cls)
+        served.append(cls)
+
+    threads = []
+    for cls in (MARKET, QUERY, CANCEL):
+        t = threading.Thread(target=worker, args=(cls,))
+        t.start()
+        threads.append(t)
+        time.sleep(0.03)
+    for t in threads:
+        t.join(3)
+    # 先到的行情请求排在最后，撤单插队到最前
+    assert served == [CANCEL, QUERY, MARKET]
+    stats = limiter.get_stats()
+    assert stats["classes"][MARKET]["calls"] == 2 and stats["classes"][MARKET]["queued"] == 1
+    assert stats["buckets"]["all"]["waiting"] == 0
+
+
+def test_acquire_reports_wait_and_times_out():
+    limiter = RateLimiter("test-timeout", limits=_limits(2, 1.0))
+    assert limiter.acquire(ORDER) < 0.01
+    assert limiter.acquire(ORDER) < 0.01
+    assert limiter.acquire(ORDER, timeout=0.05) is None
+    waited = limiter.acquire(ORDER)
+    assert 0.3 < waited < 0.8
+    s = limiter.get_stats()["classes"][ORDER]
+    assert s["timeouts"] == 1 and s["calls"] == 3 and s["queued"] == 1
+
+
+def test_penalize_drains_bucket():
+    limiter = RateLimiter("test-penalty", limits=_limits(10, 1.0))
+    limiter.penalize(ORDER, 0.2)
+    assert limiter.acquire(ORDER, timeout=0.05) is None
+    assert limiter.acquire(ORDER, timeout=1.0) is not None
+
+
+class _FakeDriver:
+    cex = "test-batch"
+    account_id = 0
+
+    def place_order(self, item):
+        return item, None
+
+    def place_orders_batch(self, orders, max_workers=8):
+        # 线程池里逐笔调用（已被限频器包装的）place_order，批量已经按笔数预先计费
+        return run_concurrent(self.place_order, orders, max_workers), None
+
+
+def test_batch_is_charged_per_item_and_nested_calls_are_not_charged_again():
+    driver = _FakeDriver()
+    limiter = install_rate_limiter(driver, limits=_limits(100, 1000.0))
+    assert install_rate_limiter(driver) is limiter     # 重复安装不会再包一层
+    results, err = driver.place_orders_batch(list(range(10)), max_workers=4)
+    assert err is None and [r[0] for r in results] == list(range(10))
+    stats = limiter.get_stats()
+    assert stats["classes"][ORDER]["calls"] == 1
+    assert 89.5 < stats["buckets"]["all"]["tokens"] <= 90.1
+    driver.place_order("x")
+    stats = limiter.get_stats()
+    assert stats["classes"][ORDER]["calls"] == 2
+    assert 88.5 < stats["buckets"]["all"]["tokens"] <= 89.1
+
+
+def test_acquire_async_does_not_block_the_loop():
+    limiter = RateLimiter("test-async", limits=_limits(1, 0.3))
+    limiter.acquire(ORDER)
+    ticks = []
+
+    async def ticker():
+        for _ in range(10):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.02)
+
+    async def main():
+        waited, _ = await asyncio.gather(limiter.acquire_async(ORDER), ticker())
+        return waited
+
+    waited = asyncio.run(main())
+    assert waited > 0.15
+    # 等令牌期间事件循环照常调度其它协程
+    assert len(ticks) == 10 and ticks[-1] - ticks[0] < 0.5